@@ -0,0 +1,36 @@
+from django.contrib.auth.models import User
+from django.core.management import call_command
+
+from transactions.models import Transaction
+
+
+# Rows per benchmark user; views are scoped to one user, so this is the size they see
+SCALES = {
+    '10k': 10_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+
+
+def get_dataset_user(scale, end_date, seed=42, stdout=None):
+    """Return the benchmark user for a scale and end date, generating its data on first use"""
+    prefix = f'bench{scale}-{end_date:%Y%m%d}-'
+    username = f'{prefix}00001'
+    user = User.objects.filter(username=username).first()
+    if user is not None and Transaction.objects.filter(user=user).count() >= SCALES[scale]:
+        return user
+    if user is not None:
+        # A previous seed was interrupted; start that dataset again
+        user.delete()
+
+    call_command(
+        'generate_load_data',
+        users=1,
+        transactions_per_user=SCALES[scale],
+        years=3,
+        seed=seed,
+        end_date=end_date.isoformat(),
+        prefix=prefix,
+        stdout=stdout
+    )
+    return User.objects.get(username=username)
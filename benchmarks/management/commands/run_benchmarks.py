@@ -0,0 +1,117 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_databases, setup_test_environment, teardown_databases
+from django.utils import timezone
+from datetime import datetime, timedelta
+import json
+import platform
+import tempfile
+
+from benchmarks.datasets import SCALES, get_dataset_user
+from benchmarks.runner import run_benchmarks, compare, load_results
+
+
+class Command(BaseCommand):
+    help = 'Seed benchmark datasets in a test database and time every view and report path against them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default='10k,100k',
+                            help=f"Comma separated dataset sizes ({', '.join(SCALES)})")
+        parser.add_argument('--iterations', type=int, default=20, help='Warm requests per scenario')
+        parser.add_argument('--only', default='', help='Comma separated scenario name filters')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--dataset-end', help='Last day of the generated history (YYYY-MM-DD, default the '
+                                                  'end of last month, or the baseline\'s end date)')
+        parser.add_argument('--keepdb', action='store_true',
+                            help='Keep the test database, and the datasets seeded in it, for the next run '
+                                 '(SQLite needs a TEST NAME, otherwise its test database is in memory)')
+        parser.add_argument('--output', default='benchmark-results.json')
+        parser.add_argument('--baseline', help='Previous results file to compare against')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Allowed relative slowdown before a metric counts as a regression')
+
+    def handle(self, *args, **options):
+        scales = [scale.strip().lower() for scale in options['scales'].split(',') if scale.strip()]
+        unknown = [scale for scale in scales if scale not in SCALES]
+        if unknown:
+            raise CommandError(f"Unknown scales: {', '.join(unknown)}")
+        only = [name.strip() for name in options['only'].split(',') if name.strip()]
+
+        baseline = load_results(options['baseline']) if options['baseline'] else None
+        dataset_end = self.get_dataset_end(options['dataset_end'], baseline)
+
+        if options['keepdb'] and connection.vendor == 'sqlite' and not connection.settings_dict['TEST']['NAME']:
+            self.stderr.write(self.style.WARNING(
+                '--keepdb has no effect: the SQLite test database is in memory unless '
+                'DATABASES["default"]["TEST"]["NAME"] is set'
+            ))
+
+        # Lets the test client talk to the app (ALLOWED_HOSTS, template signals)
+        setup_test_environment()
+        # Seed and query a throwaway test database, never the configured one
+        old_config = setup_databases(verbosity=options['verbosity'], interactive=False, keepdb=options['keepdb'])
+        try:
+            with tempfile.TemporaryDirectory() as media_root, override_settings(
+                MEDIA_ROOT=media_root, REPORT_CACHE_DIR=None
+            ):
+                results = {}
+                for scale in scales:
+                    self.stdout.write(f'Preparing {scale} dataset ending {dataset_end}...')
+                    user = get_dataset_user(scale, dataset_end, seed=options['seed'], stdout=self.stdout)
+                    results[scale] = run_benchmarks(user, options['iterations'], only)
+                    self.print_results(scale, results[scale])
+        finally:
+            teardown_databases(old_config, verbosity=options['verbosity'], keepdb=options['keepdb'])
+
+        with open(options['output'], 'w') as f:
+            json.dump({
+                'created_at': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'iterations': options['iterations'],
+                'seed': options['seed'],
+                'dataset_end': dataset_end.isoformat(),
+                'results': results,
+            }, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        failed = sorted({name for scenarios in results.values()
+                         for name, result in scenarios.items() if result['status'] >= 400})
+        if failed:
+            raise CommandError(f"Scenarios returned errors: {', '.join(failed)}")
+
+        if baseline:
+            if baseline.get('seed', options['seed']) != options['seed']:
+                raise CommandError(f"{options['baseline']} was measured with --seed {baseline['seed']}")
+            regressions = compare(results, baseline['results'], options['threshold'])
+            for scale, name, metric, previous, current in regressions:
+                self.stdout.write(self.style.ERROR(f'{scale} {name} {metric}: {previous} -> {current}'))
+            if regressions:
+                raise CommandError(f'{len(regressions)} regressions against {options["baseline"]}')
+            self.stdout.write(self.style.SUCCESS('No regressions against baseline'))
+
+    def get_dataset_end(self, value, baseline):
+        """
+        Datasets are generated up to a fixed day so runs compare like with like;
+        a baseline pins it to the day its own datasets ended.
+        """
+        pinned = baseline.get('dataset_end') if baseline else None
+        if value:
+            try:
+                dataset_end = datetime.strptime(value, '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError(f'Invalid date: {value}')
+            if pinned and dataset_end.isoformat() != pinned:
+                raise CommandError(f'The baseline was measured on a dataset ending {pinned}')
+            return dataset_end
+        if pinned:
+            return datetime.strptime(pinned, '%Y-%m-%d').date()
+        return timezone.now().date().replace(day=1) - timedelta(days=1)
+
+    def print_results(self, scale, results):
+        self.stdout.write(f"{'scenario':<30} {'status':>6} {'queries':>7} {'first':>9} {'p50':>9} {'p95':>9} {'peak KB':>9}")
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<30} {result['status']:>6} {result['queries']:>7} {result['first_ms']:>9.1f} "
+                f"{result.get('p50_ms', 0):>9.1f} {result.get('p95_ms', 0):>9.1f} {result['peak_memory_kb']:>9.0f}"
+            )
@@ -0,0 +1,115 @@
+import json
+import math
+import time
+import tracemalloc
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .scenarios import SCENARIOS
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def fetch(client, url, params):
+    """Request a URL and read the whole body, including streamed file responses"""
+    response = client.get(url, params)
+    try:
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+    finally:
+        response.close()
+    return response, size
+
+
+def run_scenario(client, url, params, iterations):
+    """
+    Time one endpoint. The first request runs against an empty cache; a second
+    cold request records SQL queries and peak Python memory (tracing is too slow
+    to leave on while timing); the rest measure the warm path.
+    """
+    cache.clear()
+    started = time.perf_counter()
+    fetch(client, url, params)
+    first_ms = (time.perf_counter() - started) * 1000
+
+    cache.clear()
+    tracemalloc.start()
+    with CaptureQueriesContext(connection) as queries:
+        response, size = fetch(client, url, params)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    result = {
+        'status': response.status_code,
+        'bytes': size,
+        'queries': len(queries),
+        'peak_memory_kb': round(peak / 1024, 1),
+        'first_ms': round(first_ms, 2),
+    }
+    if response.status_code >= 400:
+        return result
+
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fetch(client, url, params)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    if timings:
+        result.update({
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'p99_ms': round(percentile(timings, 99), 2),
+            'max_ms': round(max(timings), 2),
+        })
+    return result
+
+
+def run_benchmarks(user, iterations=20, only=None):
+    """Run every scenario as ``user`` and return {scenario name: result}"""
+    client = Client(raise_request_exception=False)
+    client.force_login(user)
+
+    results = {}
+    for name, url_name, params in SCENARIOS:
+        if only and not any(pattern in name for pattern in only):
+            continue
+        results[name] = run_scenario(client, reverse(url_name), params, iterations)
+    return results
+
+
+def compare(results, baseline, threshold=0.2, metrics=('p50_ms', 'p95_ms', 'queries')):
+    """
+    Return (scale, scenario, metric, baseline, current) for every metric that
+    grew by more than ``threshold`` (a fraction) over the baseline run.
+    """
+    regressions = []
+    for scale, scenarios in results.items():
+        for name, current in scenarios.items():
+            previous = baseline.get(scale, {}).get(name)
+            if not previous:
+                continue
+            for metric in metrics:
+                if metric not in current or metric not in previous:
+                    continue
+                # Ignore sub-millisecond jitter on fast endpoints; any extra query counts
+                noise = 0 if metric == 'queries' else 1
+                if current[metric] > previous[metric] * (1 + threshold) and current[metric] - previous[metric] > noise:
+                    regressions.append((scale, name, metric, previous[metric], current[metric]))
+    return regressions
+
+
+def load_results(path):
+    """Read a results file written by run_benchmarks"""
+    with open(path) as f:
+        return json.load(f)
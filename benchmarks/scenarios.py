@@ -0,0 +1,20 @@
+# (name, url name, query parameters)
+# The transaction list, budget and PDF pages render templates that are not part
+# of this tree; the list is measured through the JSON endpoint that shares its
+# filtering, pagination and ledger code.
+SCENARIOS = [
+    ('transaction_page', 'transactions:api_transactions', {}),
+    ('transaction_page_filtered', 'transactions:api_transactions', {'type': 'expense', 'search': 'coffee'}),
+    ('transaction_page_ledger', 'transactions:api_transactions', {'view': 'ledger'}),
+    ('api_search', 'transactions:api_search', {'q': 'coffee'}),
+    ('api_dashboard', 'transactions:api_dashboard', {}),
+    ('api_stats', 'transactions:api_stats', {}),
+    ('api_monthly_trend', 'transactions:api_monthly_trend', {'months': 12}),
+    ('api_category_breakdown', 'transactions:api_category_breakdown', {}),
+    ('analytics_income_expense', 'reports:income_expense_chart', {'months': 12}),
+    ('analytics_category_analysis', 'reports:category_analysis', {'period': 'last_3_months'}),
+    ('analytics_trends', 'reports:trends_analysis', {'type': 'expense', 'period': '1year'}),
+    ('analytics_insights', 'reports:insights', {'months': 12}),
+    ('analytics_category_stats', 'reports:category_stats', {}),
+    ('report_excel', 'reports:excel_report', {'type': 'detailed'}),
+]
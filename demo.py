@@ -108,7 +108,7 @@ def main():
     print("=" * 50)
     
     # Budget overview
-    budgets = Budget.objects.filter(user=demo_user, is_active=True)
+    budgets = Budget.objects.filter(user=demo_user, is_active=True).with_usage().select_related('category')
     
     for budget in budgets:
         spent = budget.get_spent_amount()
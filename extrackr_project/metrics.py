@@ -0,0 +1,235 @@
+"""
+Per-request SQL and timing instrumentation.
+
+MetricsMiddleware counts the queries each request runs through a database
+execute wrapper (no DEBUG query log needed), reports them in a Server-Timing
+header and folds them into per-view histograms. The active recorder lives in a
+context variable, so queries issued from sync_to_async or DB executor threads
+of an async request are attributed to it as well. metrics_view serves those in
+Prometheus text format. Metrics are kept per process; scrape every worker or
+run a single process behind the exporter.
+"""
+from collections import Counter
+from contextvars import ContextVar
+import logging
+import re
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+IN_LIST_RE = re.compile(r'IN \((?:%s, )*%s\)')
+
+
+def fingerprint(sql):
+    """Normalize SQL so repeats of one statement with different IN-list sizes match"""
+    return IN_LIST_RE.sub('IN (...)', sql)
+
+
+class QueryRecorder:
+    """Counts and times every query run while it is the current recorder"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, sql, duration):
+        # Queries of one async request can finish on several executor threads
+        with self._lock:
+            self.duration += duration
+            self.count += 1
+            self.statements[sql] += 1
+
+    def duplicates(self):
+        """Return (extra executions of repeated statements, most repeated fingerprint, its count)"""
+        grouped = Counter()
+        for sql, count in self.statements.items():
+            grouped[fingerprint(sql)] += count
+        repeated = sum(count - 1 for count in grouped.values() if count > 1)
+        if not repeated:
+            return 0, None, 0
+        sql, count = grouped.most_common(1)[0]
+        return repeated, sql, count
+
+
+current_recorder = ContextVar('current_recorder', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper installed on every connection; a no-op outside a request"""
+    recorder = current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        recorder.record(sql, time.perf_counter() - started)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(install_query_recorder, dispatch_uid='extrackr_metrics_recorder')
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.total += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    """Process-wide per-view histograms and counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.views = {}
+
+    def observe(self, view, method, duration, queries, sql_duration, duplicates):
+        with self._lock:
+            stats = self.views.get((view, method))
+            if stats is None:
+                stats = self.views[(view, method)] = {
+                    'duration': Histogram(DURATION_BUCKETS),
+                    'queries': Histogram(QUERY_BUCKETS),
+                    'sql_seconds': 0.0,
+                    'duplicates': 0,
+                }
+            stats['duration'].observe(duration)
+            stats['queries'].observe(queries)
+            stats['sql_seconds'] += sql_duration
+            stats['duplicates'] += duplicates
+
+    def render(self):
+        """Prometheus text exposition of everything observed so far"""
+        lines = []
+        with self._lock:
+            items = sorted(self.views.items())
+            self._render_histogram(lines, items, 'duration', 'extrackr_request_duration_seconds',
+                                   'Time spent in the view and middleware below the metrics middleware')
+            self._render_histogram(lines, items, 'queries', 'extrackr_request_sql_queries',
+                                   'SQL queries executed per request')
+            lines.append('# HELP extrackr_request_sql_seconds_total Time spent executing SQL')
+            lines.append('# TYPE extrackr_request_sql_seconds_total counter')
+            for (view, method), stats in items:
+                lines.append(f'extrackr_request_sql_seconds_total{{{labels(view, method)}}} {stats["sql_seconds"]:.6f}')
+            lines.append('# HELP extrackr_request_duplicate_queries_total Repeated executions of the same SQL statement (likely N+1)')
+            lines.append('# TYPE extrackr_request_duplicate_queries_total counter')
+            for (view, method), stats in items:
+                lines.append(f'extrackr_request_duplicate_queries_total{{{labels(view, method)}}} {stats["duplicates"]}')
+        return '\n'.join(lines) + '\n'
+
+    def _render_histogram(self, lines, items, key, name, help_text):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for (view, method), stats in items:
+            histogram = stats[key]
+            base = labels(view, method)
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                lines.append(f'{name}_bucket{{{base},le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{{base},le="+Inf"}} {histogram.total}')
+            lines.append(f'{name}_sum{{{base}}} {histogram.sum:.6f}')
+            lines.append(f'{name}_count{{{base}}} {histogram.total}')
+
+
+def labels(view, method):
+    view = view.replace('\\', '\\\\').replace('"', '\\"')
+    return f'view="{view}",method="{method}"'
+
+
+registry = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'METRICS_ENABLED', True)
+        self.duplicate_warning = getattr(settings, 'METRICS_DUPLICATE_QUERY_WARNING', 10)
+        self.is_async = iscoroutinefunction(get_response)
+        # Connections opened before this module was imported missed the signal
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(None, connection)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        token = current_recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        return self.finish(request, response, recorder, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        recorder = QueryRecorder()
+        token = current_recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        return self.finish(request, response, recorder, time.perf_counter() - started)
+
+    def finish(self, request, response, recorder, duration):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        duplicates, repeated_sql, repeated_count = recorder.duplicates()
+        registry.observe(view, request.method, duration, recorder.count, recorder.duration, duplicates)
+
+        if repeated_count >= self.duplicate_warning:
+            logger.warning('%s ran the same query %d times: %s', view, repeated_count, repeated_sql)
+
+        response['Server-Timing'] = (
+            f'sql;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries, {duplicates} duplicated", '
+            f'app;dur={duration * 1000:.1f}'
+        )
+        return response
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint for staff users or a bearer token (METRICS_TOKEN)"""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    header = request.headers.get('Authorization', '')
+    # Scrapers do not follow login redirects, so anyone else gets a plain 403
+    if not (token and constant_time_compare(header, f'Bearer {token}')) and not request.user.is_staff:
+        return HttpResponseForbidden()
+
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
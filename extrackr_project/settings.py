@@ -42,10 +42,12 @@ INSTALLED_APPS = [
     'accounts',
     'transactions',
     'reports',
+    'benchmarks',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'extrackr_project.metrics.MetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -86,6 +88,21 @@ DATABASES = {
 }
 
 
+# Cache
+# Dashboard JSON is keyed on a per-user data version stored in the database, so
+# invalidation stays exact with any backend, including local-memory and file caches.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'extrackr'),
+    }
+}
+DASHBOARD_CACHE_TIMEOUT = int(os.environ.get('DASHBOARD_CACHE_TIMEOUT', 3600))
+# Seconds between checks of the category version row; category edits in other
+# processes show up within this interval
+CATEGORY_REGISTRY_CHECK_INTERVAL = float(os.environ.get('CATEGORY_REGISTRY_CHECK_INTERVAL', 5))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -130,6 +147,28 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Background report jobs: 'local' renders on a thread pool inside the web
+# process, 'worker' leaves jobs for `manage.py run_report_jobs`
+REPORT_JOBS_MODE = os.environ.get('REPORT_JOBS_MODE', 'local')
+REPORT_JOB_WORKERS = int(os.environ.get('REPORT_JOB_WORKERS', 2))
+REPORT_MAX_CONCURRENT_RENDERS = int(os.environ.get('REPORT_MAX_CONCURRENT_RENDERS', 2))
+# Seconds after which a running report job is presumed lost and requeued
+REPORT_JOB_TIMEOUT = int(os.environ.get('REPORT_JOB_TIMEOUT', 600))
+
+# Rendered PDFs are cached on disk by content key, least recently used evicted first;
+# the directory defaults to report_cache under MEDIA_ROOT
+REPORT_CACHE_DIR = os.environ.get('REPORT_CACHE_DIR')
+REPORT_CACHE_MAX_BYTES = int(os.environ.get('REPORT_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+# Database threads per process used by the async API views (each holds a connection)
+ASYNC_DB_WORKERS = int(os.environ.get('ASYNC_DB_WORKERS', 8))
+
+# Per-request SQL/timing metrics, served in Prometheus format at /metrics to
+# staff users or to scrapers sending "Authorization: Bearer $METRICS_TOKEN"
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_DUPLICATE_QUERY_WARNING = int(os.environ.get('METRICS_DUPLICATE_QUERY_WARNING', 10))
+
 # Login URLs
 LOGIN_URL = 'accounts:login'
 LOGIN_REDIRECT_URL = 'dashboard'
@@ -0,0 +1,98 @@
+import re
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from transactions.models import Category, Transaction
+
+from . import metrics
+from .metrics import MetricsRegistry, QueryRecorder
+
+
+SERVER_TIMING_RE = re.compile(r'sql;dur=\d+\.\d;desc="(\d+) queries, (\d+) duplicated", app;dur=\d+\.\d')
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', 'owner@example.com', 'secret123')
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'secret123', is_staff=True)
+        food = Category.objects.create(name='Food', category_type='expense')
+        Transaction.objects.create(user=cls.user, transaction_type='expense', category=food,
+                                   amount=Decimal('12.50'), date=date.today())
+
+    def setUp(self):
+        # The middleware and the view share the module-level registry
+        patcher = mock.patch.object(metrics, 'registry', MetricsRegistry())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def server_timing(self, response):
+        match = SERVER_TIMING_RE.fullmatch(response['Server-Timing'])
+        self.assertIsNotNone(match, response['Server-Timing'])
+        return int(match[1]), int(match[2])
+
+    def test_server_timing(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('transactions:api_stats'))
+        self.assertEqual(self.server_timing(response), (len(queries), 0))
+
+    def test_counters(self):
+        self.client.force_login(self.user)
+        timings = [self.server_timing(self.client.get(reverse('transactions:api_stats'))) for _ in range(2)]
+        queries = sum(count for count, _ in timings)
+        duplicates = sum(duplicated for _, duplicated in timings)
+
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        lines = response.content.decode().splitlines()
+        labels = 'view="transactions:api_stats",method="GET"'
+        self.assertIn(f'extrackr_request_duration_seconds_count{{{labels}}} 2', lines)
+        self.assertIn(f'extrackr_request_sql_queries_count{{{labels}}} 2', lines)
+        self.assertIn(f'extrackr_request_sql_queries_sum{{{labels}}} {queries:.6f}', lines)
+        self.assertIn(f'extrackr_request_duplicate_queries_total{{{labels}}} {duplicates}', lines)
+        self.assertIn('# TYPE extrackr_request_sql_seconds_total counter', lines)
+
+    def test_registry_render(self):
+        recorder = QueryRecorder()
+        for sql in ('SELECT 1', 'SELECT x WHERE id IN (%s)', 'SELECT x WHERE id IN (%s, %s)',
+                    'SELECT x WHERE id IN (%s, %s, %s)'):
+            recorder.record(sql, 0.001)
+        self.assertEqual(recorder.duplicates(), (2, 'SELECT x WHERE id IN (...)', 3))
+
+        registry = MetricsRegistry()
+        registry.observe('reports:view"1', 'GET', 0.02, 3, 0.004, 2)
+        registry.observe('reports:view"1', 'GET', 0.3, 12, 0.25, 0)
+        lines = registry.render().splitlines()
+        labels = 'view="reports:view\\"1",method="GET"'
+        self.assertIn(f'extrackr_request_duration_seconds_bucket{{{labels},le="0.025"}} 1', lines)
+        self.assertIn(f'extrackr_request_duration_seconds_bucket{{{labels},le="0.5"}} 2', lines)
+        self.assertIn(f'extrackr_request_sql_queries_bucket{{{labels},le="5"}} 1', lines)
+        self.assertIn(f'extrackr_request_sql_queries_sum{{{labels}}} 15.000000', lines)
+        self.assertIn(f'extrackr_request_sql_seconds_total{{{labels}}} 0.254000', lines)
+        self.assertIn(f'extrackr_request_duplicate_queries_total{{{labels}}} 2', lines)
+
+    def test_access(self):
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer ').status_code, 403)
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.client.logout()
+
+        with override_settings(METRICS_TOKEN='s3cret'):
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+            self.assertEqual(self.client.get(url).status_code, 403)
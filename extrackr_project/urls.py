@@ -15,17 +15,22 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
+from django.contrib.auth.decorators import login_required
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from django.views.generic import TemplateView
 
+from .metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('', TemplateView.as_view(template_name='base/dashboard.html'), name='dashboard'),
+    # The page renders from /transactions/api/dashboard/, which needs a logged in user
+    path('', login_required(TemplateView.as_view(template_name='base/dashboard.html')), name='dashboard'),
     path('accounts/', include('accounts.urls', namespace='accounts')),
     path('transactions/', include('transactions.urls', namespace='transactions')),
     path('reports/', include('reports.urls', namespace='reports')),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 # Serve media files in development
@@ -1,3 +1,11 @@
 from django.contrib import admin
+from .models import ReportJob
 
-# Register your models here.
\ No newline at end of file
+
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ('user', 'report_type', 'format', 'status', 'created_at', 'finished_at')
+    list_filter = ('status', 'format', 'report_type', 'created_at')
+    search_fields = ('user__username', 'user__email')
+    list_select_related = ('user',)
+    readonly_fields = ('fingerprint', 'created_at', 'started_at', 'finished_at')
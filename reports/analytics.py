@@ -0,0 +1,186 @@
+"""
+Vectorized per-user analytics.
+
+A user's ledger is read once with values_list() into columnar NumPy arrays
+(integer cents, day numbers, category codes), and every metric below is
+computed from those arrays without further queries.
+"""
+from datetime import date
+
+import numpy as np
+from django.db.models import F, IntegerField
+from django.db.models.functions import Cast, Round
+from django.utils import timezone
+
+from transactions.models import Transaction
+
+
+PERCENTILES = (25, 50, 75, 90, 95)
+
+
+class Ledger:
+    """Columnar view of one user's transactions"""
+
+    def __init__(self, days, cents, categories, is_income, category_names, today=None):
+        self.days = days                  # datetime64[D]
+        self.cents = cents                # int64 amounts in cents
+        self.categories = categories      # int32 index into category_names
+        self.is_income = is_income        # bool
+        self.category_names = category_names
+        self.today = np.datetime64(today or timezone.now().date(), 'D')
+
+    @classmethod
+    def load(cls, user, today=None):
+        rows = list(
+            Transaction.objects.filter(user=user).order_by().values_list(
+                'date',
+                Cast(Round(F('amount') * 100), IntegerField()),
+                'category__name',
+                'transaction_type'
+            )
+        )
+        if rows:
+            dates, cents, names, types = zip(*rows)
+        else:
+            dates, cents, names, types = (), (), (), ()
+
+        category_names, categories = np.unique(np.array(names, dtype=object), return_inverse=True)
+        return cls(
+            days=np.array(dates, dtype='datetime64[D]'),
+            cents=np.array(cents, dtype=np.int64),
+            categories=categories.astype(np.int32),
+            is_income=np.array(types, dtype=object) == 'income',
+            category_names=[str(name) for name in category_names],
+            today=today
+        )
+
+    def __len__(self):
+        return len(self.cents)
+
+    def monthly_totals(self, months=12):
+        """Return (month starts, income cents, expense cents) for the last ``months`` months"""
+        current = self.today.astype('datetime64[M]')
+        first = current - (months - 1)
+        offsets = (self.days.astype('datetime64[M]') - first).astype(np.int64)
+        in_range = (offsets >= 0) & (offsets < months)
+
+        income = np.bincount(offsets[in_range & self.is_income],
+                             weights=self.cents[in_range & self.is_income], minlength=months)
+        expenses = np.bincount(offsets[in_range & ~self.is_income],
+                               weights=self.cents[in_range & ~self.is_income], minlength=months)
+        starts = first + np.arange(months)
+        return starts, income.astype(np.int64), expenses.astype(np.int64)
+
+    def daily_expenses(self, days=90):
+        """Expense cents per day for the last ``days`` days, oldest first"""
+        first = self.today - (days - 1)
+        offsets = (self.days - first).astype(np.int64)
+        mask = ~self.is_income & (offsets >= 0) & (offsets < days)
+        return np.bincount(offsets[mask], weights=self.cents[mask], minlength=days).astype(np.int64)
+
+    def insights(self, months=12, window=3):
+        starts, income, expenses = self.monthly_totals(months)
+
+        # Trailing averages over the previous `window` months (shorter at the start)
+        kernel = np.ones(window)
+        counts = np.convolve(np.ones(months), kernel)[:months]
+        rolling_expenses = np.convolve(expenses, kernel)[:months] / counts
+        rolling_income = np.convolve(income, kernel)[:months] / counts
+
+        expense_delta = np.diff(expenses, prepend=expenses[:1])
+        income_delta = np.diff(income, prepend=income[:1])
+        # The first month has no previous month to compare with
+        previous = np.concatenate(([np.nan], expenses[:-1]))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            expense_change = np.where(previous > 0, expense_delta / previous * 100, np.nan)
+            savings_rate = np.where(income > 0, (income - expenses) / income * 100, np.nan)
+
+        daily = self.daily_expenses(30)
+        rolling_daily = np.convolve(daily, np.ones(7))[:30] / np.minimum(np.arange(1, 31), 7)
+
+        total_income = int(income.sum())
+        total_expenses = int(expenses.sum())
+
+        return {
+            'months': [{
+                'month': str(start),
+                'income': cents_to_float(income[i]),
+                'expenses': cents_to_float(expenses[i]),
+                'rolling_income': cents_to_float(rolling_income[i]),
+                'rolling_expenses': cents_to_float(rolling_expenses[i]),
+                'income_change': cents_to_float(income_delta[i]),
+                'expense_change': cents_to_float(expense_delta[i]),
+                'expense_change_pct': none_if_nan(expense_change[i]),
+                'savings_rate': none_if_nan(savings_rate[i]),
+            } for i, start in enumerate(starts)],
+            'daily_expenses_7d_average': [cents_to_float(value) for value in rolling_daily],
+            'savings_rate': round((total_income - total_expenses) / total_income * 100, 2) if total_income else None,
+            'projection': self.projection(income, expenses, window),
+        }
+
+    def projection(self, income, expenses, window=3):
+        """Run-rate projections from the current month to date and the trailing average"""
+        today = self.today.astype(object)
+        month_start = today.replace(day=1)
+        next_month = date(today.year + today.month // 12, today.month % 12 + 1, 1)
+        elapsed = (today - month_start).days + 1
+        days_in_month = (next_month - month_start).days
+
+        completed = expenses[:-1][-window:]
+        completed_income = income[:-1][-window:]
+        average_expenses = completed.mean() if len(completed) else 0
+        average_income = completed_income.mean() if len(completed_income) else 0
+
+        return {
+            'month_to_date_expenses': cents_to_float(expenses[-1]),
+            'month_to_date_income': cents_to_float(income[-1]),
+            'projected_month_expenses': cents_to_float(expenses[-1] / elapsed * days_in_month),
+            'projected_month_income': cents_to_float(income[-1] / elapsed * days_in_month),
+            'projected_year_expenses': cents_to_float(average_expenses * 12),
+            'projected_year_income': cents_to_float(average_income * 12),
+            'projected_year_savings': cents_to_float((average_income - average_expenses) * 12),
+        }
+
+    def category_stats(self, transaction_type='expense', date_from=None):
+        """Count, total, mean and amount percentiles per category"""
+        mask = self.is_income if transaction_type == 'income' else ~self.is_income
+        if date_from is not None:
+            mask = mask & (self.days >= np.datetime64(date_from, 'D'))
+
+        categories = self.categories[mask]
+        cents = self.cents[mask]
+        if not len(cents):
+            return []
+
+        # Sort by (category, amount) once, then slice each category's run
+        order = np.lexsort((cents, categories))
+        categories = categories[order]
+        cents = cents[order]
+        boundaries = np.flatnonzero(np.diff(categories)) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [len(cents)]))
+        totals = np.add.reduceat(cents, starts)
+
+        stats = []
+        for start, end, total in zip(starts, ends, totals):
+            amounts = cents[start:end]
+            percentiles = np.percentile(amounts, PERCENTILES)
+            stats.append({
+                'category': self.category_names[categories[start]],
+                'count': int(end - start),
+                'total': cents_to_float(total),
+                'mean': cents_to_float(total / (end - start)),
+                'percentiles': {
+                    f'p{pct}': cents_to_float(value) for pct, value in zip(PERCENTILES, percentiles)
+                },
+            })
+        stats.sort(key=lambda item: item['total'], reverse=True)
+        return stats
+
+
+def cents_to_float(value):
+    return round(float(value) / 100, 2)
+
+
+def none_if_nan(value):
+    return None if np.isnan(value) else round(float(value), 2)
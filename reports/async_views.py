@@ -0,0 +1,31 @@
+"""Async variants of the analytics JSON endpoints (see transactions.async_views)"""
+from django.http import JsonResponse
+
+from transactions.caching import conditional_per_user
+from transactions.concurrency import async_login_required, run_query
+from .views import income_expense_data, income_expense_options, category_analysis_data, trends_data
+
+
+@async_login_required
+@conditional_per_user
+async def income_expense_chart(request):
+    """Get income vs expense data for charts"""
+    try:
+        options = income_expense_options(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(await run_query(income_expense_data, request.user, options))
+
+
+@async_login_required
+@conditional_per_user
+async def category_analysis(request):
+    """Get category analysis data"""
+    return JsonResponse(await run_query(category_analysis_data, request.user, request.GET))
+
+
+@async_login_required
+@conditional_per_user
+async def trends_analysis(request):
+    """Get trends analysis data"""
+    return JsonResponse(await run_query(trends_data, request.user, request.GET))
@@ -0,0 +1,87 @@
+import hashlib
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from django.conf import settings
+
+
+def make_key(*parts):
+    """Content address for a rendered artifact built from everything that affects it"""
+    return hashlib.sha256('\x1f'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+class FileCache:
+    """
+    Size-bounded on-disk cache of rendered files.
+
+    Files are stored by key and touched on every hit, so eviction removes the
+    least recently used files first once the directory grows past max_bytes.
+    """
+
+    def __init__(self, directory, max_bytes, extension=''):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.extension = extension
+        self._lock = threading.Lock()
+
+    def path(self, key):
+        return self.directory / key[:2] / f"{key}{self.extension}"
+
+    def open(self, key):
+        """Return an open binary file for a cached entry, or None on a miss"""
+        path = self.path(key)
+        try:
+            cached = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return cached
+
+    def set(self, key, data):
+        """Store data atomically under key and evict old entries if over budget"""
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+        self.evict()
+        return path
+
+    def evict(self):
+        with self._lock:
+            entries = []
+            total = 0
+            for path in self.directory.glob(f"*/*{self.extension}"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+
+_pdf_caches = {}
+
+
+def get_pdf_cache():
+    """The PDF cache for the current settings, which may be overridden at runtime"""
+    directory = Path(getattr(settings, 'REPORT_CACHE_DIR', None) or Path(settings.MEDIA_ROOT) / 'report_cache')
+    max_bytes = getattr(settings, 'REPORT_CACHE_MAX_BYTES', 512 * 1024 * 1024)
+    # One instance per location, so its eviction lock is shared by every thread
+    return _pdf_caches.setdefault((directory, max_bytes), FileCache(directory, max_bytes, extension='.pdf'))
@@ -0,0 +1,180 @@
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import IntegrityError, close_old_connections, transaction as db_transaction
+from django.utils import timezone
+
+from transactions.models import Transaction, DataVersion
+from .cache import make_key
+from .models import ReportJob
+from . import utils
+
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {
+    'pdf': 'pdf',
+    'excel': 'xlsx',
+}
+
+# Stored on failed jobs and shown to clients; the details go to the log
+FAILED_MESSAGE = 'The report could not be generated'
+
+_executor = None
+_executor_lock = threading.Lock()
+# Jobs waiting in or running on this process's pool
+_queued = set()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'REPORT_JOB_WORKERS', 2),
+                thread_name_prefix='report-job'
+            )
+    return _executor
+
+
+def submit_job(job_id):
+    """Run a job on this process's pool unless it is already queued here"""
+    with _executor_lock:
+        if job_id in _queued:
+            return
+        _queued.add(job_id)
+    get_executor().submit(run_job_in_thread, job_id)
+
+
+def requeue_stale_jobs(jobs, cutoff=None):
+    """
+    Move jobs left running since before ``cutoff`` (by default
+    REPORT_JOB_TIMEOUT seconds ago), e.g. by a restarted process, back to pending.
+    """
+    if cutoff is None:
+        cutoff = timezone.now() - timedelta(seconds=getattr(settings, 'REPORT_JOB_TIMEOUT', 600))
+    return jobs.filter(status='running', started_at__lt=cutoff).update(status='pending', started_at=None)
+
+
+def get_report_transactions(user, date_from=None, date_to=None):
+    transactions = Transaction.objects.filter(user=user)
+    if date_from:
+        transactions = transactions.filter(date__gte=date_from)
+    if date_to:
+        transactions = transactions.filter(date__lte=date_to)
+    return transactions
+
+
+def get_fingerprint(user, report_type, format_type, date_from=None, date_to=None):
+    return make_key(
+        user.pk,
+        report_type,
+        format_type,
+        date_from or '',
+        date_to or '',
+        DataVersion.objects.get_version(user)
+    )
+
+
+def find_job(fingerprint):
+    """The newest pending, running or finished job for a fingerprint, if any"""
+    return ReportJob.objects.filter(
+        fingerprint=fingerprint,
+        status__in=['pending', 'running', 'done']
+    ).order_by('-created_at').first()
+
+
+def request_report(user, report_type='summary', format_type='pdf', date_from=None, date_to=None):
+    """
+    Return a job for the requested report, reusing an identical pending,
+    running or finished job when the underlying data has not changed.
+    A reused job that a restart left stuck is queued again.
+    """
+    fingerprint = get_fingerprint(user, report_type, format_type, date_from, date_to)
+    local = getattr(settings, 'REPORT_JOBS_MODE', 'local') == 'local'
+
+    existing = find_job(fingerprint)
+    if existing is not None:
+        if existing.status == 'running' and requeue_stale_jobs(ReportJob.objects.filter(pk=existing.pk)):
+            existing.refresh_from_db()
+        if existing.status == 'pending' and local:
+            # The process that queued it may be gone; claim_job keeps a second submission from rendering twice
+            db_transaction.on_commit(lambda: submit_job(existing.pk))
+        return existing
+
+    try:
+        with db_transaction.atomic():
+            job = ReportJob.objects.create(
+                user=user,
+                report_type=report_type,
+                format=format_type,
+                date_from=date_from,
+                date_to=date_to,
+                fingerprint=fingerprint
+            )
+    except IntegrityError:
+        # An identical request was queued concurrently and may have finished since
+        return find_job(fingerprint) or ReportJob.objects.filter(fingerprint=fingerprint).latest('created_at')
+
+    if local:
+        db_transaction.on_commit(lambda: submit_job(job.pk))
+    return job
+
+
+def claim_job(job_id):
+    """Atomically move a pending job to running; False if another worker got it"""
+    return ReportJob.objects.filter(pk=job_id, status='pending').update(
+        status='running',
+        started_at=timezone.now()
+    ) == 1
+
+
+def run_job(job_id):
+    """Claim and render a single job, storing the artifact under MEDIA_ROOT"""
+    if not claim_job(job_id):
+        return None
+
+    job = None
+    try:
+        job = ReportJob.objects.select_related('user').get(pk=job_id)
+        transactions = get_report_transactions(job.user, job.date_from, job.date_to)
+        filename = utils.report_filename(job.report_type, EXTENSIONS[job.format])
+        if job.format == 'excel':
+            with tempfile.TemporaryFile() as output:
+                with utils.render_slots:
+                    utils.write_excel_report(transactions, job.report_type, job.user, output)
+                output.seek(0)
+                job.artifact.save(filename, File(output), save=False)
+        else:
+            with utils.get_pdf_report_file(transactions, job.report_type, job.user) as pdf_file:
+                job.artifact.save(filename, File(pdf_file), save=False)
+    except Exception:
+        logger.exception('Report job %s failed', job_id)
+        if job is None:
+            ReportJob.objects.filter(pk=job_id).update(
+                status='failed', error=FAILED_MESSAGE, finished_at=timezone.now()
+            )
+            return None
+        job.status = 'failed'
+        job.error = FAILED_MESSAGE
+    else:
+        job.status = 'done'
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['artifact', 'status', 'error', 'finished_at'])
+    return job
+
+
+def run_job_in_thread(job_id):
+    close_old_connections()
+    try:
+        return run_job(job_id)
+    finally:
+        with _executor_lock:
+            _queued.discard(job_id)
+        close_old_connections()
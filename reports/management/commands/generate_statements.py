@@ -0,0 +1,84 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+import multiprocessing
+import os
+import time
+
+import django
+
+from reports.models import ReportJob
+from reports.services import shift_period
+from reports.statements import month_period, queue_statements, render_statement_batch
+
+
+class Command(BaseCommand):
+    help = "Render every user's monthly statement across worker processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help='Statement month (YYYY-MM, default last month)')
+        parser.add_argument('--format', default='pdf', choices=[value for value, _ in ReportJob.FORMAT_CHOICES],
+                            help='Statement file format')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes (default one per CPU core)')
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='Statements rendered per worker task')
+        parser.add_argument('--user', action='append', dest='usernames',
+                            help='Only render statements for this user (repeatable)')
+        parser.add_argument('--force', action='store_true',
+                            help='Render statements again even if they are already done')
+
+    def handle(self, *args, **options):
+        if options['month']:
+            try:
+                month = datetime.strptime(options['month'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError(f"Invalid month: {options['month']}")
+        else:
+            month = shift_period(timezone.now().date().replace(day=1), 'monthly', -1)
+        date_from, date_to = month_period(month.year, month.month)
+
+        job_ids = queue_statements(date_from, date_to, options['format'], options['usernames'], options['force'])
+        if not job_ids:
+            self.stdout.write(self.style.SUCCESS(f'All statements for {date_from:%Y-%m} are already rendered'))
+            return
+
+        batch_size = max(1, options['batch_size'])
+        batches = [job_ids[start:start + batch_size] for start in range(0, len(job_ids), batch_size)]
+        workers = max(1, min(options['workers'], len(batches)))
+        self.stdout.write(
+            f'Rendering {len(job_ids)} {options["format"]} statements for {date_from:%Y-%m} '
+            f'with {workers} workers'
+        )
+
+        # Worker processes open their own connections; forked copies of ours must not be shared
+        connections.close_all()
+        started = time.monotonic()
+        rendered = failed = 0
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup
+        ) as executor:
+            futures = [executor.submit(render_statement_batch, batch) for batch in batches]
+            for future in as_completed(futures):
+                batch_rendered, batch_failed = future.result()
+                rendered += batch_rendered
+                failed += batch_failed
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'{rendered + failed}/{len(job_ids)} statements '
+                    f'({rendered / elapsed if elapsed else 0:.1f}/s)'
+                )
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered {rendered} statements in {elapsed:.1f}s '
+            f'({rendered / elapsed if elapsed else 0:.1f} statements/s)'
+        ))
+        if failed:
+            self.stdout.write(self.style.WARNING(
+                f'{failed} statements failed; run the command again to retry them'
+            ))
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.utils import timezone
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+from reports.jobs import requeue_stale_jobs, run_job_in_thread
+from reports.models import ReportJob
+
+
+class Command(BaseCommand):
+    help = 'Process queued report jobs outside the web workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'REPORT_JOB_WORKERS', 2),
+                            help='Number of jobs to render at once')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the queue is empty')
+        parser.add_argument('--requeue-after', type=int, default=None,
+                            help='Requeue running jobs started more than this many minutes ago (e.g. after a crash)')
+
+    def handle(self, *args, **options):
+        if options['requeue_after'] is not None:
+            cutoff = timezone.now() - timedelta(minutes=options['requeue_after'])
+            requeued = requeue_stale_jobs(ReportJob.objects.all(), cutoff)
+            if requeued:
+                self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale jobs'))
+
+        workers = max(1, options['workers'])
+        processed = 0
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='report-worker') as executor:
+            while True:
+                job_ids = list(
+                    ReportJob.objects.filter(status='pending').order_by('created_at').values_list('pk', flat=True)[:workers]
+                )
+                if not job_ids:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                # run_job claims each job atomically, so several workers can share the queue
+                results = executor.map(run_job_in_thread, job_ids)
+                processed += sum(1 for job in results if job is not None)
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} report jobs'))
@@ -1,3 +1,53 @@
 from django.db import models
+from django.contrib.auth.models import User
+from django.db.models import Q
 
-# Create your models here.
\ No newline at end of file
+
+class ReportJob(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    FORMAT_CHOICES = [
+        ('pdf', 'PDF'),
+        ('excel', 'Excel'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='report_jobs')
+    report_type = models.CharField(max_length=20, default='summary')
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='pdf')
+    date_from = models.DateField(blank=True, null=True)
+    date_to = models.DateField(blank=True, null=True)
+    fingerprint = models.CharField(max_length=64)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    artifact = models.FileField(upload_to='reports/%Y/%m/', blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'report_jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['fingerprint', 'status'], name='report_job_fingerprint_idx'),
+            models.Index(fields=['status', 'created_at'], name='report_job_queue_idx'),
+        ]
+        constraints = [
+            # At most one queued or running job per identical request
+            models.UniqueConstraint(
+                fields=['fingerprint'],
+                condition=Q(status__in=['pending', 'running']),
+                name='report_job_active_unique'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_format_display()} {self.report_type} report for {self.user_id} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in ('done', 'failed')
@@ -0,0 +1,130 @@
+from datetime import date, timedelta
+
+from django.db.models import Sum, Q
+from django.db.models.functions import TruncDay, TruncWeek, TruncMonth, TruncQuarter, TruncYear
+from django.utils import timezone
+
+from transactions.models import DailyTotal
+
+
+GRANULARITIES = {
+    'monthly': (TruncMonth, 1),
+    'quarterly': (TruncQuarter, 3),
+    'yearly': (TruncYear, 12),
+}
+
+
+def period_start(day, granularity='monthly'):
+    """Return the first day of the calendar period containing ``day``"""
+    step = GRANULARITIES[granularity][1]
+    month = (day.month - 1) // step * step + 1
+    return date(day.year, month, 1)
+
+
+def shift_period(start, granularity='monthly', steps=1):
+    """Move a period start forward (or backward) by whole calendar periods"""
+    months = start.year * 12 + start.month - 1 + GRANULARITIES[granularity][1] * steps
+    return date(months // 12, months % 12 + 1, 1)
+
+
+TREND_INTERVALS = {
+    'daily': (TruncDay, 1),
+    'weekly': (TruncWeek, 7),
+}
+
+
+def period_label(start, granularity='monthly'):
+    if granularity == 'quarterly':
+        return f"Q{(start.month - 1) // 3 + 1} {start.year}"
+    if granularity == 'yearly':
+        return str(start.year)
+    return start.strftime('%b %Y')
+
+
+def income_expense_series(user, granularity='monthly', periods=12, date_from=None, date_to=None):
+    """
+    Gap-filled income/expense totals per calendar period, from one grouped query.
+
+    The range defaults to the last ``periods`` periods ending with the current
+    one; ``date_from``/``date_to`` select an explicit range instead.
+    """
+    if granularity not in GRANULARITIES:
+        granularity = 'monthly'
+    trunc = GRANULARITIES[granularity][0]
+
+    last = period_start(date_to or timezone.now().date(), granularity)
+    if date_from:
+        first = period_start(date_from, granularity)
+    else:
+        first = shift_period(last, granularity, -(periods - 1))
+    end = shift_period(last, granularity)
+
+    rows = DailyTotal.objects.filter(
+        user=user,
+        date__gte=first,
+        date__lt=end
+    ).annotate(
+        bucket=trunc('date')
+    ).values('bucket').annotate(
+        income=Sum('total', filter=Q(transaction_type='income')),
+        expenses=Sum('total', filter=Q(transaction_type='expense'))
+    ).order_by('bucket')
+
+    totals = {row['bucket']: row for row in rows}
+
+    series = []
+    start = first
+    while start < end:
+        row = totals.get(start, {})
+        series.append({
+            'period_start': start,
+            'label': period_label(start, granularity),
+            'income': row.get('income') or 0,
+            'expenses': row.get('expenses') or 0
+        })
+        start = shift_period(start, granularity)
+
+    return series
+
+
+def trend_series(user, transaction_type, date_from, date_to=None, interval='weekly'):
+    """
+    Gap-filled totals per ISO week (Monday start) or day, grouped in SQL so the
+    work and payload depend on the number of buckets, not transactions.
+    """
+    if interval not in TREND_INTERVALS:
+        interval = 'weekly'
+    trunc, step = TREND_INTERVALS[interval]
+
+    date_to = date_to or timezone.now().date()
+    first = date_from - timedelta(days=date_from.weekday()) if interval == 'weekly' else date_from
+
+    rows = DailyTotal.objects.filter(
+        user=user,
+        transaction_type=transaction_type,
+        date__gte=date_from,
+        date__lte=date_to
+    ).annotate(
+        bucket=trunc('date')
+    ).values('bucket').annotate(
+        amount=Sum('total'),
+        count=Sum('count')
+    ).order_by('bucket')
+
+    totals = {row['bucket']: row for row in rows}
+
+    series = []
+    start = first
+    while start <= date_to:
+        row = totals.get(start, {})
+        year, week, _ = start.isocalendar()
+        series.append({
+            'period_start': start,
+            'week': start.strftime('%b %d'),
+            'iso_week': f"{year}-W{week:02d}",
+            'amount': row.get('amount') or 0,
+            'count': row.get('count') or 0
+        })
+        start += timedelta(days=step)
+
+    return series
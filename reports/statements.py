@@ -0,0 +1,212 @@
+"""
+Monthly account statements rendered in bulk.
+
+Each statement is a ReportJob (report_type 'statement') for one user, month
+and format, so a run that crashes can be resumed: finished statements are
+skipped and unfinished ones are queued again. Rendering is CPU-bound, so
+generate_statements fans batches of jobs out to worker processes. Each batch
+reads its users' opening balances and transactions in one query apiece and
+renders from memory.
+"""
+import calendar
+import io
+import logging
+from collections import namedtuple
+from datetime import date
+from itertools import groupby
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+from django.template.loader import render_to_string
+from django.utils import timezone
+import openpyxl
+from weasyprint import HTML
+
+from transactions.models import Transaction, DailyTotal, MonthlyBalance
+from .cache import make_key
+from .jobs import EXTENSIONS, FAILED_MESSAGE, claim_job
+from .models import ReportJob
+from . import utils
+
+
+logger = logging.getLogger(__name__)
+
+REPORT_TYPE = 'statement'
+
+QUEUE_CHUNK_SIZE = 1000
+
+
+def month_period(year, month):
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def statement_fingerprint(user_id, format_type, date_from, date_to):
+    return make_key(user_id, REPORT_TYPE, format_type, date_from, date_to)
+
+
+def queue_statements(date_from, date_to, format_type, usernames=None, force=False):
+    """
+    Make sure every user with transactions in the period has a pending
+    statement job and return the ids of the jobs still to render. Statements
+    already rendered are left alone unless ``force``; failed or interrupted
+    ones are queued again.
+    """
+    # Subqueries rather than id lists, which outgrow bound-parameter limits at this scale
+    active = DailyTotal.objects.filter(date__gte=date_from, date__lte=date_to)
+    if usernames:
+        active = active.filter(user__username__in=usernames)
+    active = active.values('user_id')
+
+    statements = ReportJob.objects.filter(
+        report_type=REPORT_TYPE, format=format_type, date_from=date_from, date_to=date_to, user_id__in=active
+    )
+    # A previous run that crashed leaves its statements running or failed
+    requeue = statements if force else statements.exclude(status='done')
+    requeue.update(status='pending', started_at=None, error='')
+
+    missing = User.objects.filter(pk__in=active).exclude(pk__in=statements.values('user_id')).order_by('pk')
+    while True:
+        # Users drop out of ``missing`` as their jobs are created
+        user_ids = list(missing.values_list('pk', flat=True)[:QUEUE_CHUNK_SIZE])
+        if not user_ids:
+            break
+        ReportJob.objects.bulk_create([
+            ReportJob(
+                user_id=user_id,
+                report_type=REPORT_TYPE,
+                format=format_type,
+                date_from=date_from,
+                date_to=date_to,
+                fingerprint=statement_fingerprint(user_id, format_type, date_from, date_to)
+            )
+            for user_id in user_ids
+        ])
+
+    return list(statements.filter(status='pending').order_by('user_id').values_list('pk', flat=True))
+
+
+def opening_balances(user_ids, month):
+    """Balance each user carried into ``month``, which also covers months without transactions"""
+    return MonthlyBalance.objects.balances_before(month, user_ids)
+
+
+def render_statement_batch(job_ids):
+    """
+    Render a batch of statement jobs in a worker process.
+    Returns (statements rendered, statements failed).
+    """
+    close_old_connections()
+    jobs = [job for job in ReportJob.objects.select_related('user').filter(pk__in=job_ids) if claim_job(job.pk)]
+    if not jobs:
+        return 0, 0
+
+    date_from, date_to = jobs[0].date_from, jobs[0].date_to
+    user_ids = [job.user_id for job in jobs]
+    openings = opening_balances(user_ids, date_from)
+    rows = Transaction.objects.filter(
+        user_id__in=user_ids, date__gte=date_from, date__lte=date_to
+    ).order_by('user_id', 'date', 'created_at', 'id').values_list(
+        'user_id', 'date', 'transaction_type', 'category__name', 'description', 'amount'
+    )
+    transactions = {
+        user_id: list(group)
+        for user_id, group in groupby(rows.iterator(chunk_size=5000), key=lambda row: row[0])
+    }
+
+    rendered = failed = 0
+    for job in jobs:
+        try:
+            content = render_statement(job, openings.get(job.user_id, 0), transactions.get(job.user_id, []))
+            filename = f"statement_{job.user.username}_{date_from:%Y_%m}.{EXTENSIONS[job.format]}"
+            job.artifact.save(filename, ContentFile(content), save=False)
+        except Exception:
+            logger.exception('Statement job %s failed', job.pk)
+            job.status = 'failed'
+            job.error = FAILED_MESSAGE
+            failed += 1
+        else:
+            job.status = 'done'
+            rendered += 1
+        job.finished_at = timezone.now()
+        job.save(update_fields=['artifact', 'status', 'error', 'finished_at'])
+
+    close_old_connections()
+    return rendered, failed
+
+
+StatementLine = namedtuple(
+    'StatementLine', ['date', 'type_label', 'category', 'description', 'amount', 'balance', 'transaction_type']
+)
+
+
+def statement_lines(opening, rows):
+    """Yield a StatementLine per transaction row, carrying the running balance"""
+    labels = dict(Transaction.TRANSACTION_TYPES)
+    balance = opening
+    for _, day, transaction_type, category, description, amount in rows:
+        balance = balance + amount if transaction_type == 'income' else balance - amount
+        yield StatementLine(day, labels[transaction_type], category, description or '', amount, balance, transaction_type)
+
+
+def render_statement(job, opening, rows):
+    lines = list(statement_lines(opening, rows))
+    income = sum((row[5] for row in rows if row[2] == 'income'), 0)
+    expenses = sum((row[5] for row in rows if row[2] != 'income'), 0)
+    summary = {
+        'opening': opening,
+        'income': income,
+        'expenses': expenses,
+        'closing': opening + income - expenses,
+    }
+    if job.format == 'excel':
+        return render_statement_excel(job, summary, lines)
+    return render_statement_pdf(job, summary, lines)
+
+
+def render_statement_pdf(job, summary, lines):
+    html_string = render_to_string('reports/statement.html', {
+        'user': job.user,
+        'date_from': job.date_from,
+        'date_to': job.date_to,
+        'summary': summary,
+        'lines': lines,
+        'generated_date': timezone.now(),
+    })
+    return HTML(string=html_string).write_pdf(font_config=utils.get_font_config())
+
+
+def render_statement_excel(job, summary, lines):
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet('Statement')
+    styles = utils.get_excel_styles()
+
+    widths = utils.ColumnWidths()
+    widths.track(['YYYY-MM-DD', 'Expense', 'Category', 'Description', 'Amount', 'Balance'])
+    for line in lines:
+        widths.track([None, None, line.category, line.description, f"${line.amount:,.2f}", f"${line.balance:,.2f}"])
+    widths.apply(ws)
+
+    ws.append([utils.styled(ws, f"extrackr Statement {job.date_from:%B %Y}", styles['title'])])
+    ws.append([f"User: {job.user.get_full_name() or job.user.username}"])
+    ws.append([f"Period: {job.date_from} to {job.date_to}"])
+    ws.append([])
+    for label, key in (('Opening Balance:', 'opening'), ('Income:', 'income'),
+                       ('Expenses:', 'expenses'), ('Closing Balance:', 'closing')):
+        ws.append([label, utils.styled(ws, float(summary[key]), styles['currency'])])
+    ws.append([])
+
+    ws.append([utils.styled(ws, header, styles['header']) for header in utils.EXCEL_HEADERS])
+    for line in lines:
+        ws.append([
+            utils.styled(ws, line.date, styles['date']),
+            line.type_label,
+            line.category,
+            line.description,
+            utils.styled(ws, float(line.amount), styles[line.transaction_type]),
+            utils.styled(ws, float(line.balance), styles['currency']),
+        ])
+
+    output = io.BytesIO()
+    wb.save(output)
+    return output.getvalue()
@@ -1,3 +1,473 @@
-from django.test import TestCase
+import io
+import os
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import openpyxl
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from transactions.models import Category, MonthlyBalance, Transaction
+from transactions.tests import ConstantQueryCountMixin
+
+from . import jobs, statements, utils
+from .analytics import Ledger
+from .cache import FileCache, get_pdf_cache
+from .models import ReportJob
+from .services import income_expense_series, period_label, period_start, shift_period, trend_series
+from .statements import month_period, opening_balances, queue_statements, render_statement_batch
+
+
+class PeriodTests(TestCase):
+    def test_shift_period(self):
+        self.assertEqual(shift_period(date(2024, 12, 1)), date(2025, 1, 1))
+        self.assertEqual(shift_period(date(2024, 1, 1), 'monthly', -1), date(2023, 12, 1))
+        self.assertEqual(shift_period(date(2024, 10, 1), 'quarterly'), date(2025, 1, 1))
+        self.assertEqual(shift_period(date(2024, 1, 1), 'quarterly', -1), date(2023, 10, 1))
+        self.assertEqual(shift_period(date(2024, 1, 1), 'yearly', 2), date(2026, 1, 1))
+
+    def test_period_start_and_label(self):
+        self.assertEqual(period_start(date(2024, 2, 29)), date(2024, 2, 1))
+        self.assertEqual(period_start(date(2024, 12, 31), 'quarterly'), date(2024, 10, 1))
+        self.assertEqual(period_label(date(2024, 10, 1), 'quarterly'), 'Q4 2024')
+        self.assertEqual(period_label(date(2024, 1, 1), 'yearly'), '2024')
+        self.assertEqual(period_label(date(2024, 2, 1)), 'Feb 2024')
+
+    def test_income_expense_series(self):
+        user = User.objects.create_user('owner', 'owner@example.com', 'secret123')
+        salary = Category.objects.create(name='Salary', category_type='income')
+        food = Category.objects.create(name='Food', category_type='expense')
+        for day, category, amount in [
+            (date(2024, 1, 31), salary, '1000.00'),
+            (date(2024, 2, 1), food, '40.00'),
+            (date(2024, 3, 31), food, '60.00'),
+            (date(2024, 12, 31), food, '5.00'),
+            (date(2025, 1, 1), food, '7.00'),
+        ]:
+            Transaction.objects.create(user=user, transaction_type=category.category_type,
+                                       category=category, amount=Decimal(amount), date=day)
+
+        monthly = income_expense_series(user, date_from=date(2024, 1, 1), date_to=date(2024, 4, 15))
+        self.assertEqual(
+            [(row['label'], row['income'], row['expenses']) for row in monthly],
+            [('Jan 2024', Decimal('1000.00'), 0), ('Feb 2024', 0, Decimal('40.00')),
+             ('Mar 2024', 0, Decimal('60.00')), ('Apr 2024', 0, 0)]
+        )
+
+        quarterly = income_expense_series(user, 'quarterly', periods=2, date_to=date(2025, 2, 1))
+        self.assertEqual(
+            [(row['label'], row['expenses']) for row in quarterly],
+            [('Q4 2024', Decimal('5.00')), ('Q1 2025', Decimal('7.00'))]
+        )
+
+    def test_trend_series(self):
+        user = User.objects.create_user('owner', 'owner@example.com', 'secret123')
+        food = Category.objects.create(name='Food', category_type='expense')
+        for day, amount in [(date(2024, 12, 24), '10.00'), (date(2024, 12, 31), '5.00'),
+                            (date(2025, 1, 2), '7.00'), (date(2025, 1, 14), '3.00')]:
+            Transaction.objects.create(user=user, transaction_type='expense', category=food,
+                                       amount=Decimal(amount), date=day)
+
+        # Weeks start on Monday; 2024-12-30 opens ISO week 1 of 2025
+        weekly = trend_series(user, 'expense', date(2024, 12, 25), date(2025, 1, 15))
+        self.assertEqual(
+            [(row['period_start'], row['iso_week'], row['amount'], row['count']) for row in weekly],
+            [(date(2024, 12, 23), '2024-W52', 0, 0),
+             (date(2024, 12, 30), '2025-W01', Decimal('12.00'), 2),
+             (date(2025, 1, 6), '2025-W02', 0, 0),
+             (date(2025, 1, 13), '2025-W03', Decimal('3.00'), 1)]
+        )
+        self.assertEqual(weekly[1]['week'], 'Dec 30')
+
+        daily = trend_series(user, 'expense', date(2024, 12, 30), date(2025, 1, 2), interval='daily')
+        self.assertEqual(
+            [(row['period_start'], row['amount']) for row in daily],
+            [(date(2024, 12, 30), 0), (date(2024, 12, 31), Decimal('5.00')),
+             (date(2025, 1, 1), 0), (date(2025, 1, 2), Decimal('7.00'))]
+        )
+
+    def test_income_expense_chart_parameters(self):
+        self.client.force_login(User.objects.create_user('owner', 'owner@example.com', 'secret123'))
+        url = reverse('reports:income_expense_chart')
+
+        for params in ({'months': 'abc'}, {'date_from': '2024-02-30'}, {'date_to': '2024-1-xx'}):
+            for name in ('reports:income_expense_chart', 'reports:async_income_expense_chart'):
+                response = self.client.get(reverse(name), params)
+                self.assertEqual(response.status_code, 400, (name, params))
+                self.assertIn('error', response.json())
+
+        # Out of range counts are clamped rather than walking back past year 1
+        response = self.client.get(url, {'months': 100000})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['data']), 120)
+        self.assertEqual(len(self.client.get(url, {'months': -5}).json()['data']), 1)
+
+
+class LedgerAnalyticsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', 'owner@example.com', 'secret123')
+        salary = Category.objects.create(name='Salary', category_type='income')
+        food = Category.objects.create(name='Food', category_type='expense')
+        rent = Category.objects.create(name='Rent', category_type='expense')
+        for day, category, amount in [
+            (date(2023, 12, 31), food, '999.00'),
+            (date(2024, 1, 5), salary, '1000.00'),
+            (date(2024, 1, 10), food, '100.00'),
+            (date(2024, 1, 20), food, '50.00'),
+            (date(2024, 2, 5), salary, '1000.00'),
+            (date(2024, 2, 14), food, '300.00'),
+            (date(2024, 2, 29), rent, '0.10'),
+            (date(2024, 3, 10), food, '31.00'),
+        ]:
+            Transaction.objects.create(user=cls.user, transaction_type=category.category_type,
+                                       category=category, amount=Decimal(amount), date=day)
+
+    def setUp(self):
+        self.ledger = Ledger.load(self.user, today=date(2024, 3, 10))
+
+    def test_monthly_totals(self):
+        starts, income, expenses = self.ledger.monthly_totals(3)
+        self.assertEqual([str(start) for start in starts], ['2024-01', '2024-02', '2024-03'])
+        self.assertEqual(income.tolist(), [100000, 100000, 0])
+        self.assertEqual(expenses.tolist(), [15000, 30010, 3100])
+
+    def test_insights(self):
+        insights = self.ledger.insights(months=3, window=2)
+        months = insights['months']
+        self.assertEqual([month['rolling_expenses'] for month in months], [150.0, 225.05, 165.55])
+        self.assertEqual([month['expense_change_pct'] for month in months], [None, 100.07, -89.67])
+        self.assertEqual([month['savings_rate'] for month in months], [85.0, 69.99, None])
+        self.assertAlmostEqual(insights['savings_rate'], 75.95, places=1)
+        self.assertEqual(insights['daily_expenses_7d_average'][-1], 4.43)
+        self.assertEqual(insights['projection'], {
+            'month_to_date_expenses': 31.0,
+            'month_to_date_income': 0.0,
+            'projected_month_expenses': 96.1,
+            'projected_month_income': 0.0,
+            'projected_year_expenses': 2700.6,
+            'projected_year_income': 12000.0,
+            'projected_year_savings': 9299.4,
+        })
+
+    def test_category_stats(self):
+        food, rent = self.ledger.category_stats('expense', date(2024, 1, 1))
+        self.assertEqual((food['category'], food['count'], food['total'], food['mean']), ('Food', 4, 481.0, 120.25))
+        self.assertEqual(food['percentiles']['p50'], 75.0)
+        self.assertEqual((rent['category'], rent['total']), ('Rent', 0.1))
+        self.assertEqual(self.ledger.category_stats('income')[0]['total'], 2000.0)
+        self.assertEqual(Ledger.load(User.objects.create_user('empty')).category_stats(), [])
+
+    def test_category_statistics_parameters(self):
+        self.client.force_login(self.user)
+        url = reverse('reports:category_stats')
+        response = self.client.get(url, {'type': 'income', 'date_from': '2024-01-01'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data'][0]['total'], 2000.0)
+
+        for params in ({'date_from': '2024-13-01'}, {'date_from': 'yesterday'}, {'type': 'transfer'}):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('error', response.json())
+
+
+def render_rows(template_name, context):
+    """Stand-in for the PDF template: reads every row the way its loop does"""
+    return ''.join(
+        f'{transaction.date} {transaction.category.name} {transaction.description}'
+        for transaction in context['transactions']
+    )
+
+
+class ExportQueryCountTests(ConstantQueryCountMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', 'owner@example.com', 'secret123')
+        cls.categories = [
+            Category.objects.create(name=f'Category {number}', category_type='expense')
+            for number in range(12)
+        ]
+
+    def add_transactions(self, offset, count):
+        for number in range(offset, offset + count):
+            Transaction.objects.create(
+                user=self.user,
+                transaction_type='expense',
+                category=self.categories[number % len(self.categories)],
+                amount=Decimal('12.50'),
+                description=f'Groceries {number}',
+                date=date.today() - timedelta(days=number)
+            )
+
+    def transactions(self):
+        return Transaction.objects.filter(user=self.user)
+
+    def test_pdf_report(self):
+        with mock.patch.object(utils, 'render_to_string', side_effect=render_rows), \
+                mock.patch.object(utils, 'HTML'):
+            self.assertConstantQueries(
+                lambda: utils.render_pdf_report(self.transactions(), 'summary', self.user),
+                self.add_transactions
+            )
+
+    def test_excel_report(self):
+        self.assertConstantQueries(
+            lambda: utils.write_excel_report(self.transactions(), 'summary', self.user, io.BytesIO()),
+            self.add_transactions
+        )
+
+
+class TemporaryMediaMixin:
+    """Stores files in a MEDIA_ROOT created for the test class and removed after it"""
+
+    @classmethod
+    def setUpClass(cls):
+        media_root = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(media_root.cleanup)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=media_root.name, REPORT_CACHE_DIR=None))
+        super().setUpClass()
+
+
+class PdfCacheTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', 'owner@example.com', 'secret123')
+        cls.food = Category.objects.create(name='Food', category_type='expense')
+        Transaction.objects.create(user=cls.user, transaction_type='expense', category=cls.food,
+                                   amount=Decimal('12.50'), date=date(2024, 3, 1))
+
+    def fetch(self, **filters):
+        transactions = Transaction.objects.filter(user=self.user, **filters)
+        with utils.get_pdf_report_file(transactions, 'summary', self.user) as pdf:
+            return pdf.read()
+
+    @mock.patch.object(utils, 'render_pdf_report', side_effect=[b'%PDF-1', b'%PDF-2', b'%PDF-3'])
+    def test_hit_and_invalidation(self, render):
+        self.assertEqual(self.fetch(), b'%PDF-1')
+        self.assertEqual(self.fetch(), b'%PDF-1')
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(get_pdf_cache().directory, Path(settings.MEDIA_ROOT) / 'report_cache')
+        self.assertEqual(len(list(get_pdf_cache().directory.glob('*/*.pdf'))), 1)
+
+        # Other filters are another report
+        self.assertEqual(self.fetch(transaction_type='income'), b'%PDF-2')
+
+        # Any write to the user's data changes the key
+        Transaction.objects.create(user=self.user, transaction_type='expense', category=self.food,
+                                   amount=Decimal('1.00'), date=date(2024, 3, 2))
+        self.assertEqual(self.fetch(), b'%PDF-3')
+        self.assertEqual(render.call_count, 3)
+
+    def test_least_recently_used_are_evicted(self):
+        cache = FileCache(Path(settings.MEDIA_ROOT) / 'lru', max_bytes=20, extension='.pdf')
+        for age, key in enumerate(['aa1', 'bb2', 'cc3']):
+            os.utime(cache.set(key, b'x' * 6), (1000 + age, 1000 + age))
+
+        # Reading an entry makes it the most recently used
+        with cache.open('aa1') as cached:
+            self.assertEqual(cached.read(), b'x' * 6)
+        cache.set('dd4', b'x' * 6)
+
+        self.assertEqual([cache.path(key).exists() for key in ('aa1', 'bb2', 'cc3', 'dd4')],
+                         [True, False, True, True])
+
+
+class StatementTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        salary = Category.objects.create(name='Salary', category_type='income')
+        food = Category.objects.create(name='Food', category_type='expense')
+        cls.users = [User.objects.create_user(f'user{number}', password='secret123') for number in range(3)]
+        for user in cls.users[:2]:
+            Transaction.objects.create(user=user, transaction_type='income', category=salary,
+                                       amount=Decimal('500.00'), date=date(2024, 5, 28))
+            Transaction.objects.create(user=user, transaction_type='expense', category=food,
+                                       amount=Decimal('20.00'), date=date(2024, 6, 3))
+        cls.period = month_period(2024, 6)
+
+    def test_statements_resume(self):
+        job_ids = queue_statements(*self.period, 'excel')
+        self.assertEqual(len(job_ids), 2)
+        self.assertEqual(render_statement_batch(job_ids), (2, 0))
+
+        job = ReportJob.objects.get(user=self.users[0], report_type='statement')
+        self.assertEqual(job.status, 'done')
+        # Storage suffixes the name when another test already rendered this statement
+        self.assertRegex(job.artifact.name, r'statement_user0_2024_06(_\w+)?\.xlsx$')
+        rows = list(openpyxl.load_workbook(job.artifact.path).active.values)
+        self.assertIn(('Opening Balance:', 500.0, None, None, None, None), rows)
+        self.assertEqual(rows[-1][-1], 480.0)
+
+        # Only statements left unfinished by an interrupted run are queued again
+        ReportJob.objects.filter(pk=job.pk).update(status='running')
+        self.assertEqual(queue_statements(*self.period, 'excel'), [job.pk])
+        self.assertEqual(len(queue_statements(*self.period, 'excel', force=True)), 2)
+
+    def test_queue_uses_subqueries(self):
+        with mock.patch.object(statements, 'QUEUE_CHUNK_SIZE', 1), \
+                CaptureQueriesContext(connection) as queries:
+            job_ids = queue_statements(*self.period, 'pdf')
+        self.assertEqual(len(job_ids), 2)
+        self.assertEqual(sorted(ReportJob.objects.filter(pk__in=job_ids).values_list('user__username', flat=True)),
+                         ['user0', 'user1'])
+        # Users are never sent to the database as literal id lists
+        for query in queries:
+            self.assertNotRegex(query['sql'], r'"(user_)?id" IN \(\d')
+        self.assertEqual(queue_statements(*self.period, 'pdf', usernames=['user1']),
+                         list(ReportJob.objects.filter(user=self.users[1]).values_list('pk', flat=True)))
+
+    def test_opening_balance_from_earlier_months(self):
+        # The statement month's own row plays no part; the opening is the net of the months before it
+        MonthlyBalance.objects.filter(month=date(2024, 6, 1)).delete()
+        MonthlyBalance.objects.filter(user=self.users[0], month=date(2024, 5, 1)).update(expense=Decimal('20.00'))
+        self.assertEqual(opening_balances([user.pk for user in self.users], date(2024, 6, 1)),
+                         {self.users[0].pk: Decimal('480.00'), self.users[1].pk: Decimal('500.00')})
+
+        render_statement_batch(queue_statements(*self.period, 'excel'))
+        job = ReportJob.objects.get(user=self.users[0], report_type='statement')
+        rows = list(openpyxl.load_workbook(job.artifact.path).active.values)
+        self.assertIn(('Opening Balance:', 480.0, None, None, None, None), rows)
+        self.assertEqual(rows[-1][-1], 460.0)
+
+    def test_failed_statement_is_logged(self):
+        job_ids = queue_statements(*self.period, 'excel')
+        with mock.patch.object(statements, 'render_statement', side_effect=ValueError('broken')), \
+                self.assertLogs('reports.statements', 'ERROR') as logs:
+            self.assertEqual(render_statement_batch(job_ids), (0, 2))
+        self.assertIn('broken', logs.output[0])
+        self.assertEqual(set(ReportJob.objects.filter(pk__in=job_ids).values_list('status', 'error')),
+                         {('failed', jobs.FAILED_MESSAGE)})
+
+
+@override_settings(REPORT_JOBS_MODE='local')
+class ReportJobTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', 'owner@example.com', 'secret123')
+        cls.other = User.objects.create_user('other', 'other@example.com', 'secret123')
+        cls.food = Category.objects.create(name='Food', category_type='expense')
+        Transaction.objects.create(user=cls.user, transaction_type='expense', category=cls.food,
+                                   amount=Decimal('12.50'), date=date(2024, 3, 1))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def create_job(self, **data):
+        with mock.patch.object(jobs, 'submit_job') as submit_job, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('reports:create_job'), {'format': 'excel', **data})
+        return response, submit_job
+
+    def test_identical_requests_share_a_job(self):
+        response, submit_job = self.create_job()
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['id']
+        submit_job.assert_called_once_with(job_id)
+
+        response, _ = self.create_job()
+        self.assertEqual(response.json()['id'], job_id)
+        self.assertNotEqual(self.create_job(date_from='2024-01-01')[0].json()['id'], job_id)
+
+        # Any write to the user's data changes the fingerprint
+        Transaction.objects.create(user=self.user, transaction_type='expense', category=self.food,
+                                   amount=Decimal('3.00'), date=date(2024, 3, 2))
+        self.assertNotEqual(self.create_job()[0].json()['id'], job_id)
+
+        self.assertEqual(self.client.post(reverse('reports:create_job'), {'format': 'csv'}).status_code, 400)
+
+    def test_one_active_job_per_fingerprint(self):
+        job = jobs.request_report(self.user, format_type='excel')
+        ReportJob.objects.create(user=self.user, fingerprint=job.fingerprint, status='done')
+        ReportJob.objects.create(user=self.user, fingerprint=job.fingerprint, status='failed')
+        with self.assertRaises(IntegrityError):
+            ReportJob.objects.create(user=self.user, fingerprint=job.fingerprint, status='running')
+
+    def test_status_and_download(self):
+        job_id = self.create_job()[0].json()['id']
+        status_url = reverse('reports:job_status', args=[job_id])
+        download_url = reverse('reports:job_download', args=[job_id])
+
+        self.assertEqual(self.client.get(status_url).json()['status'], 'pending')
+        self.assertEqual(self.client.get(download_url).status_code, 404)
+
+        self.assertEqual(jobs.run_job(job_id).status, 'done')
+        self.assertIsNone(jobs.run_job(job_id))
+        data = self.client.get(status_url).json()
+        self.assertEqual((data['status'], data['download_url']), ('done', download_url))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(download_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sum('"report_jobs"' in query['sql'] for query in queries), 1)
+        rows = list(openpyxl.load_workbook(io.BytesIO(b''.join(response.streaming_content))).active.values)
+        self.assertTrue(any('Food' in row for row in rows))
+        response = self.client.get(download_url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        # Jobs are private to their owner
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(status_url).status_code, 404)
+        self.assertEqual(self.client.get(download_url).status_code, 404)
+
+    def test_stuck_jobs_are_queued_again(self):
+        job = jobs.request_report(self.user, format_type='excel')
+        ReportJob.objects.filter(pk=job.pk).update(
+            status='running', started_at=timezone.now() - timedelta(hours=1)
+        )
+        with mock.patch.object(jobs, 'submit_job') as submit_job, \
+                self.captureOnCommitCallbacks(execute=True):
+            again = jobs.request_report(self.user, format_type='excel')
+        self.assertEqual((again.pk, again.status), (job.pk, 'pending'))
+        submit_job.assert_called_once_with(job.pk)
+
+        # A job that is still rendering is left alone
+        ReportJob.objects.filter(pk=job.pk).update(status='running', started_at=timezone.now())
+        with mock.patch.object(jobs, 'submit_job') as submit_job, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(jobs.request_report(self.user, format_type='excel').status, 'running')
+        submit_job.assert_not_called()
+
+        # Failed jobs are not reused
+        ReportJob.objects.filter(pk=job.pk).update(status='failed')
+        self.assertNotEqual(jobs.request_report(self.user, format_type='excel').pk, job.pk)
+
+    def test_invalid_parameters(self):
+        for data in ({'date_from': '2024-02-30'}, {'date_to': 'soon'}, {'report_type': 'x' * 21}):
+            response, submit_job = self.create_job(**data)
+            self.assertEqual(response.status_code, 400, data)
+            self.assertIn('error', response.json())
+            submit_job.assert_not_called()
+        self.assertFalse(ReportJob.objects.exists())
+
+    def test_failures_are_logged_not_shown(self):
+        job_id = self.create_job()[0].json()['id']
+        with mock.patch.object(utils, 'write_excel_report', side_effect=OSError('/srv/private/path')), \
+                self.assertLogs('reports.jobs', 'ERROR') as logs:
+            self.assertEqual(jobs.run_job(job_id).status, 'failed')
+        self.assertIn('/srv/private/path', logs.output[0])
+        data = self.client.get(reverse('reports:job_status', args=[job_id])).json()
+        self.assertEqual((data['status'], data['error']), ('failed', jobs.FAILED_MESSAGE))
+
+        # Failures before rendering starts do not leave the job running
+        job_id = self.create_job(date_from='2024-01-01')[0].json()['id']
+        with mock.patch.object(jobs, 'get_report_transactions', side_effect=RuntimeError('gone')), \
+                self.assertLogs('reports.jobs', 'ERROR'):
+            jobs.run_job(job_id)
+        self.assertEqual(ReportJob.objects.get(pk=job_id).status, 'failed')
+
+    def test_concurrent_request_that_already_finished(self):
+        job = jobs.request_report(self.user, format_type='excel')
+        ReportJob.objects.filter(pk=job.pk).update(status='done')
+        done = ReportJob.objects.get(pk=job.pk)
+        # Lost the race to create the job, and the winner finished before the fallback lookup
+        with mock.patch.object(jobs, 'find_job', side_effect=[None, done]), \
+                mock.patch.object(ReportJob.objects, 'create', side_effect=IntegrityError):
+            self.assertEqual(jobs.request_report(self.user, format_type='excel'), done)
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import views, async_views
 
 app_name = 'reports'
 
@@ -12,9 +12,21 @@ urlpatterns = [
     path('pdf/', views.generate_pdf_report, name='pdf_report'),
     path('excel/', views.generate_excel_report, name='excel_report'),
     
+    # Background report jobs
+    path('jobs/', views.create_report_job, name='create_job'),
+    path('jobs/<int:pk>/', views.report_job_status, name='job_status'),
+    path('jobs/<int:pk>/download/', views.download_report_job, name='job_download'),
+    
     # Analytics
     path('analytics/', views.analytics_dashboard, name='analytics'),
     path('analytics/income-expense/', views.income_expense_chart, name='income_expense_chart'),
     path('analytics/category-analysis/', views.category_analysis, name='category_analysis'),
     path('analytics/trends/', views.trends_analysis, name='trends_analysis'),
+    path('analytics/insights/', views.analytics_insights, name='insights'),
+    path('analytics/category-stats/', views.category_statistics, name='category_stats'),
+    
+    # Async variants of the analytics API for ASGI deployments
+    path('analytics/async/income-expense/', async_views.income_expense_chart, name='async_income_expense_chart'),
+    path('analytics/async/category-analysis/', async_views.category_analysis, name='async_category_analysis'),
+    path('analytics/async/trends/', async_views.trends_analysis, name='async_trends_analysis'),
 ]
\ No newline at end of file
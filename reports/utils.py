@@ -1,44 +1,65 @@
-from django.http import HttpResponse
+from django.conf import settings
+from django.http import FileResponse
 from django.template.loader import render_to_string
 from django.utils import timezone
-from django.db.models import Sum
+from django.db.models import Count, Sum, Max, Min, Q
+from django.db.models.functions import Length
 from datetime import datetime
+import io
+import tempfile
+import threading
 import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, NamedStyle
+from openpyxl.utils import get_column_letter
 from weasyprint import HTML
 from weasyprint.text.fonts import FontConfiguration
 
+from transactions.models import Transaction, DataVersion
+from .cache import get_pdf_cache, make_key
 
-def generate_pdf_report(transactions, report_type, user):
-    """Generate PDF report"""
-    
-    # Calculate summary data
-    income_total = transactions.filter(transaction_type='income').aggregate(
-        total=Sum('amount')
-    )['total'] or 0
-    
-    expense_total = transactions.filter(transaction_type='expense').aggregate(
-        total=Sum('amount')
-    )['total'] or 0
+
+_pdf_setup = threading.local()
+
+# Caps concurrent WeasyPrint/openpyxl renders in this process, whether a request or a report job runs them
+render_slots = threading.BoundedSemaphore(getattr(settings, 'REPORT_MAX_CONCURRENT_RENDERS', 2))
+
+
+def get_font_config():
+    """FontConfiguration is expensive to build, so each rendering thread keeps one"""
+    if not hasattr(_pdf_setup, 'font_config'):
+        _pdf_setup.font_config = FontConfiguration()
+    return _pdf_setup.font_config
+
+
+def report_filename(report_type, extension):
+    return f"extrackr_report_{report_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+
+
+def render_pdf_report(transactions, report_type, user):
+    """Render the PDF report and return its bytes"""
     
+    # Calculate summary data and date range in one query
+    totals = transactions.aggregate(
+        income=Sum('amount', filter=Q(transaction_type='income')),
+        expenses=Sum('amount', filter=Q(transaction_type='expense')),
+        first_date=Min('date'),
+        last_date=Max('date'),
+        count=Count('id')
+    )
+    income_total = totals['income'] or 0
+    expense_total = totals['expenses'] or 0
     net_balance = income_total - expense_total
     
-    # Get date range
-    if transactions.exists():
-        date_range = {
-            'from': transactions.order_by('date').first().date,
-            'to': transactions.order_by('date').last().date
-        }
-    else:
-        date_range = {
-            'from': timezone.now().date(),
-            'to': timezone.now().date()
-        }
+    date_range = {
+        'from': totals['first_date'] or timezone.now().date(),
+        'to': totals['last_date'] or timezone.now().date()
+    }
     
-    # Prepare context
+    # Prepare context; the template reads each row's category, so join it in
     context = {
         'user': user,
-        'transactions': transactions,
+        'transactions': transactions.for_listing(),
         'report_type': report_type,
         'date_range': date_range,
         'generated_date': timezone.now(),
@@ -46,7 +67,7 @@ def generate_pdf_report(transactions, report_type, user):
             'income': income_total,
             'expenses': expense_total,
             'net_balance': net_balance,
-            'total_transactions': transactions.count()
+            'total_transactions': totals['count']
         }
     }
     
@@ -54,144 +75,193 @@ def generate_pdf_report(transactions, report_type, user):
     html_string = render_to_string('reports/pdf_template.html', context)
     
     # Generate PDF
-    font_config = FontConfiguration()
     html = HTML(string=html_string)
-    pdf_file = html.write_pdf(font_config=font_config)
-    
-    # Create response
-    response = HttpResponse(pdf_file, content_type='application/pdf')
-    filename = f"extrackr_report_{report_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    return response
+    return html.write_pdf(font_config=get_font_config())
 
 
-def generate_excel_report(transactions, report_type, user):
-    """Generate Excel report"""
+def get_pdf_report_file(transactions, report_type, user):
+    """Open the PDF for this report, running WeasyPrint only on a cache miss"""
+    # The SQL pins down user and filters; the data version changes on any write
+    sql, params = transactions.query.sql_with_params()
+    key = make_key('pdf', user.pk, report_type, sql, params, DataVersion.objects.get_version(user))
     
-    # Create workbook and worksheet
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Financial Report"
+    cache = get_pdf_cache()
+    cached = cache.open(key)
+    if cached is not None:
+        return cached
     
-    # Define styles
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    total_font = Font(bold=True)
+    with render_slots:
+        pdf_file = render_pdf_report(transactions, report_type, user)
+    cache.set(key, pdf_file)
+    return io.BytesIO(pdf_file)
+
+
+def generate_pdf_report(transactions, report_type, user):
+    """Generate PDF report"""
+    pdf_file = get_pdf_report_file(transactions, report_type, user)
+    filename = report_filename(report_type, 'pdf')
+    return FileResponse(pdf_file, as_attachment=True, filename=filename, content_type='application/pdf')
+
+
+EXCEL_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+EXCEL_HEADERS = ['Date', 'Type', 'Category', 'Description', 'Amount', 'Balance']
+CURRENCY_FORMAT = '"$"#,##0.00'
+MAX_COLUMN_WIDTH = 50
+
+
+def get_excel_styles():
+    """Named styles shared by every cell of a report, registered once per workbook"""
     income_fill = PatternFill(start_color="D5E8D4", end_color="D5E8D4", fill_type="solid")
     expense_fill = PatternFill(start_color="F8CECC", end_color="F8CECC", fill_type="solid")
+    return {
+        'title': NamedStyle(name='extrackr_title', font=Font(size=16, bold=True)),
+        'section': NamedStyle(name='extrackr_section', font=Font(size=14, bold=True)),
+        'header': NamedStyle(
+            name='extrackr_header',
+            font=Font(bold=True, color="FFFFFF"),
+            fill=PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+        ),
+        'date': NamedStyle(name='extrackr_date', number_format='YYYY-MM-DD'),
+        'currency': NamedStyle(name='extrackr_currency', number_format=CURRENCY_FORMAT),
+        'income': NamedStyle(name='extrackr_income', number_format=CURRENCY_FORMAT, fill=income_fill),
+        'expense': NamedStyle(name='extrackr_expense', number_format=CURRENCY_FORMAT, fill=expense_fill),
+        'total_label': NamedStyle(name='extrackr_total_label', font=Font(bold=True)),
+        'total': NamedStyle(
+            name='extrackr_total', number_format=CURRENCY_FORMAT, font=Font(bold=True), fill=income_fill
+        ),
+    }
+
+
+class ColumnWidths:
+    """Track the widest value per column as rows are produced"""
+
+    def __init__(self):
+        self.widths = {}
+
+    def track(self, values):
+        for col, value in enumerate(values, 1):
+            if value is not None:
+                self.track_length(col, len(str(value)))
+
+    def track_length(self, col, length):
+        if length > self.widths.get(col, 0):
+            self.widths[col] = length
+
+    def apply(self, ws):
+        for col, length in self.widths.items():
+            ws.column_dimensions[get_column_letter(col)].width = min(length + 2, MAX_COLUMN_WIDTH)
+
+
+def styled(ws, value, style):
+    cell = WriteOnlyCell(ws, value=value)
+    cell.style = style
+    return cell
+
+
+def write_excel_report(transactions, report_type, user, output):
+    """Write the Excel report to a binary file object"""
     
-    # Header information
-    ws['A1'] = f"extrackr Financial Report"
-    ws['A1'].font = Font(size=16, bold=True)
-    ws.merge_cells('A1:F1')
-    
-    ws['A2'] = f"User: {user.get_full_name() or user.username}"
-    ws['A3'] = f"Report Type: {report_type.title()}"
-    ws['A4'] = f"Generated: {timezone.now().strftime('%Y-%m-%d %H:%M:%S')}"
-    
-    # Add empty row
-    ws.append([])
+    # Write-only workbook: rows are streamed to the output instead of kept in memory
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Financial Report")
+    styles = get_excel_styles()
     
     # Summary section
-    income_total = transactions.filter(transaction_type='income').aggregate(
-        total=Sum('amount')
-    )['total'] or 0
-    
-    expense_total = transactions.filter(transaction_type='expense').aggregate(
-        total=Sum('amount')
-    )['total'] or 0
-    
+    totals = transactions.aggregate(
+        income=Sum('amount', filter=Q(transaction_type='income')),
+        expenses=Sum('amount', filter=Q(transaction_type='expense')),
+        description_length=Max(Length('description')),
+        category_length=Max(Length('category__name'))
+    )
+    income_total = totals['income'] or 0
+    expense_total = totals['expenses'] or 0
     net_balance = income_total - expense_total
     
-    summary_start_row = ws.max_row + 1
-    ws[f'A{summary_start_row}'] = "Summary"
-    ws[f'A{summary_start_row}'].font = Font(size=14, bold=True)
+    header_rows = [
+        ["extrackr Financial Report"],
+        [f"User: {user.get_full_name() or user.username}"],
+        [f"Report Type: {report_type.title()}"],
+        [f"Generated: {timezone.now().strftime('%Y-%m-%d %H:%M:%S')}"],
+        [],
+        ["Summary"],
+        ["Total Income:", float(income_total)],
+        ["Total Expenses:", float(expense_total)],
+        ["Net Balance:", float(net_balance)],
+        [],
+        EXCEL_HEADERS,
+    ]
     
-    ws[f'A{summary_start_row + 1}'] = "Total Income:"
-    ws[f'B{summary_start_row + 1}'] = float(income_total)
-    ws[f'B{summary_start_row + 1}'].number_format = '"$"#,##0.00'
+    # Column widths must be set before the first row is streamed, so they are
+    # tracked from the fixed rows plus the longest text values in the data
+    widths = ColumnWidths()
+    for row in header_rows[1:]:
+        widths.track([f"${value:,.2f}" if isinstance(value, float) else value for value in row])
+    largest = f"-${float(income_total + expense_total):,.2f}"
+    widths.track(['YYYY-MM-DD', max((label for _, label in Transaction.TRANSACTION_TYPES), key=len)])
+    widths.track_length(3, totals['category_length'] or 0)
+    widths.track_length(4, totals['description_length'] or 0)
+    widths.track_length(5, len(largest))
+    widths.track_length(6, len(largest))
+    widths.apply(ws)
     
-    ws[f'A{summary_start_row + 2}'] = "Total Expenses:"
-    ws[f'B{summary_start_row + 2}'] = float(expense_total)
-    ws[f'B{summary_start_row + 2}'].number_format = '"$"#,##0.00'
-    
-    ws[f'A{summary_start_row + 3}'] = "Net Balance:"
-    ws[f'B{summary_start_row + 3}'] = float(net_balance)
-    ws[f'B{summary_start_row + 3}'].number_format = '"$"#,##0.00'
+    # Header information
+    ws.append([styled(ws, header_rows[0][0], styles['title'])])
+    ws.merged_cells.add('A1:F1')
+    for row in header_rows[1:5]:
+        ws.append(row)
     
-    # Add empty row
+    ws.append([styled(ws, "Summary", styles['section'])])
+    for label, value in header_rows[6:9]:
+        ws.append([label, styled(ws, value, styles['currency'])])
     ws.append([])
     
     # Transactions header
-    header_row = ws.max_row + 1
-    headers = ['Date', 'Type', 'Category', 'Description', 'Amount', 'Balance']
+    ws.append([styled(ws, header, styles['header']) for header in EXCEL_HEADERS])
     
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=header_row, column=col)
-        cell.value = header
-        cell.font = header_font
-        cell.fill = header_fill
-    
-    # Add transactions
-    current_row = header_row + 1
+    # Add transactions; plain tuples with the category name joined in, no model instances
     running_balance = 0
+    type_labels = dict(Transaction.TRANSACTION_TYPES)
+    rows = transactions.values_list(
+        'date', 'transaction_type', 'amount', 'description', 'category__name'
+    ).order_by('date', 'created_at', 'id')
     
-    for transaction in transactions.order_by('date'):
-        ws.cell(row=current_row, column=1, value=transaction.date)
-        ws.cell(row=current_row, column=1).number_format = 'YYYY-MM-DD'
-        
-        ws.cell(row=current_row, column=2, value=transaction.get_transaction_type_display())
-        ws.cell(row=current_row, column=3, value=transaction.category.name)
-        ws.cell(row=current_row, column=4, value=transaction.description or '')
-        
-        amount = float(transaction.amount)
-        ws.cell(row=current_row, column=5, value=amount)
-        ws.cell(row=current_row, column=5).number_format = '"$"#,##0.00'
+    for date, transaction_type, amount, description, category_name in rows.iterator(chunk_size=2000):
+        amount = float(amount)
         
         # Update running balance
-        if transaction.transaction_type == 'income':
+        if transaction_type == 'income':
             running_balance += amount
-            ws.cell(row=current_row, column=5).fill = income_fill
+            amount_style = styles['income']
         else:
             running_balance -= amount
-            ws.cell(row=current_row, column=5).fill = expense_fill
+            amount_style = styles['expense']
         
-        ws.cell(row=current_row, column=6, value=running_balance)
-        ws.cell(row=current_row, column=6).number_format = '"$"#,##0.00'
-        
-        current_row += 1
+        ws.append([
+            styled(ws, date, styles['date']),
+            type_labels[transaction_type],
+            category_name,
+            description or '',
+            styled(ws, amount, amount_style),
+            styled(ws, running_balance, styles['currency']),
+        ])
     
     # Add totals row
-    totals_row = current_row
-    ws.cell(row=totals_row, column=4, value="TOTALS")
-    ws.cell(row=totals_row, column=4).font = total_font
-    
-    # Income total
-    ws.cell(row=totals_row, column=5, value=float(income_total))
-    ws.cell(row=totals_row, column=5).number_format = '"$"#,##0.00'
-    ws.cell(row=totals_row, column=5).font = total_font
-    ws.cell(row=totals_row, column=5).fill = income_fill
-    
-    # Auto-adjust column widths
-    for column in ws.columns:
-        max_length = 0
-        column_letter = column[0].column_letter
-        
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column_letter].width = adjusted_width
+    ws.append([
+        None, None, None,
+        styled(ws, "TOTALS", styles['total_label']),
+        styled(ws, float(income_total), styles['total']),
+    ])
     
-    # Create response
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    filename = f"extrackr_report_{report_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    wb.save(output)
+
+
+def generate_excel_report(transactions, report_type, user):
+    """Generate Excel report"""
+    # Stream the saved file from disk
+    output = tempfile.TemporaryFile()
+    with render_slots:
+        write_excel_report(transactions, report_type, user, output)
+    output.seek(0)
     
-    wb.save(response)
-    return response
\ No newline at end of file
+    filename = report_filename(report_type, 'xlsx')
+    return FileResponse(output, as_attachment=True, filename=filename, content_type=EXCEL_CONTENT_TYPE)
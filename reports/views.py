@@ -1,14 +1,24 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
 from django.db.models import Sum, Q
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from datetime import timedelta
 from datetime import datetime
 import json
 
-from transactions.models import Transaction, Category, Budget
-from .utils import generate_pdf_report, generate_excel_report
+from transactions.models import Transaction, Category, Budget, DailyTotal
+from . import utils
+from .jobs import request_report
+from .models import ReportJob
+from .services import income_expense_series, trend_series
+from .analytics import Ledger
+from transactions.caching import cache_per_user_version, conditional_per_user
 
 
 @login_required
@@ -35,14 +45,15 @@ def generate_report(request):
             transactions = transactions.filter(date__lte=date_to)
         
         if format_type == 'pdf':
-            return generate_pdf_report(transactions, report_type, request.user)
+            return utils.generate_pdf_report(transactions, report_type, request.user)
         elif format_type == 'excel':
-            return generate_excel_report(transactions, report_type, request.user)
+            return utils.generate_excel_report(transactions, report_type, request.user)
     
     return render(request, 'reports/generate.html')
 
 
 @login_required
+@conditional_per_user
 def generate_pdf_report(request):
     """Generate PDF report"""
     # Get parameters
@@ -59,11 +70,12 @@ def generate_pdf_report(request):
         transactions = transactions.filter(date__lte=date_to)
     
     # Generate PDF
-    response = generate_pdf_report(transactions, report_type, request.user)
+    response = utils.generate_pdf_report(transactions, report_type, request.user)
     return response
 
 
 @login_required
+@conditional_per_user
 def generate_excel_report(request):
     """Generate Excel report"""
     # Get parameters
@@ -80,57 +92,141 @@ def generate_excel_report(request):
         transactions = transactions.filter(date__lte=date_to)
     
     # Generate Excel
-    response = generate_excel_report(transactions, report_type, request.user)
+    response = utils.generate_excel_report(transactions, report_type, request.user)
     return response
 
 
+def serialize_job(job):
+    data = {
+        'id': job.pk,
+        'status': job.status,
+        'report_type': job.report_type,
+        'format': job.format,
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'status_url': reverse('reports:job_status', args=[job.pk]),
+        'download_url': None,
+        'error': job.error or None
+    }
+    if job.status == 'done':
+        data['download_url'] = reverse('reports:job_download', args=[job.pk])
+    return data
+
+
+@login_required
+@require_POST
+def create_report_job(request):
+    """Queue a report for background generation"""
+    format_type = request.POST.get('format', 'pdf')
+    if format_type not in dict(ReportJob.FORMAT_CHOICES):
+        return JsonResponse({'error': f"Unsupported format: {format_type}"}, status=400)
+    report_type = request.POST.get('report_type') or 'summary'
+    if len(report_type) > ReportJob._meta.get_field('report_type').max_length:
+        return JsonResponse({'error': 'report_type is too long'}, status=400)
+    try:
+        date_from = date_param(request.POST, 'date_from')
+        date_to = date_param(request.POST, 'date_to')
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    job = request_report(
+        request.user,
+        report_type=report_type,
+        format_type=format_type,
+        date_from=date_from,
+        date_to=date_to
+    )
+    
+    return JsonResponse(serialize_job(job), status=200 if job.is_finished else 202)
+
+
+@login_required
+def report_job_status(request, pk):
+    """Get the status of a report job"""
+    job = get_object_or_404(ReportJob, pk=pk, user=request.user)
+    return JsonResponse(serialize_job(job))
+
+
+def get_finished_job(request, pk):
+    """The user's finished job, looked up once per request"""
+    if not hasattr(request, '_finished_job'):
+        job = get_object_or_404(ReportJob, pk=pk, user=request.user)
+        if job.status != 'done' or not job.artifact:
+            raise Http404('Report is not ready')
+        request._finished_job = job
+    return request._finished_job
+
+
+@login_required
+@cache_control(private=True, no_cache=True)
+@condition(
+    # A finished job's artifact never changes, so its fingerprint is a strong validator
+    etag_func=lambda request, pk: get_finished_job(request, pk).fingerprint,
+    last_modified_func=lambda request, pk: get_finished_job(request, pk).finished_at
+)
+def download_report_job(request, pk):
+    """Download the artifact of a finished report job"""
+    job = get_finished_job(request, pk)
+    filename = job.artifact.name.rsplit('/', 1)[-1]
+    return FileResponse(job.artifact.open('rb'), as_attachment=True, filename=filename)
+
+
 @login_required
 def analytics_dashboard(request):
     """Analytics dashboard with charts and insights"""
     return render(request, 'reports/analytics.html')
 
 
-@login_required
-def income_expense_chart(request):
-    """Get income vs expense data for charts"""
-    period = request.GET.get('period', 'monthly')
-    months = int(request.GET.get('months', 12))
+def date_param(params, name):
+    """Optional YYYY-MM-DD parameter; raises ValueError naming it when malformed"""
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValueError(f'Invalid {name}, expected YYYY-MM-DD')
+    return day
+
+
+def income_expense_options(params):
+    """Validated income_expense_data arguments; raises ValueError with a message for the client"""
+    try:
+        months = min(max(int(params.get('months', 12)), 1), 120)
+    except ValueError:
+        raise ValueError('months must be an integer')
+    return {
+        'period': params.get('period', 'monthly'),
+        'months': months,
+        'date_from': date_param(params, 'date_from'),
+        'date_to': date_param(params, 'date_to'),
+    }
+
+
+def income_expense_data(user, options):
+    series = income_expense_series(
+        user,
+        granularity=options['period'],
+        periods=options['months'],
+        date_from=options['date_from'],
+        date_to=options['date_to']
+    )
     
     data = []
-    
-    for i in range(months):
-        if period == 'monthly':
-            date = timezone.now() - timedelta(days=30 * i)
-            month_start = date.replace(day=1)
-            
-            income = Transaction.objects.filter(
-                user=request.user,
-                transaction_type='income',
-                date__year=month_start.year,
-                date__month=month_start.month
-            ).aggregate(total=Sum('amount'))['total'] or 0
-            
-            expenses = Transaction.objects.filter(
-                user=request.user,
-                transaction_type='expense',
-                date__year=month_start.year,
-                date__month=month_start.month
-            ).aggregate(total=Sum('amount'))['total'] or 0
-            
-            data.append({
-                'period': month_start.strftime('%b %Y'),
-                'income': float(income),
-                'expenses': float(expenses)
-            })
-    
-    data.reverse()
-    return JsonResponse({'data': data})
+    for item in series:
+        data.append({
+            'period': item['label'],
+            'income': float(item['income']),
+            'expenses': float(item['expenses'])
+        })
+    return {'data': data}
 
 
-@login_required
-def category_analysis(request):
-    """Get category analysis data"""
-    period = request.GET.get('period', 'current_month')
+def category_analysis_data(user, params):
+    period = params.get('period', 'current_month')
+    date_to = None
     
     # Determine date range
     if period == 'current_month':
@@ -145,19 +241,19 @@ def category_analysis(request):
         date_from = timezone.now().replace(day=1)
     
     # Get category data
-    category_data = Transaction.objects.filter(
-        user=request.user,
+    category_data = DailyTotal.objects.filter(
+        user=user,
         transaction_type='expense'
     )
     
     if period != 'all_time':
         category_data = category_data.filter(date__gte=date_from)
-        if 'date_to' in locals():
+        if date_to:
             category_data = category_data.filter(date__lt=date_to)
     
     category_data = category_data.values('category__name').annotate(
-        total=Sum('amount'),
-        count=Sum(1)
+        total=Sum('total'),
+        count=Sum('count')
     ).order_by('-total')
     
     data = []
@@ -167,52 +263,102 @@ def category_analysis(request):
             'amount': float(item['total']),
             'count': item['count']
         })
-    
-    return JsonResponse({'data': data})
+    return {'data': data}
 
 
-@login_required
-def trends_analysis(request):
-    """Get trends analysis data"""
-    trend_type = request.GET.get('type', 'expenses')
-    period = request.GET.get('period', '6months')
+def trends_data(user, params):
+    trend_type = params.get('type', 'expense')
+    period = params.get('period', '6months')
+    interval = params.get('interval', 'weekly')
+    
+    # Accept the plural form older clients send
+    if trend_type == 'expenses':
+        trend_type = 'expense'
     
     # Determine date range
     if period == '1month':
-        date_from = timezone.now() - timedelta(days=30)
+        days = 30
     elif period == '3months':
-        date_from = timezone.now() - timedelta(days=90)
-    elif period == '6months':
-        date_from = timezone.now() - timedelta(days=180)
+        days = 90
     elif period == '1year':
-        date_from = timezone.now() - timedelta(days=365)
+        days = 365
     else:
-        date_from = timezone.now() - timedelta(days=180)
-    
-    # Get trend data by week
-    transactions = Transaction.objects.filter(
-        user=request.user,
-        transaction_type=trend_type,
-        date__gte=date_from
-    ).order_by('date')
-    
-    # Group by week
-    weekly_data = {}
-    for transaction in transactions:
-        week_key = transaction.date.strftime('%Y-%W')
-        if week_key not in weekly_data:
-            weekly_data[week_key] = {
-                'week': transaction.date.strftime('%b %d'),
-                'amount': 0,
-                'count': 0
-            }
-        weekly_data[week_key]['amount'] += float(transaction.amount)
-        weekly_data[week_key]['count'] += 1
-    
-    data = list(weekly_data.values())
+        days = 180
+    today = timezone.now().date()
     
-    return JsonResponse({
+    series = trend_series(user, trend_type, today - timedelta(days=days), today, interval)
+    
+    data = [{
+        'week': item['week'],
+        'period_start': item['period_start'].isoformat(),
+        'iso_week': item['iso_week'],
+        'amount': float(item['amount']),
+        'count': item['count']
+    } for item in series]
+    
+    return {
         'data': data,
         'trend_type': trend_type,
-        'period': period
-    })
\ No newline at end of file
+        'period': period,
+        'interval': interval
+    }
+
+
+@login_required
+@conditional_per_user
+def income_expense_chart(request):
+    """Get income vs expense data for charts"""
+    try:
+        options = income_expense_options(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(income_expense_data(request.user, options))
+
+
+@login_required
+@conditional_per_user
+def category_analysis(request):
+    """Get category analysis data"""
+    return JsonResponse(category_analysis_data(request.user, request.GET))
+
+
+@login_required
+@conditional_per_user
+def trends_analysis(request):
+    """Get trends analysis data"""
+    return JsonResponse(trends_data(request.user, request.GET))
+
+
+@login_required
+@conditional_per_user
+@cache_per_user_version('insights')
+def analytics_insights(request):
+    """Rolling averages, month-over-month changes, savings rate and projections"""
+    try:
+        months = min(max(int(request.GET.get('months', 12)), 2), 60)
+        window = min(max(int(request.GET.get('window', 3)), 1), 12)
+    except ValueError:
+        return JsonResponse({'error': 'months and window must be integers'}, status=400)
+    
+    ledger = Ledger.load(request.user)
+    return JsonResponse(ledger.insights(months, window))
+
+
+@login_required
+@conditional_per_user
+@cache_per_user_version('category_stats')
+def category_statistics(request):
+    """Per-category amount percentiles"""
+    trend_type = request.GET.get('type', 'expense')
+    if trend_type not in dict(Transaction.TRANSACTION_TYPES):
+        return JsonResponse({'error': f"Unsupported type: {trend_type}"}, status=400)
+    try:
+        date_from = date_param(request.GET, 'date_from')
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    ledger = Ledger.load(request.user)
+    return JsonResponse({
+        'data': ledger.category_stats(trend_type, date_from),
+        'type': trend_type
+    })
@@ -22,6 +22,7 @@ class CategoryAdmin(admin.ModelAdmin):
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
     list_display = ('user', 'transaction_type', 'amount', 'category', 'date', 'created_at')
+    list_select_related = ('user', 'category')
     list_filter = ('transaction_type', 'category', 'date', 'created_at')
     search_fields = ('user__username', 'user__email', 'description', 'category__name')
     date_hierarchy = 'date'
@@ -45,6 +46,7 @@ class TransactionAdmin(admin.ModelAdmin):
 @admin.register(RecurringTransaction)
 class RecurringTransactionAdmin(admin.ModelAdmin):
     list_display = ('user', 'transaction_type', 'amount', 'category', 'frequency', 'next_occurrence', 'is_active')
+    list_select_related = ('user', 'category')
     list_filter = ('transaction_type', 'category', 'frequency', 'is_active', 'created_at')
     search_fields = ('user__username', 'user__email', 'description', 'category__name')
     readonly_fields = ('created_at', 'updated_at')
@@ -70,6 +72,7 @@ class RecurringTransactionAdmin(admin.ModelAdmin):
 @admin.register(Budget)
 class BudgetAdmin(admin.ModelAdmin):
     list_display = ('user', 'category', 'amount', 'period', 'start_date', 'usage_percentage', 'is_active')
+    list_select_related = ('user', 'category')
     list_filter = ('period', 'is_active', 'created_at', 'category')
     search_fields = ('user__username', 'user__email', 'category__name')
     readonly_fields = ('created_at', 'updated_at', 'usage_percentage')
@@ -91,6 +94,9 @@ class BudgetAdmin(admin.ModelAdmin):
         })
     )
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_usage()
+
     def usage_percentage(self, obj):
         percentage = obj.get_usage_percentage()
         color = 'green'
@@ -99,8 +105,8 @@ class BudgetAdmin(admin.ModelAdmin):
         elif percentage > 75:
             color = 'orange'
         return format_html(
-            '<span style="color: {};">{:.1f}%</span>',
+            '<span style="color: {};">{}%</span>',
             color,
-            percentage
+            f'{percentage:.1f}'
         )
     usage_percentage.short_description = 'Usage %'
\ No newline at end of file
@@ -0,0 +1,48 @@
+"""
+Async variants of the dashboard JSON endpoints.
+
+They return the same payloads as the views in views.py. Under ASGI the
+independent aggregates of one request run concurrently on the DB thread pool,
+and waiting on the database does not tie up a worker thread per client.
+"""
+from django.http import JsonResponse
+
+from .caching import async_cache_per_user_version, conditional_per_user
+from .concurrency import async_login_required, gather_queries, run_query
+from .views import (
+    get_month_starts, get_months, sum_daily_totals, stats_data, monthly_trend_data,
+    category_breakdown_data
+)
+
+
+@async_login_required
+@conditional_per_user
+@async_cache_per_user_version('stats')
+async def transaction_stats(request):
+    """Get transaction statistics for dashboard"""
+    user = request.user
+    current_month, prev_month = get_month_starts()
+    
+    income, expenses, prev_income, prev_expenses = await gather_queries(
+        (sum_daily_totals, user, 'income', current_month),
+        (sum_daily_totals, user, 'expense', current_month),
+        (sum_daily_totals, user, 'income', prev_month, current_month),
+        (sum_daily_totals, user, 'expense', prev_month, current_month)
+    )
+    return JsonResponse(stats_data(income, expenses, prev_income, prev_expenses))
+
+
+@async_login_required
+@conditional_per_user
+@async_cache_per_user_version('monthly_trend')
+async def monthly_trend(request):
+    """Get monthly trend data for charts"""
+    return JsonResponse(await run_query(monthly_trend_data, request.user, get_months(request)))
+
+
+@async_login_required
+@conditional_per_user
+@async_cache_per_user_version('category_breakdown')
+async def category_breakdown(request):
+    """Get category breakdown data for charts"""
+    return JsonResponse(await run_query(category_breakdown_data, request.user))
@@ -0,0 +1,140 @@
+from functools import wraps
+import hashlib
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .categories import registry as categories
+from .concurrency import run_query
+from .models import DataVersion
+
+
+def versioned_cache_key(request, prefix):
+    """
+    Key a per-user response on the user's data version, so any transaction or
+    budget write makes older entries unreachable without explicit deletes.
+    """
+    version, _ = get_data_version(request)
+    params = hashlib.md5(request.GET.urlencode().encode()).hexdigest()
+    # Today's date is part of the key because "current month" windows move with it;
+    # the category version because payloads carry category names
+    return (f"{prefix}:{request.user.pk}:{version}:{categories.version}:"
+            f"{timezone.now().date().isoformat()}:{params}")
+
+
+def get_data_version(request):
+    """(version, updated_at) of the user's data, looked up once per request"""
+    if not hasattr(request, '_data_version'):
+        request._data_version = DataVersion.objects.filter(user=request.user).values_list(
+            'version', 'updated_at'
+        ).first() or (0, None)
+    return request._data_version
+
+
+def user_data_etag(request):
+    """
+    Validator for a per-user response: it changes with the user's data version,
+    the category table, the day (for "current month" windows) and the query string.
+    """
+    version, _ = get_data_version(request)
+    params = hashlib.md5(request.GET.urlencode().encode()).hexdigest()[:12]
+    return f"{request.user.pk}-{version}-{categories.version}-{timezone.now().date().isoformat()}-{params}"
+
+
+def user_data_last_modified(request):
+    """
+    Last write to the user's data or to the categories (payloads carry their
+    names), but never before today (date windows move daily)
+    """
+    _, updated_at = get_data_version(request)
+    today = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return max(filter(None, (updated_at, categories.updated_at, today)))
+
+
+def _not_modified(request):
+    etag = quote_etag(user_data_etag(request))
+    last_modified = int(user_data_last_modified(request).timestamp())
+    return etag, last_modified, get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+def _add_validators(response, etag, last_modified):
+    # 304s must carry the ETag the client would have received with a 200
+    if response.status_code in (200, 304) and not response.has_header('ETag'):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_per_user(view_func):
+    """
+    Answer If-None-Match/If-Modified-Since with 304 from the user's data version
+    before the view runs, and send ETag, Last-Modified and private Cache-Control.
+    Works for sync and async views.
+    """
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            etag, last_modified, response = await run_query(_not_modified, request)
+            if response is None:
+                response = await view_func(request, *args, **kwargs)
+            return _add_validators(response, etag, last_modified)
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        etag, last_modified, response = _not_modified(request)
+        if response is None:
+            response = view_func(request, *args, **kwargs)
+        return _add_validators(response, etag, last_modified)
+    return wrapper
+
+
+def _cached_content(request, prefix):
+    key = versioned_cache_key(request, prefix)
+    return key, cache.get(key)
+
+
+def cache_per_user_version(prefix):
+    """Cache a JSON view's body per user, query string and data version"""
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            key, content = _cached_content(request, prefix)
+            if content is not None:
+                response = HttpResponse(content, content_type='application/json')
+                response['X-Cache'] = 'HIT'
+                return response
+
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.content, getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 3600))
+                response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+
+def async_cache_per_user_version(prefix):
+    """cache_per_user_version for async views; cache and DB lookups run off the event loop"""
+    def decorator(view_func):
+        @wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            key, content = await run_query(_cached_content, request, prefix)
+            if content is not None:
+                response = HttpResponse(content, content_type='application/json')
+                response['X-Cache'] = 'HIT'
+                return response
+
+            response = await view_func(request, *args, **kwargs)
+            if response.status_code == 200:
+                await run_query(cache.set, key, response.content, getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 3600))
+                response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,99 @@
+"""
+Process-wide category registry.
+
+Categories are a small global table read on nearly every form and list page,
+so each process keeps the whole table in memory and serves lookups by id, by
+type and active-only from it. Saving or deleting a Category bumps the
+CategoryVersion row in the same database transaction; every process compares
+its snapshot against that row (at most every CATEGORY_REGISTRY_CHECK_INTERVAL
+seconds, and at once when asked for an id it does not know) and reloads when
+it has moved. Queryset .update()/.delete() calls on categories bypass the
+signals and must call registry.invalidate() themselves.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+
+from .models import Category, CategoryVersion
+
+
+class CategorySnapshot:
+    """Immutable view of the category table at one version"""
+
+    def __init__(self, version, updated_at, categories):
+        self.version = version
+        self.updated_at = updated_at
+        self.by_id = {category.pk: category for category in categories}
+        self.active = {None: [category for category in categories if category.is_active]}
+        for category_type, _ in Category.CATEGORY_TYPES:
+            self.active[category_type] = [
+                category for category in self.active[None] if category.category_type == category_type
+            ]
+
+
+class CategoryRegistry:
+    """
+    In-memory categories shared by every request of the process. The returned
+    Category instances are shared too and must be treated as read-only.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._checked_at = 0.0
+
+    def snapshot(self, check=False):
+        snapshot = self._snapshot
+        interval = getattr(settings, 'CATEGORY_REGISTRY_CHECK_INTERVAL', 5)
+        if snapshot is not None and not check and time.monotonic() - self._checked_at < interval:
+            return snapshot
+
+        version, updated_at = CategoryVersion.objects.get_state()
+        if snapshot is not None and snapshot.version == version:
+            self._checked_at = time.monotonic()
+            return snapshot
+
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version != version:
+                self._snapshot = CategorySnapshot(version, updated_at, list(Category.objects.order_by('name', 'pk')))
+            self._checked_at = time.monotonic()
+            return self._snapshot
+
+    @property
+    def version(self):
+        return self.snapshot().version
+
+    @property
+    def updated_at(self):
+        """When categories were last written, or None"""
+        return self.snapshot().updated_at
+
+    def get(self, pk):
+        """Category by id (active or not), or None"""
+        category = self.snapshot().by_id.get(pk)
+        if category is None:
+            # Possibly created in another process since the last check
+            category = self.snapshot(check=True).by_id.get(pk)
+        return category
+
+    def active(self, category_type=None):
+        """Active categories ordered by name, optionally of one type"""
+        return self.snapshot().active.get(category_type, [])
+
+    def clear(self):
+        """Drop this process's snapshot"""
+        with self._lock:
+            self._snapshot = None
+
+    def invalidate(self):
+        """Make every process reload its categories on next use"""
+        # Bumped in the caller's transaction, so the new version is never seen without the new rows
+        CategoryVersion.objects.bump()
+        self.clear()
+        # Drop anything reloaded from the old rows before the write committed
+        db_transaction.on_commit(self.clear)
+
+
+registry = CategoryRegistry()
@@ -0,0 +1,54 @@
+"""
+Helpers for async views that need the synchronous ORM.
+
+Queries run on a dedicated thread pool, each thread keeping its own database
+connection, so independent aggregates of one request execute concurrently and
+the event loop stays free for other clients while they run.
+"""
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.db import close_old_connections
+
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'ASYNC_DB_WORKERS', 8),
+    thread_name_prefix='async-db'
+)
+
+
+def _call(func, args):
+    # Drop connections that are broken or past CONN_MAX_AGE before reusing them
+    close_old_connections()
+    return func(*args)
+
+
+async def run_query(func, *args):
+    """Run a blocking ORM call on the DB thread pool"""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_executor, context.run, _call, func, args)
+
+
+async def gather_queries(*calls):
+    """Run (func, *args) tuples concurrently and return their results in order"""
+    return await asyncio.gather(*(run_query(*call) for call in calls))
+
+
+def _resolve_user(request):
+    return request.user if request.user.is_authenticated else None
+
+
+def async_login_required(view_func):
+    """login_required for async views; resolves the session user off the event loop"""
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        if await sync_to_async(_resolve_user)(request) is None:
+            return redirect_to_login(request.get_full_path())
+        return await view_func(request, *args, **kwargs)
+    return wrapper
@@ -1,12 +1,74 @@
 from django import forms
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
+from .categories import registry as categories
 from .models import Transaction, Budget, RecurringTransaction, Category
 
 
+class CategoryChoiceIterator:
+    """Choices read from the registry when iterated, so defining a form never queries the database"""
+
+    def __init__(self, field):
+        self.field = field
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for category in categories.active(self.field.category_type):
+            yield (category.pk, self.field.label_from_instance(category))
+
+    def __len__(self):
+        return len(categories.active(self.field.category_type)) + (self.field.empty_label is not None)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(categories.active(self.field.category_type))
+
+
+class CategoryChoiceField(forms.ModelChoiceField):
+    """Category select whose choices and validation come from the in-process registry"""
+
+    def __init__(self, *args, category_type=None, **kwargs):
+        self._category_type = category_type
+        super().__init__(*args, **kwargs)
+
+    @property
+    def category_type(self):
+        return self._category_type
+
+    @category_type.setter
+    def category_type(self, value):
+        self._category_type = value
+        self.widget.choices = self.choices
+
+    def _get_choices(self):
+        return CategoryChoiceIterator(self)
+
+    choices = property(_get_choices, forms.ChoiceField._set_choices)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        if isinstance(value, Category):
+            value = value.pk
+        try:
+            category = categories.get(int(value))
+        except (TypeError, ValueError):
+            category = None
+        if (category is None or not category.is_active
+                or self.category_type not in (None, category.category_type)):
+            raise ValidationError(
+                self.error_messages['invalid_choice'],
+                code='invalid_choice',
+                params={'value': value},
+            )
+        return category
+
+
 class TransactionForm(forms.ModelForm):
     class Meta:
         model = Transaction
         fields = ['transaction_type', 'category', 'amount', 'description', 'date']
+        field_classes = {'category': CategoryChoiceField}
         widgets = {
             'transaction_type': forms.Select(attrs={
                 'class': 'form-control'
@@ -36,31 +98,21 @@ class TransactionForm(forms.ModelForm):
         
         # Filter categories based on transaction type
         if 'transaction_type' in self.data:
-            try:
-                transaction_type = self.data.get('transaction_type')
-                self.fields['category'].queryset = Category.objects.filter(
-                    category_type=transaction_type,
-                    is_active=True
-                )
-            except (ValueError, TypeError):
-                pass
+            transaction_type = self.data.get('transaction_type')
+            if transaction_type in dict(Category.CATEGORY_TYPES):
+                self.fields['category'].category_type = transaction_type
         elif self.instance.pk:
-            self.fields['category'].queryset = Category.objects.filter(
-                category_type=self.instance.transaction_type,
-                is_active=True
-            )
+            self.fields['category'].category_type = self.instance.transaction_type
         else:
             # Default to expense categories
-            self.fields['category'].queryset = Category.objects.filter(
-                category_type='expense',
-                is_active=True
-            )
+            self.fields['category'].category_type = 'expense'
 
 
 class BudgetForm(forms.ModelForm):
     class Meta:
         model = Budget
         fields = ['category', 'amount', 'period', 'start_date', 'end_date']
+        field_classes = {'category': CategoryChoiceField}
         widgets = {
             'category': forms.Select(attrs={
                 'class': 'form-control'
@@ -88,10 +140,7 @@ class BudgetForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         
         # Only show expense categories for budgets
-        self.fields['category'].queryset = Category.objects.filter(
-            category_type='expense',
-            is_active=True
-        )
+        self.fields['category'].category_type = 'expense'
         
         self.fields['end_date'].required = False
 
@@ -100,6 +149,7 @@ class RecurringTransactionForm(forms.ModelForm):
     class Meta:
         model = RecurringTransaction
         fields = ['transaction_type', 'category', 'amount', 'description', 'frequency', 'start_date', 'end_date']
+        field_classes = {'category': CategoryChoiceField}
         widgets = {
             'transaction_type': forms.Select(attrs={
                 'class': 'form-control'
@@ -136,24 +186,53 @@ class RecurringTransactionForm(forms.ModelForm):
         
         # Filter categories based on transaction type
         if 'transaction_type' in self.data:
-            try:
-                transaction_type = self.data.get('transaction_type')
-                self.fields['category'].queryset = Category.objects.filter(
-                    category_type=transaction_type,
-                    is_active=True
-                )
-            except (ValueError, TypeError):
-                pass
+            transaction_type = self.data.get('transaction_type')
+            if transaction_type in dict(Category.CATEGORY_TYPES):
+                self.fields['category'].category_type = transaction_type
         elif self.instance.pk:
-            self.fields['category'].queryset = Category.objects.filter(
-                category_type=self.instance.transaction_type,
-                is_active=True
-            )
+            self.fields['category'].category_type = self.instance.transaction_type
         else:
             # Default to expense categories
-            self.fields['category'].queryset = Category.objects.filter(
-                category_type='expense',
-                is_active=True
-            )
+            self.fields['category'].category_type = 'expense'
         
-        self.fields['end_date'].required = False
\ No newline at end of file
+        self.fields['end_date'].required = False
+
+
+class ImportTransactionsForm(forms.Form):
+    FORMAT_CHOICES = [
+        ('csv', 'CSV'),
+        ('ofx', 'OFX / QFX'),
+    ]
+
+    file = forms.FileField(widget=forms.ClearableFileInput(attrs={
+        'class': 'form-control',
+        'accept': '.csv,.ofx,.qfx'
+    }))
+    format = forms.ChoiceField(choices=FORMAT_CHOICES, initial='csv', widget=forms.Select(attrs={
+        'class': 'form-control'
+    }))
+    date_format = forms.CharField(initial='%Y-%m-%d', required=False, widget=forms.TextInput(attrs={
+        'class': 'form-control'
+    }))
+    date_column = forms.CharField(initial='date', required=False, widget=forms.TextInput(attrs={
+        'class': 'form-control'
+    }))
+    amount_column = forms.CharField(initial='amount', required=False, widget=forms.TextInput(attrs={
+        'class': 'form-control'
+    }))
+    description_column = forms.CharField(initial='description', required=False, widget=forms.TextInput(attrs={
+        'class': 'form-control'
+    }))
+    category_column = forms.CharField(initial='category', required=False, widget=forms.TextInput(attrs={
+        'class': 'form-control'
+    }))
+    type_column = forms.CharField(initial='type', required=False, widget=forms.TextInput(attrs={
+        'class': 'form-control'
+    }))
+
+    def get_columns(self):
+        return {
+            field: self.cleaned_data[f'{field}_column']
+            for field in ('date', 'amount', 'description', 'category', 'type')
+            if self.cleaned_data.get(f'{field}_column')
+        }
@@ -0,0 +1,186 @@
+import csv
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction as db_transaction
+
+from .categories import registry as categories
+from .models import Transaction, DailyTotal, DataVersion
+
+
+DEFAULT_COLUMNS = {
+    'date': 'date',
+    'amount': 'amount',
+    'description': 'description',
+    'category': 'category',
+    'type': 'type',
+}
+
+DEFAULT_CATEGORIES = {
+    'income': 'Other Income',
+    'expense': 'Other Expenses',
+}
+
+MAX_ERRORS = 100
+
+# Largest amount the column holds, rounded to cents: 10 ** (max_digits - decimal_places) - 0.005
+_amount_field = Transaction._meta.get_field('amount')
+MAX_AMOUNT = Decimal(10) ** (_amount_field.max_digits - _amount_field.decimal_places) - Decimal('0.005')
+
+OFX_TAG_RE = re.compile(r'<(\w+)>([^<\r\n]*)')
+
+
+class ImportValidationError(ValueError):
+    pass
+
+
+def parse_csv(lines, columns=None, date_format='%Y-%m-%d'):
+    """Yield (line number, row dict) from CSV lines without reading the whole file"""
+    columns = {**DEFAULT_COLUMNS, **(columns or {})}
+    reader = csv.DictReader(lines)
+    try:
+        if reader.fieldnames is None:
+            return
+
+        missing = [columns[field] for field in ('date', 'amount') if columns[field] not in reader.fieldnames]
+        if missing:
+            raise ImportValidationError(f"Missing required columns: {', '.join(missing)}")
+
+        for row in reader:
+            yield reader.line_num, {
+                'date': row.get(columns['date']),
+                'amount': row.get(columns['amount']),
+                'description': row.get(columns['description']),
+                'category': row.get(columns['category']),
+                'type': row.get(columns['type']),
+                'date_format': date_format,
+            }
+    except csv.Error as e:
+        raise ImportValidationError(f"Malformed CSV after line {reader.line_num}: {e}")
+
+
+def parse_ofx(lines):
+    """Yield (line number, row dict) for each <STMTTRN> of an OFX statement (SGML or XML)"""
+    current = None
+    for line_num, line in enumerate(lines, 1):
+        for tag, value in OFX_TAG_RE.findall(line):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                current = {'line': line_num}
+            elif current is not None and value.strip():
+                current[tag] = value.strip()
+
+        if current is not None and '</STMTTRN>' in line.upper():
+            yield current['line'], {
+                'date': current.get('DTPOSTED', '')[:8],
+                'amount': current.get('TRNAMT'),
+                'description': current.get('MEMO') or current.get('NAME'),
+                'category': None,
+                'type': None,
+                'date_format': '%Y%m%d',
+            }
+            current = None
+
+
+class CategoryLookup:
+    """Resolve category names to ids from the category registry instead of one query per row"""
+
+    def __init__(self):
+        self.by_name = {}
+        self.defaults = {}
+        for category in categories.active():
+            self.by_name.setdefault((category.category_type, category.name.lower()), category.pk)
+            self.defaults.setdefault(category.category_type, category.pk)
+
+        for category_type, name in DEFAULT_CATEGORIES.items():
+            if (category_type, name.lower()) in self.by_name:
+                self.defaults[category_type] = self.by_name[(category_type, name.lower())]
+
+    def resolve(self, category_type, name):
+        if name:
+            category_id = self.by_name.get((category_type, name.strip().lower()))
+            if category_id is not None:
+                return category_id
+        return self.defaults.get(category_type)
+
+
+class TransactionImporter:
+    """
+    Validate parsed rows in batches and insert them with chunked bulk_create.
+
+    Each batch is committed in its own database transaction together with the
+    matching daily totals, so memory stays flat and a failure part way through
+    keeps the batches already imported.
+    """
+
+    def __init__(self, user, batch_size=1000):
+        self.user = user
+        self.batch_size = batch_size
+        self.categories = CategoryLookup()
+        self.created = 0
+        self.skipped = 0
+        self.errors = []
+
+    def build(self, line_num, row):
+        try:
+            amount = Decimal(str(row['amount']).replace(',', '').strip())
+        except (InvalidOperation, AttributeError):
+            raise ImportValidationError(f"invalid amount {row['amount']!r}")
+        if not amount.is_finite():
+            raise ImportValidationError(f"invalid amount {row['amount']!r}")
+        try:
+            date = datetime.strptime((row['date'] or '').strip(), row['date_format']).date()
+        except ValueError:
+            raise ImportValidationError(f"invalid date {row['date']!r}")
+
+        transaction_type = (row['type'] or '').strip().lower()
+        if transaction_type not in dict(Transaction.TRANSACTION_TYPES):
+            transaction_type = 'expense' if amount < 0 else 'income'
+        if abs(amount) >= MAX_AMOUNT:
+            raise ImportValidationError(f"amount {row['amount']!r} is too large")
+        amount = abs(amount).quantize(Decimal('0.01'))
+        if amount < Decimal('0.01'):
+            raise ImportValidationError('amount must be at least 0.01')
+
+        category_id = self.categories.resolve(transaction_type, row['category'])
+        if category_id is None:
+            raise ImportValidationError(f"no active {transaction_type} category")
+
+        return Transaction(
+            user=self.user,
+            transaction_type=transaction_type,
+            category_id=category_id,
+            amount=amount,
+            description=(row['description'] or '').strip() or None,
+            date=date
+        )
+
+    def add_error(self, line_num, message):
+        self.skipped += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((line_num, message))
+
+    def run(self, rows):
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.batch_size))
+            if not chunk:
+                break
+
+            batch = []
+            for line_num, row in chunk:
+                try:
+                    batch.append(self.build(line_num, row))
+                except ImportValidationError as e:
+                    self.add_error(line_num, str(e))
+
+            if batch:
+                with db_transaction.atomic():
+                    Transaction.objects.bulk_create(batch, batch_size=self.batch_size)
+                    DailyTotal.objects.record(batch)
+                    DataVersion.objects.bump(self.user)
+                self.created += len(batch)
+
+        return self
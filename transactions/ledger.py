@@ -0,0 +1,139 @@
+"""
+Running account balances for pages of transactions.
+
+The balance after a transaction is the signed sum of all of the user's
+transactions up to it in (date, created_at, id) order, whatever filters
+picked the rows being shown. Balances at a date come from the per-month
+totals (MonthlyBalance) of earlier months plus that month's daily rollups. For a page of
+transactions the opening balance before its oldest row is such a lookup plus
+that day's earlier transactions, and a SQL window sum runs from that row to
+the page's newest one in a subquery that returns only the page's rows.
+Neither cost depends on how much history precedes it.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connections
+from django.db.models import Case, DecimalField, F, Q, Sum, Value, When, Window
+from django.utils import timezone
+
+from .models import Transaction, DailyTotal, MonthlyBalance
+from reports.services import shift_period
+
+
+CENT = Decimal('0.01')
+
+
+def signed(field):
+    """Income counts up, expenses count down"""
+    return Case(
+        When(transaction_type='income', then=F(field)),
+        default=F(field) * Value(-1),
+        output_field=DecimalField(max_digits=14, decimal_places=2)
+    )
+
+
+def position(transaction):
+    return (transaction.date, transaction.created_at, transaction.pk)
+
+
+def before(transaction):
+    """Transactions on the same day that come before ``transaction``"""
+    return Q(date=transaction.date) & (
+        Q(created_at__lt=transaction.created_at) |
+        Q(created_at=transaction.created_at, pk__lt=transaction.pk)
+    )
+
+
+def after(transaction):
+    """Transactions that come after ``transaction`` (exclusive)"""
+    return (
+        Q(date__gt=transaction.date) |
+        Q(date=transaction.date, created_at__gt=transaction.created_at) |
+        Q(date=transaction.date, created_at=transaction.created_at, pk__gt=transaction.pk)
+    )
+
+
+def balance_at(user, day):
+    """Balance at the end of ``day``: the earlier months' totals plus at most a month of daily totals"""
+    month = day.replace(day=1)
+    opening = MonthlyBalance.objects.balances_before(month, [user.pk]).get(user.pk, 0)
+    month_to_date = DailyTotal.objects.filter(user=user, date__gte=month, date__lte=day).aggregate(
+        balance=Sum(signed('total'))
+    )['balance'] or 0
+    return (Decimal(opening) + Decimal(month_to_date)).quantize(CENT)
+
+
+def balance_history(user, months=12, today=None):
+    """Closing balance of each of the last ``months`` months, oldest first"""
+    today = today or timezone.now().date()
+    current = today.replace(day=1)
+    first = shift_period(current, 'monthly', -(months - 1))
+
+    nets = dict(MonthlyBalance.objects.filter(
+        user=user, month__gte=first, month__lte=current
+    ).values_list('month', F('income') - F('expense')))
+    closing = MonthlyBalance.objects.balances_before(first, [user.pk]).get(user.pk, Decimal('0'))
+
+    history = []
+    month = first
+    while month <= current:
+        # Months without transactions carry the previous closing forward
+        closing += nets.get(month, 0)
+        history.append((month, closing))
+        month = shift_period(month, 'monthly')
+    return history
+
+
+def opening_balance(user, first):
+    """Balance just before the ``first`` transaction"""
+    same_day = Transaction.objects.filter(before(first), user=user).aggregate(
+        balance=Sum(signed('amount'))
+    )['balance'] or 0
+    return balance_at(user, first.date - timedelta(days=1)) + Decimal(same_day)
+
+
+def running_balances(user, first, last, pks=None):
+    """
+    Map of transaction id to the balance after it, for transactions from
+    ``first`` to ``last``, or only for ``pks`` among them. The window sum runs
+    in a subquery over the whole span, so only the requested rows come back.
+    """
+    span = Transaction.objects.filter(
+        user=user,
+        date__gte=first.date,
+        date__lte=last.date
+    ).exclude(before(first)).exclude(after(last)).annotate(
+        balance=Window(
+            Sum(signed('amount')),
+            order_by=[F('date').asc(), F('created_at').asc(), F('id').asc()]
+        )
+    ).order_by().values('pk', 'balance')
+
+    sql, params = span.query.sql_with_params()
+    sql = f'SELECT span.id, span.balance FROM ({sql}) span'
+    if pks is not None:
+        sql += f" WHERE span.id IN ({', '.join(['%s'] * len(pks))})"
+        params = (*params, *pks)
+    with connections[span.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    opening = opening_balance(user, first)
+    # Raw rows skip the ORM's converters; SQLite returns the sum as a float
+    return {pk: (opening + Decimal(str(balance))).quantize(CENT) for pk, balance in rows}
+
+
+def attach_balances(user, transactions):
+    """Set ``balance`` on each transaction of a page"""
+    if not transactions:
+        return transactions
+    balances = running_balances(
+        user,
+        min(transactions, key=position),
+        max(transactions, key=position),
+        [transaction.pk for transaction in transactions]
+    )
+    for transaction in transactions:
+        transaction.balance = balances[transaction.pk]
+    return transactions
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+
+from transactions.models import MonthlyBalance
+
+
+class Command(BaseCommand):
+    help = 'Recompute the monthly balance totals from the daily transaction rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Only backfill totals for this username')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['user']}' does not exist")
+
+        MonthlyBalance.objects.rebuild(user=user)
+
+        snapshots = MonthlyBalance.objects.all()
+        if user is not None:
+            snapshots = snapshots.filter(user=user)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {snapshots.count()} monthly balance rows'))
@@ -0,0 +1,103 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Sum
+from django.utils import timezone
+from datetime import timedelta
+import re
+
+from transactions.models import Transaction, Budget, RecurringTransaction, DailyTotal
+
+
+# Plan lines that indicate a table is read without an index
+FULL_SCAN_PATTERNS = [
+    re.compile(r'\bSCAN (\w+)(?!.*\bUSING\b)'),  # SQLite
+    re.compile(r'Seq Scan on (\w+)'),  # PostgreSQL
+    re.compile(r'\btype: ALL\b|\bALL\b.*\bNULL\b'),  # MySQL
+]
+
+
+class Command(BaseCommand):
+    help = 'Print EXPLAIN output for the hot transaction queries and flag full table scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username to build the queries for (defaults to the first user)')
+        parser.add_argument('--analyze', action='store_true', help='Run EXPLAIN ANALYZE where the database supports it')
+
+    def handle(self, *args, **options):
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['user']}' does not exist")
+        else:
+            user = User.objects.order_by('pk').first()
+            if user is None:
+                raise CommandError('No users found. Run create_sample_data first.')
+
+        explain_options = {}
+        if options['analyze'] and connection.vendor == 'postgresql':
+            explain_options['analyze'] = True
+
+        full_scans = 0
+        for name, queryset in self.get_queries(user):
+            plan = queryset.explain(**explain_options)
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(plan)
+
+            scanned = [line for line in plan.splitlines() if any(p.search(line) for p in FULL_SCAN_PATTERNS)]
+            if scanned:
+                full_scans += 1
+                for line in scanned:
+                    self.stdout.write(self.style.WARNING(f'  full scan: {line.strip()}'))
+            self.stdout.write('')
+
+        if full_scans:
+            self.stdout.write(self.style.WARNING(f'{full_scans} queries read a table without an index'))
+        else:
+            self.stdout.write(self.style.SUCCESS('No full table scans found'))
+
+    def get_queries(self, user):
+        today = timezone.now().date()
+        month_start = today.replace(day=1)
+        budget = Budget.objects.filter(user=user).first()
+
+        transactions = Transaction.objects.filter(user=user)
+        yield 'Transaction list page', transactions.order_by('-date', '-created_at', '-id')[:51]
+        yield 'Transaction list by type and date range', transactions.filter(
+            transaction_type='expense',
+            date__gte=month_start,
+            date__lte=today
+        ).order_by('-date', '-created_at', '-id')[:51]
+        yield 'Monthly income total', transactions.filter(
+            transaction_type='income',
+            date__gte=month_start
+        ).values('user').annotate(total=Sum('amount'))
+
+        if budget is not None:
+            start_date, end_date = budget.get_period_window()
+            yield 'Budget spent amount (raw transactions)', transactions.filter(
+                category=budget.category,
+                transaction_type='expense',
+                date__gte=start_date,
+                date__lt=end_date
+            ).values('user').annotate(total=Sum('amount'))
+
+        daily_totals = DailyTotal.objects.filter(user=user)
+        yield 'Dashboard stats (daily totals)', daily_totals.filter(
+            transaction_type='expense',
+            date__gte=month_start
+        ).values('user').annotate(total=Sum('total'))
+        yield 'Category breakdown (daily totals)', daily_totals.filter(
+            transaction_type='expense',
+            date__gte=month_start
+        ).values('category__name').annotate(total=Sum('total'))
+        yield 'Monthly trend (daily totals)', daily_totals.filter(
+            date__gte=month_start - timedelta(days=365)
+        ).values('transaction_type').annotate(total=Sum('total'))
+
+        yield 'Active budgets with usage', Budget.objects.filter(user=user, is_active=True).with_usage()
+        yield 'Due recurring transactions', RecurringTransaction.objects.filter(
+            is_active=True,
+            next_occurrence__lte=today
+        )
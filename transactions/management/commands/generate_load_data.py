@@ -0,0 +1,227 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction as db_transaction
+from django.utils import timezone
+from datetime import datetime, timedelta
+from decimal import Decimal
+from itertools import accumulate
+import random
+import time
+
+from transactions.models import Category, Transaction, Budget, RecurringTransaction, DailyTotal, DataVersion
+from .create_sample_data import Command as SampleDataCommand
+
+
+# category name: (share of expense rows, median amount, spread, descriptions)
+EXPENSE_PROFILE = {
+    'Food & Dining': (0.34, 25, 0.7, ['Grocery shopping', 'Lunch at restaurant', 'Coffee', 'Takeaway dinner', 'Bakery']),
+    'Transportation': (0.15, 30, 0.6, ['Gas station', 'Bus ticket', 'Taxi ride', 'Parking', 'Train pass']),
+    'Shopping': (0.12, 60, 0.9, ['New shoes', 'Clothes', 'Electronics', 'Home supplies', 'Online order']),
+    'Bills & Utilities': (0.07, 120, 0.5, ['Electricity bill', 'Water bill', 'Phone bill', 'Internet bill', 'Rent']),
+    'Entertainment': (0.10, 35, 0.8, ['Movie tickets', 'Concert', 'Streaming subscription', 'Video game', 'Books']),
+    'Healthcare': (0.05, 80, 0.9, ['Pharmacy', 'Doctor visit', 'Dentist', 'Gym membership']),
+    'Education': (0.03, 150, 1.0, ['Online course', 'Textbooks', 'Workshop']),
+    'Travel': (0.04, 400, 0.9, ['Flight tickets', 'Hotel booking', 'Car rental']),
+    'Other Expenses': (0.10, 40, 1.0, ['Gift', 'Donation', 'Bank fee', 'Miscellaneous']),
+}
+
+INCOME_PROFILE = {
+    'Freelance': (0.55, 600, 0.7, ['Web development project', 'Logo design project', 'Consulting']),
+    'Investment': (0.25, 150, 1.0, ['Dividend', 'Interest payment', 'Stock sale']),
+    'Business': (0.10, 900, 0.8, ['Client invoice', 'Product sales']),
+    'Other Income': (0.10, 100, 0.9, ['Refund', 'Gift received', 'Cashback']),
+}
+
+CUM_WEIGHTS = {
+    id(profile): list(accumulate(share for share, _, _, _ in profile.values()))
+    for profile in (EXPENSE_PROFILE, INCOME_PROFILE)
+}
+
+BILLS = [
+    ('Monthly internet bill', 60),
+    ('Monthly phone bill', 45),
+    ('Rent', 1200),
+    ('Streaming subscription', 15),
+]
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic dataset for load tests and benchmarks, identical for the same --seed and --end-date'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--transactions-per-user', type=int, default=1000)
+        parser.add_argument('--years', type=int, default=2, help='History length ending on --end-date')
+        parser.add_argument('--end-date', help='Last day of the history and date the budgets and schedules '
+                                               'are set up from (YYYY-MM-DD, default today)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk_create')
+        parser.add_argument('--prefix', default='loadtest', help='Username prefix of the generated users')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['transactions_per_user'] < 1 or options['years'] < 1:
+            raise CommandError('--users, --transactions-per-user and --years must be positive')
+
+        started = time.monotonic()
+        SampleDataCommand(stdout=self.stdout, stderr=self.stderr).create_categories()
+        self.categories = {
+            (category.category_type, category.name): category.pk
+            for category in Category.objects.filter(is_active=True)
+        }
+        if options['end_date']:
+            try:
+                self.today = datetime.strptime(options['end_date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError(f"Invalid date: {options['end_date']}")
+        else:
+            self.today = timezone.now().date()
+        self.first_day = self.today - timedelta(days=365 * options['years'])
+        self.batch_size = options['batch_size']
+        self.pending = []
+        self.created = 0
+
+        users = self.create_users(options['prefix'], options['users'])
+        for user in users:
+            # One stream per user number keeps each user's data stable whatever --users or --prefix is
+            rng = random.Random(f"{options['seed']}:{user.username[len(options['prefix']):]}")
+            with db_transaction.atomic():
+                self.deltas = {}
+                self.generate_user(user, rng, options['transactions_per_user'])
+                self.flush(force=True)
+                # One rollup pass per user instead of re-reading their buckets every batch
+                DailyTotal.objects.apply_deltas(self.deltas)
+                DataVersion.objects.bump(user)
+            self.stdout.write(f'{user.username}: {self.created} transactions so far')
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(users)} users and {self.created} transactions in {elapsed:.1f}s '
+            f'({self.created / max(elapsed, 0.001):.0f} rows/s)'
+        ))
+
+    def create_users(self, prefix, count):
+        usernames = [f'{prefix}{number:05d}' for number in range(1, count + 1)]
+        existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        if existing:
+            self.stdout.write(self.style.WARNING(f'Skipping {len(existing)} existing users'))
+
+        # Hashing once keeps user creation fast; every generated user shares the password
+        password = make_password('loadtest123')
+        User.objects.bulk_create(
+            [
+                User(username=username, email=f'{username}@example.com', password=password)
+                for username in usernames if username not in existing
+            ],
+            batch_size=1000
+        )
+        return list(User.objects.filter(username__in=usernames).exclude(username__in=existing).order_by('username'))
+
+    def amount(self, rng, median, spread):
+        value = rng.lognormvariate(0, spread) * median
+        return max(Decimal('0.01'), Decimal(str(round(value, 2))))
+
+    def pick(self, rng, profile):
+        names = list(profile)
+        return rng.choices(names, cum_weights=CUM_WEIGHTS[id(profile)])[0]
+
+    def random_date(self, rng):
+        return self.first_day + timedelta(days=rng.randrange((self.today - self.first_day).days + 1))
+
+    def add(self, user, transaction_type, name, amount, description, date):
+        self.pending.append(Transaction(
+            user=user,
+            transaction_type=transaction_type,
+            category_id=self.categories[(transaction_type, name)],
+            amount=amount,
+            description=description,
+            date=date
+        ))
+        self.flush()
+
+    def generate_user(self, user, rng, total):
+        salary = Decimal(rng.randrange(2500, 9000, 50))
+        salary_day = rng.choice([1, 15, 25, 28])
+        months = []
+        month = self.first_day.replace(day=1)
+        while month <= self.today:
+            months.append(month)
+            month = (month + timedelta(days=32)).replace(day=1)
+
+        # Salary on a fixed day each month, then ~15% other income and the rest expenses
+        paydays = [month.replace(day=salary_day) for month in months
+                   if self.first_day <= month.replace(day=salary_day) <= self.today][:total]
+        for payday in paydays:
+            self.add(user, 'income', 'Salary', salary, 'Monthly salary', payday)
+
+        remaining = total - len(paydays)
+        other_income = int(remaining * 0.15)
+        for _ in range(other_income):
+            name = self.pick(rng, INCOME_PROFILE)
+            _, median, spread, descriptions = INCOME_PROFILE[name]
+            self.add(user, 'income', name, self.amount(rng, median, spread), rng.choice(descriptions), self.random_date(rng))
+
+        for _ in range(remaining - other_income):
+            name = self.pick(rng, EXPENSE_PROFILE)
+            _, median, spread, descriptions = EXPENSE_PROFILE[name]
+            self.add(user, 'expense', name, self.amount(rng, median, spread), rng.choice(descriptions), self.random_date(rng))
+
+        self.create_budgets(user, rng, salary)
+        self.create_recurring(user, rng, salary, salary_day)
+
+    def create_budgets(self, user, rng, salary):
+        start = self.today.replace(day=1)
+        names = rng.sample(list(EXPENSE_PROFILE), rng.randint(3, 5))
+        Budget.objects.bulk_create([
+            Budget(
+                user=user,
+                category_id=self.categories[('expense', name)],
+                amount=(salary * Decimal(EXPENSE_PROFILE[name][0])).quantize(Decimal('1')),
+                period=rng.choice(['monthly', 'monthly', 'monthly', 'quarterly', 'yearly']),
+                start_date=start
+            )
+            for name in names
+        ])
+
+    def create_recurring(self, user, rng, salary, salary_day):
+        next_payday = self.today.replace(day=salary_day)
+        if next_payday <= self.today:
+            next_payday = (self.today.replace(day=1) + timedelta(days=32)).replace(day=salary_day)
+
+        schedules = [RecurringTransaction(
+            user=user,
+            transaction_type='income',
+            category_id=self.categories[('income', 'Salary')],
+            amount=salary,
+            description='Monthly salary',
+            frequency='monthly',
+            start_date=self.first_day.replace(day=salary_day),
+            next_occurrence=next_payday
+        )]
+        for description, amount in rng.sample(BILLS, rng.randint(1, 3)):
+            day = rng.randint(1, 28)
+            next_day = self.today.replace(day=day)
+            if next_day <= self.today:
+                next_day = (self.today.replace(day=1) + timedelta(days=32)).replace(day=day)
+            schedules.append(RecurringTransaction(
+                user=user,
+                transaction_type='expense',
+                category_id=self.categories[('expense', 'Bills & Utilities')],
+                amount=Decimal(amount),
+                description=description,
+                frequency='monthly',
+                start_date=self.first_day.replace(day=day),
+                next_occurrence=next_day
+            ))
+        RecurringTransaction.objects.bulk_create(schedules)
+
+    def flush(self, force=False):
+        if not self.pending or (len(self.pending) < self.batch_size and not force):
+            return
+        Transaction.objects.bulk_create(self.pending, batch_size=self.batch_size)
+        for transaction in self.pending:
+            key = (transaction.user_id, transaction.date, transaction.category_id, transaction.transaction_type)
+            total, count = self.deltas.get(key, (0, 0))
+            self.deltas[key] = (total + transaction.amount, count + 1)
+        self.created += len(self.pending)
+        self.pending = []
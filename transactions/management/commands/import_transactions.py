@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+import time
+
+from transactions.importers import TransactionImporter, ImportValidationError, parse_csv, parse_ofx
+
+
+class Command(BaseCommand):
+    help = 'Import transactions from a CSV or OFX bank statement'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to the statement file')
+        parser.add_argument('--user', required=True, help='Username to import the transactions for')
+        parser.add_argument('--format', choices=['csv', 'ofx'], help='File format (defaults to the file extension)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--encoding', default='utf-8-sig')
+        parser.add_argument('--date-format', default='%Y-%m-%d', help='strptime format of the CSV date column')
+        for field in ('date', 'amount', 'description', 'category', 'type'):
+            parser.add_argument(f'--{field}-column', help=f'CSV column holding the {field}')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['user']}' does not exist")
+
+        format_type = options['format'] or options['path'].rsplit('.', 1)[-1].lower()
+        if format_type not in ('csv', 'ofx', 'qfx'):
+            raise CommandError(f"Unsupported format: {format_type}")
+
+        columns = {
+            field: options[f'{field}_column']
+            for field in ('date', 'amount', 'description', 'category', 'type')
+            if options[f'{field}_column']
+        }
+
+        started = time.monotonic()
+        importer = TransactionImporter(user, batch_size=options['batch_size'])
+        with open(options['path'], encoding=options['encoding'], newline='') as lines:
+            if format_type == 'csv':
+                rows = parse_csv(lines, columns, options['date_format'])
+            else:
+                rows = parse_ofx(lines)
+            try:
+                importer.run(rows)
+            except ImportValidationError as e:
+                raise CommandError(str(e))
+        elapsed = time.monotonic() - started
+
+        for line_num, message in importer.errors:
+            self.stdout.write(self.style.WARNING(f'Line {line_num}: {message}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {importer.created} transactions ({importer.skipped} skipped) in {elapsed:.1f}s'
+        ))
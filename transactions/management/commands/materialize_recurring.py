@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from datetime import datetime
+import time
+
+from transactions.recurring import materialize_due
+
+
+class Command(BaseCommand):
+    help = 'Post transactions for every recurring schedule that has come due'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Materialize occurrences up to this date (YYYY-MM-DD, default today)')
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Schedules locked and posted per database transaction')
+        parser.add_argument('--every', type=float, default=None,
+                            help='Keep running and check for due schedules every N seconds')
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError(f"Invalid date: {options['date']}")
+
+        while True:
+            started = time.monotonic()
+            schedules, created = materialize_due(today, batch_size=max(1, options['batch_size']))
+            self.stdout.write(self.style.SUCCESS(
+                f'Posted {created} transactions from {schedules} recurring schedules '
+                f'in {time.monotonic() - started:.1f}s'
+            ))
+            if options['every'] is None:
+                break
+            time.sleep(options['every'])
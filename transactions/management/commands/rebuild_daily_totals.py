@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+
+from transactions.models import DailyTotal
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily transaction rollup table from raw transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Only rebuild totals for this username')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['user']}' does not exist")
+
+        DailyTotal.objects.rebuild(user=user)
+
+        totals = DailyTotal.objects.all()
+        if user is not None:
+            totals = totals.filter(user=user)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {totals.count()} daily totals'))
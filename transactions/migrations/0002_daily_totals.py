@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:26
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_daily_totals(apps, schema_editor):
+    Transaction = apps.get_model('transactions', 'Transaction')
+    DailyTotal = apps.get_model('transactions', 'DailyTotal')
+
+    grouped = Transaction.objects.order_by().values(
+        'user_id', 'date', 'category_id', 'transaction_type'
+    ).annotate(total=models.Sum('amount'), count=models.Count('id'))
+
+    DailyTotal.objects.bulk_create((DailyTotal(**row) for row in grouped.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('transactions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('transaction_type', models.CharField(choices=[('income', 'Income'), ('expense', 'Expense')], max_length=10)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_totals', to='transactions.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_totals', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'daily_totals',
+                'ordering': ['date'],
+                'unique_together': {('user', 'date', 'category', 'transaction_type')},
+            },
+        ),
+        migrations.RunPython(backfill_daily_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,149 @@
+from django.db import migrations
+
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE transaction_search USING fts5(
+        owner, description, category,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER transaction_search_insert AFTER INSERT ON transactions BEGIN
+        INSERT INTO transaction_search (rowid, owner, description, category)
+        SELECT new.id, 'u' || new.user_id, coalesce(new.description, ''), name
+        FROM categories WHERE id = new.category_id;
+    END
+    """,
+    """
+    CREATE TRIGGER transaction_search_update AFTER UPDATE OF user_id, category_id, description ON transactions BEGIN
+        DELETE FROM transaction_search WHERE rowid = old.id;
+        INSERT INTO transaction_search (rowid, owner, description, category)
+        SELECT new.id, 'u' || new.user_id, coalesce(new.description, ''), name
+        FROM categories WHERE id = new.category_id;
+    END
+    """,
+    """
+    CREATE TRIGGER transaction_search_delete AFTER DELETE ON transactions BEGIN
+        DELETE FROM transaction_search WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER transaction_search_category_update AFTER UPDATE OF name ON categories
+    WHEN old.name IS NOT new.name BEGIN
+        UPDATE transaction_search SET category = new.name
+        WHERE rowid IN (SELECT id FROM transactions WHERE category_id = new.id);
+    END
+    """,
+    """
+    INSERT INTO transaction_search (rowid, owner, description, category)
+    SELECT t.id, 'u' || t.user_id, coalesce(t.description, ''), c.name
+    FROM transactions t JOIN categories c ON c.id = t.category_id
+    """,
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS transaction_search_category_update",
+    "DROP TRIGGER IF EXISTS transaction_search_delete",
+    "DROP TRIGGER IF EXISTS transaction_search_update",
+    "DROP TRIGGER IF EXISTS transaction_search_insert",
+    "DROP TABLE IF EXISTS transaction_search",
+]
+
+POSTGRESQL_FORWARD = [
+    """
+    CREATE TABLE transaction_search (
+        transaction_id bigint PRIMARY KEY,
+        user_id integer NOT NULL,
+        document tsvector NOT NULL
+    )
+    """,
+    "CREATE INDEX transaction_search_document_idx ON transaction_search USING GIN (document)",
+    "CREATE INDEX transaction_search_user_idx ON transaction_search (user_id)",
+    """
+    CREATE FUNCTION transaction_search_refresh() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            DELETE FROM transaction_search WHERE transaction_id = OLD.id;
+            RETURN NULL;
+        END IF;
+        INSERT INTO transaction_search (transaction_id, user_id, document)
+        SELECT NEW.id, NEW.user_id,
+               setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'A') ||
+               setweight(to_tsvector('simple', c.name), 'B')
+        FROM categories c WHERE c.id = NEW.category_id
+        ON CONFLICT (transaction_id) DO UPDATE
+        SET user_id = EXCLUDED.user_id, document = EXCLUDED.document;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER transaction_search_refresh
+    AFTER INSERT OR DELETE OR UPDATE OF user_id, category_id, description ON transactions
+    FOR EACH ROW EXECUTE FUNCTION transaction_search_refresh()
+    """,
+    """
+    CREATE FUNCTION transaction_search_category_refresh() RETURNS trigger AS $$
+    BEGIN
+        UPDATE transaction_search s
+        SET document = setweight(to_tsvector('simple', coalesce(t.description, '')), 'A') ||
+                       setweight(to_tsvector('simple', NEW.name), 'B')
+        FROM transactions t
+        WHERE t.id = s.transaction_id AND t.category_id = NEW.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER transaction_search_category_refresh
+    AFTER UPDATE OF name ON categories
+    FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+    EXECUTE FUNCTION transaction_search_category_refresh()
+    """,
+    """
+    INSERT INTO transaction_search (transaction_id, user_id, document)
+    SELECT t.id, t.user_id,
+           setweight(to_tsvector('simple', coalesce(t.description, '')), 'A') ||
+           setweight(to_tsvector('simple', c.name), 'B')
+    FROM transactions t JOIN categories c ON c.id = t.category_id
+    """,
+]
+
+POSTGRESQL_REVERSE = [
+    "DROP TRIGGER IF EXISTS transaction_search_category_refresh ON categories",
+    "DROP FUNCTION IF EXISTS transaction_search_category_refresh()",
+    "DROP TRIGGER IF EXISTS transaction_search_refresh ON transactions",
+    "DROP FUNCTION IF EXISTS transaction_search_refresh()",
+    "DROP TABLE IF EXISTS transaction_search",
+]
+
+
+def create_search_index(apps, schema_editor):
+    statements = {
+        'sqlite': SQLITE_FORWARD,
+        'postgresql': POSTGRESQL_FORWARD,
+    }.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement, params=None)
+
+
+def drop_search_index(apps, schema_editor):
+    statements = {
+        'sqlite': SQLITE_REVERSE,
+        'postgresql': POSTGRESQL_REVERSE,
+    }.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0003_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:02
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce, TruncMonth
+import django.db.models.deletion
+
+
+def backfill_monthly_balances(apps, schema_editor):
+    DailyTotal = apps.get_model('transactions', 'DailyTotal')
+    MonthlyBalance = apps.get_model('transactions', 'MonthlyBalance')
+
+    money = models.DecimalField(max_digits=14, decimal_places=2)
+    grouped = DailyTotal.objects.annotate(month=TruncMonth('date')).order_by('user_id', 'month').values(
+        'user_id', 'month'
+    ).annotate(
+        income=Coalesce(models.Sum('total', filter=models.Q(transaction_type='income')), models.Value(0), output_field=money),
+        expense=Coalesce(models.Sum('total', filter=models.Q(transaction_type='expense')), models.Value(0), output_field=money)
+    )
+
+    def snapshot_rows():
+        user_id, balance = None, 0
+        for row in grouped.iterator():
+            if row['user_id'] != user_id:
+                user_id, balance = row['user_id'], 0
+            opening = balance
+            balance = opening + row['income'] - row['expense']
+            yield MonthlyBalance(opening=opening, closing=balance, **row)
+
+    MonthlyBalance.objects.bulk_create(snapshot_rows(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('transactions', '0005_data_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('opening', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('income', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('expense', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('closing', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_balances', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'monthly_balances',
+                'ordering': ['month'],
+                'unique_together': {('user', 'month')},
+            },
+        ),
+        migrations.RunPython(backfill_monthly_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:35
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0007_category_version'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='monthlybalance',
+            name='closing',
+        ),
+        migrations.RemoveField(
+            model_name='monthlybalance',
+            name='opening',
+        ),
+    ]
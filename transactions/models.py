@@ -1,4 +1,11 @@
-from django.db import models
+from django.db import models, connections, IntegrityError, transaction as db_transaction
+from django.db.models import (
+    F, Q, Sum, Count, Case, When, Value, OuterRef, Subquery, ExpressionWrapper
+)
+from django.db.models.functions import Cast, Coalesce, TruncMonth, TruncQuarter, TruncYear
+from django.db.models.lookups import Exact
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
 from django.utils import timezone
@@ -26,6 +33,76 @@ class Category(models.Model):
         return f"{self.name} ({self.get_category_type_display()})"
 
 
+ROLLUP_FIELDS = ('user_id', 'date', 'category_id', 'transaction_type', 'amount')
+
+# Columns read by transaction lists, the JSON APIs and the report exports
+LISTING_FIELDS = (
+    'date', 'transaction_type', 'amount', 'description', 'created_at',
+    'category__name', 'category__category_type', 'category__icon', 'category__color',
+)
+
+
+class TransactionQuerySet(models.QuerySet):
+    def for_listing(self):
+        """
+        Rows for displaying transactions: the category is joined in and only the
+        displayed columns are loaded, so transaction.category.name costs no query.
+        """
+        return self.select_related('category').only(*LISTING_FIELDS)
+
+    def update(self, **kwargs):
+        """Bulk update that keeps the daily totals and data versions in sync"""
+        touched = {name[:-3] if name.endswith('_id') else name for name in kwargs}
+        rollup_changed = bool(touched & {'user', 'date', 'category', 'transaction_type', 'amount'})
+
+        with db_transaction.atomic(using=self.db):
+            if rollup_changed:
+                # Both sides are grouped before the UPDATE: its expressions see the old row values
+                before = self.rollup_groups()
+                after = self.rollup_groups(self.rollup_expressions(kwargs))
+                user_ids = {key[0] for key in before} | {key[0] for key in after}
+                deltas = {key: (-total, -count) for key, (total, count) in before.items()}
+                for key, (total, count) in after.items():
+                    old_total, old_count = deltas.get(key, (0, 0))
+                    deltas[key] = (old_total + total, old_count + count)
+            else:
+                user_ids = set(self.order_by().values_list('user_id', flat=True).distinct())
+
+            rows = super().update(**kwargs)
+            if rollup_changed:
+                DailyTotal.objects.apply_deltas({
+                    key: delta for key, delta in deltas.items() if delta != (0, 0)
+                })
+
+            for user_id in user_ids:
+                DataVersion.objects.bump(user_id)
+        return rows
+
+    def rollup_expressions(self, kwargs):
+        """The rollup columns as they will read after update(**kwargs)"""
+        expressions = {}
+        for name in ('user', 'date', 'category', 'transaction_type', 'amount'):
+            field = self.model._meta.get_field(name)
+            value = kwargs.get(field.attname, kwargs.get(name, F(field.attname)))
+            if isinstance(value, models.Model):
+                value = value.pk
+            if not hasattr(value, 'resolve_expression'):
+                value = Value(value, output_field=field.target_field if field.is_relation else field)
+            expressions[field.attname] = value
+        return expressions
+
+    def rollup_groups(self, expressions=None):
+        """{(user_id, date, category_id, type): (total, count)} of the rows, optionally as rewritten"""
+        expressions = expressions or {name: F(name) for name in ROLLUP_FIELDS}
+        grouped = self.order_by().values(**{
+            f'rollup_{name}': expressions[name] for name in ROLLUP_FIELDS[:4]
+        }).annotate(rollup_total=Sum(expressions['amount']), rollup_count=Count('pk'))
+        return {
+            tuple(row[f'rollup_{name}'] for name in ROLLUP_FIELDS[:4]): (row['rollup_total'], row['rollup_count'])
+            for row in grouped
+        }
+
+
 class Transaction(models.Model):
     TRANSACTION_TYPES = [
         ('income', 'Income'),
@@ -41,13 +118,57 @@ class Transaction(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = TransactionQuerySet.as_manager()
+
     class Meta:
         db_table = 'transactions'
         ordering = ['-date', '-created_at']
+        indexes = [
+            # Per-type date range aggregates; amount last so the index covers Sum('amount')
+            models.Index(fields=['user', 'transaction_type', 'date', 'amount'], name='txn_user_type_date_idx'),
+            # Budget spending per category
+            models.Index(fields=['user', 'category', 'transaction_type', 'date'], name='txn_user_cat_type_date_idx'),
+            # Transaction list ordering and keyset pagination
+            models.Index(fields=['user', '-date', '-created_at', '-id'], name='txn_user_date_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.get_transaction_type_display()}: {self.amount} - {self.category.name}"
 
+    def get_rollup_state(self):
+        """Return the (user, date, category, type, amount) tuple this row contributes to DailyTotal"""
+        return (
+            self.user_id,
+            self._meta.get_field('date').to_python(self.date),
+            self.category_id,
+            self.transaction_type,
+            self._meta.get_field('amount').to_python(self.amount),
+        )
+
+    def get_stored_rollup_state(self):
+        """The rollup tuple of the stored row, locked; the instance itself may be stale"""
+        if self.pk is None or self._state.adding:
+            return None
+        stored = Transaction.objects.select_for_update().filter(pk=self.pk).values_list(*ROLLUP_FIELDS).first()
+        return tuple(stored) if stored else None
+
+    def save(self, *args, **kwargs):
+        with db_transaction.atomic(using=kwargs.get('using')):
+            previous = self.get_stored_rollup_state()
+            super().save(*args, **kwargs)
+
+            current = self.get_rollup_state()
+            if previous != current:
+                if previous is not None:
+                    DailyTotal.objects.apply_delta(*previous[:4], amount=-previous[4], count=-1)
+                DailyTotal.objects.apply_delta(*current[:4], amount=current[4], count=1)
+
+    def delete(self, *args, **kwargs):
+        with db_transaction.atomic(using=kwargs.get('using')):
+            # Read by the post_delete receiver instead of this instance's fields
+            self._rollup_state = self.get_stored_rollup_state()
+            return super().delete(*args, **kwargs)
+
     @property
     def is_income(self):
         return self.transaction_type == 'income'
@@ -82,6 +203,11 @@ class RecurringTransaction(models.Model):
     class Meta:
         db_table = 'recurring_transactions'
         ordering = ['next_occurrence']
+        indexes = [
+            # Partial index: Django renders is_active=True as a bare boolean, which a
+            # leading is_active column cannot serve on SQLite
+            models.Index(fields=['next_occurrence'], condition=Q(is_active=True), name='recurring_active_next_idx'),
+        ]
 
     def __str__(self):
         return f"Recurring {self.get_transaction_type_display()}: {self.amount} - {self.category.name}"
@@ -92,6 +218,51 @@ class RecurringTransaction(models.Model):
         super().save(*args, **kwargs)
 
 
+class BudgetQuerySet(models.QuerySet):
+    def with_usage(self):
+        """
+        Annotate period_start, spent_amount, remaining_amount and usage_percentage
+        for every budget through one correlated subquery over the daily totals.
+        """
+        period_start = Case(
+            When(period='monthly', then=TruncMonth('start_date')),
+            When(period='quarterly', then=TruncQuarter('start_date')),
+            default=TruncYear('start_date'),
+            output_field=models.DateField()
+        )
+        bucket = Case(
+            When(Exact(OuterRef('period'), 'monthly'), then=TruncMonth('date')),
+            When(Exact(OuterRef('period'), 'quarterly'), then=TruncQuarter('date')),
+            default=TruncYear('date'),
+            output_field=models.DateField()
+        )
+        spent = DailyTotal.objects.filter(
+            user=OuterRef('user'),
+            category=OuterRef('category'),
+            transaction_type='expense',
+            date__gte=OuterRef('period_start')
+        ).annotate(bucket=bucket).filter(
+            bucket=OuterRef('period_start')
+        ).order_by().values('user').annotate(spent=Sum('total')).values('spent')
+
+        money = models.DecimalField(max_digits=14, decimal_places=2)
+        return self.annotate(
+            period_start=period_start,
+            spent_amount=Coalesce(Subquery(spent, output_field=money), Value(0), output_field=money)
+        ).annotate(
+            remaining_amount=ExpressionWrapper(F('amount') - F('spent_amount'), output_field=money),
+            # A float on every backend, like get_usage_percentage(); the cast also
+            # keeps SQLite from dividing integers
+            usage_percentage=Case(
+                When(amount=0, then=Value(0.0)),
+                default=ExpressionWrapper(
+                    Cast('spent_amount', models.FloatField()) * 100 / F('amount'), output_field=models.FloatField()
+                ),
+                output_field=models.FloatField()
+            )
+        )
+
+
 class Budget(models.Model):
     PERIOD_CHOICES = [
         ('monthly', 'Monthly'),
@@ -109,18 +280,21 @@ class Budget(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = BudgetQuerySet.as_manager()
+
     class Meta:
         db_table = 'budgets'
         unique_together = ['user', 'category', 'period', 'start_date']
         ordering = ['-start_date']
+        indexes = [
+            models.Index(fields=['user', 'is_active'], name='budget_user_active_idx'),
+        ]
 
     def __str__(self):
         return f"{self.category.name} Budget: {self.amount} ({self.get_period_display()})"
 
-    def get_spent_amount(self):
-        """Calculate amount spent for this budget period"""
-        from django.db.models import Sum
-        
+    def get_period_window(self):
+        """Return the [start, end) dates of the budget period containing start_date"""
         if self.period == 'monthly':
             start_date = self.start_date.replace(day=1)
             if self.start_date.month == 12:
@@ -138,23 +312,367 @@ class Budget(models.Model):
                 end_date = self.start_date.replace(year=self.start_date.year + 1, month=1, day=1)
             else:
                 end_date = self.start_date.replace(month=start_month + 3, day=1)
-        
-        spent = Transaction.objects.filter(
+        return start_date, end_date
+
+    def get_spent_amount(self):
+        """Calculate amount spent for this budget period"""
+        # Budgets loaded through Budget.objects.with_usage() already carry the total
+        if hasattr(self, 'spent_amount'):
+            return self.spent_amount
+
+        start_date, end_date = self.get_period_window()
+        spent = DailyTotal.objects.filter(
             user=self.user,
             category=self.category,
             transaction_type='expense',
             date__gte=start_date,
             date__lt=end_date
-        ).aggregate(total=Sum('amount'))['total']
+        ).aggregate(total=Sum('total'))['total']
         
         return spent or 0
 
     def get_remaining_amount(self):
         """Calculate remaining budget amount"""
+        if hasattr(self, 'remaining_amount'):
+            return self.remaining_amount
         return self.amount - self.get_spent_amount()
 
     def get_usage_percentage(self):
         """Calculate budget usage percentage"""
+        if hasattr(self, 'usage_percentage'):
+            return self.usage_percentage
         if self.amount == 0:
-            return 0
-        return (self.get_spent_amount() / self.amount) * 100
\ No newline at end of file
+            return 0.0
+        return float(self.get_spent_amount()) * 100 / float(self.amount)
+
+
+class DailyTotalManager(models.Manager):
+    def apply_delta(self, user_id, date, category_id, transaction_type, amount, count):
+        """Add amount/count to a single (user, date, category, type) bucket"""
+        key = {
+            'user_id': user_id,
+            'date': date,
+            'category_id': category_id,
+            'transaction_type': transaction_type,
+        }
+        updated = self.filter(**key).update(total=F('total') + amount, count=F('count') + count)
+        if not updated:
+            if count < 0:
+                return
+            try:
+                with db_transaction.atomic():
+                    self.create(total=amount, count=count, **key)
+            except IntegrityError:
+                # Another writer created the bucket first
+                self.filter(**key).update(total=F('total') + amount, count=F('count') + count)
+        if count < 0:
+            self.filter(count__lte=0, **key).delete()
+        MonthlyBalance.objects.apply_deltas({(user_id, date, transaction_type): amount})
+
+    def record(self, transactions, sign=1):
+        """Apply a batch of Transaction instances, e.g. after bulk_create"""
+        deltas = {}
+        for transaction in transactions:
+            state = transaction.get_rollup_state()
+            total, count = deltas.get(state[:4], (0, 0))
+            deltas[state[:4]] = (total + state[4], count + 1)
+
+        self.apply_deltas({
+            key: (sign * total, sign * count) for key, (total, count) in deltas.items()
+        })
+
+    def apply_deltas(self, deltas):
+        """
+        Apply {(user_id, date, category_id, type): (amount, count)} in a few
+        queries: lock and read the touched buckets, then bulk update/create them.
+        """
+        if len(deltas) < 20:
+            for key, (amount, count) in deltas.items():
+                self.apply_delta(*key, amount=amount, count=count)
+            return
+
+        dates = [key[1] for key in deltas]
+        try:
+            with db_transaction.atomic():
+                existing = {
+                    (row.user_id, row.date, row.category_id, row.transaction_type): row
+                    for row in self.select_for_update().filter(
+                        user_id__in={key[0] for key in deltas},
+                        date__gte=min(dates),
+                        date__lte=max(dates)
+                    )
+                }
+
+                changed, created, emptied = [], [], []
+                balances = {}
+                for key, (amount, count) in deltas.items():
+                    row = existing.get(key)
+                    if row is None:
+                        if count > 0:
+                            created.append(self.model(
+                                user_id=key[0], date=key[1], category_id=key[2],
+                                transaction_type=key[3], total=amount, count=count
+                            ))
+                            balances[(key[0], key[1], key[3])] = balances.get((key[0], key[1], key[3]), 0) + amount
+                        continue
+                    balances[(key[0], key[1], key[3])] = balances.get((key[0], key[1], key[3]), 0) + amount
+                    row.total += amount
+                    row.count += count
+                    if row.count > 0:
+                        changed.append(row)
+                    else:
+                        emptied.append(row.pk)
+
+                if changed:
+                    # executemany avoids bulk_update's per-row CASE expressions
+                    with connections[self.db].cursor() as cursor:
+                        cursor.executemany(
+                            f'UPDATE {self.model._meta.db_table} SET total = %s, count = %s WHERE id = %s',
+                            [(row.total, row.count, row.pk) for row in changed]
+                        )
+                self.bulk_create(created, batch_size=500)
+                self.filter(pk__in=emptied).delete()
+                MonthlyBalance.objects.apply_deltas(balances)
+        except IntegrityError:
+            # Another writer created one of the buckets first; fall back to per-bucket updates
+            for key, (amount, count) in deltas.items():
+                self.apply_delta(*key, amount=amount, count=count)
+
+    def rebuild(self, user=None):
+        """Recompute daily totals from the raw transactions table"""
+        transactions = Transaction.objects.all()
+        totals = self.all()
+        if user is not None:
+            transactions = transactions.filter(user=user)
+            totals = totals.filter(user=user)
+
+        grouped = transactions.order_by().values(
+            'user_id', 'date', 'category_id', 'transaction_type'
+        ).annotate(total=Sum('amount'), count=Count('id'))
+
+        with db_transaction.atomic():
+            totals.delete()
+            self.bulk_create((self.model(**row) for row in grouped.iterator()), batch_size=1000)
+            MonthlyBalance.objects.rebuild(user=user)
+
+
+class DailyTotal(models.Model):
+    """Per-day rollup of transaction amounts, kept in sync by Transaction writes"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_totals')
+    date = models.DateField()
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='daily_totals')
+    transaction_type = models.CharField(max_length=10, choices=Transaction.TRANSACTION_TYPES)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+
+    objects = DailyTotalManager()
+
+    class Meta:
+        db_table = 'daily_totals'
+        unique_together = ['user', 'date', 'category', 'transaction_type']
+        ordering = ['date']
+        indexes = [
+            models.Index(fields=['user', 'category', 'transaction_type', 'date'], name='daily_user_cat_type_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.get_transaction_type_display()}: {self.total} - {self.category_id}"
+
+
+class MonthlyBalanceManager(models.Manager):
+    def apply_deltas(self, deltas):
+        """
+        Apply {(user_id, date, type): amount} to the month rows: each touched
+        month's income or expense moves by F() increments, and missing months are
+        inserted. Nothing else is locked or rewritten, so a backdated write costs
+        the same as a current one.
+        """
+        months = {}
+        for (user_id, date, transaction_type), amount in deltas.items():
+            if not amount:
+                continue
+            key = (user_id, date.replace(day=1))
+            income, expense = months.get(key, (0, 0))
+            if transaction_type == 'income':
+                months[key] = (income + amount, expense)
+            else:
+                months[key] = (income, expense + amount)
+        if not months:
+            return
+
+        with db_transaction.atomic(using=self.db):
+            for (user_id, month), (income, expense) in sorted(months.items()):
+                rows = self.filter(user_id=user_id, month=month)
+                if not rows.update(income=F('income') + income, expense=F('expense') + expense):
+                    try:
+                        with db_transaction.atomic(using=self.db):
+                            self.create(user_id=user_id, month=month, income=income, expense=expense)
+                    except IntegrityError:
+                        # Another writer created the month first
+                        rows.update(income=F('income') + income, expense=F('expense') + expense)
+                if income < 0 or expense < 0:
+                    # Like emptied daily buckets, a month left without transactions is dropped
+                    rows.filter(income=0, expense=0).delete()
+
+    def balances_before(self, month, user_ids):
+        """{user_id: balance carried into ``month``}, the net of every earlier month, for users that have one"""
+        return dict(self.filter(user_id__in=user_ids, month__lt=month).order_by().values('user_id').annotate(
+            balance=Sum(F('income') - F('expense'))
+        ).values_list('user_id', 'balance'))
+
+    def rebuild(self, user=None):
+        """Recompute the month rows from the daily totals"""
+        totals = DailyTotal.objects.all()
+        months = self.all()
+        if user is not None:
+            totals = totals.filter(user=user)
+            months = months.filter(user=user)
+
+        money = models.DecimalField(max_digits=14, decimal_places=2)
+        grouped = totals.annotate(month=TruncMonth('date')).order_by('user_id', 'month').values(
+            'user_id', 'month'
+        ).annotate(
+            income=Coalesce(Sum('total', filter=Q(transaction_type='income')), Value(0), output_field=money),
+            expense=Coalesce(Sum('total', filter=Q(transaction_type='expense')), Value(0), output_field=money)
+        )
+
+        with db_transaction.atomic(using=self.db):
+            months.delete()
+            self.bulk_create((self.model(**row) for row in grouped.iterator()), batch_size=1000)
+
+
+class MonthlyBalance(models.Model):
+    """
+    Per-user month totals kept in sync with the daily totals. The balance
+    carried into a month is the net of the months before it.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='monthly_balances')
+    month = models.DateField(help_text='First day of the month')
+    income = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    expense = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    objects = MonthlyBalanceManager()
+
+    class Meta:
+        db_table = 'monthly_balances'
+        unique_together = ['user', 'month']
+        ordering = ['month']
+
+    def __str__(self):
+        return f"{self.user_id} {self.month:%Y-%m}: +{self.income} -{self.expense}"
+
+
+@receiver(post_delete, sender=Transaction)
+def remove_transaction_from_daily_totals(sender, instance, origin=None, **kwargs):
+    # A deleted user's rollups cascade away; a deleted category's are settled once in its pre_delete
+    if is_user_deletion(origin) or is_category_deletion(origin):
+        return
+    state = getattr(instance, '_rollup_state', None) or instance.get_rollup_state()
+    DailyTotal.objects.apply_delta(*state[:4], amount=-state[4], count=-1)
+
+
+@receiver(pre_delete, sender=Category)
+def remove_category_from_balances(sender, instance, **kwargs):
+    """Take a deleted category's transactions out of the month totals; its daily totals cascade away"""
+    months = list(DailyTotal.objects.filter(category=instance).annotate(month=TruncMonth('date')).order_by().values(
+        'user_id', 'month', 'transaction_type'
+    ).annotate(amount=Sum('total')))
+    MonthlyBalance.objects.apply_deltas({
+        (row['user_id'], row['month'], row['transaction_type']): -row['amount'] for row in months
+    })
+
+    user_ids = {row['user_id'] for row in months}
+    user_ids.update(Budget.objects.filter(category=instance).values_list('user_id', flat=True))
+    for user_id in sorted(user_ids):
+        DataVersion.objects.bump(user_id)
+
+
+class DataVersionManager(models.Manager):
+    def get_version(self, user):
+        """Current data version for a user; 0 until their data is first written"""
+        user_id = getattr(user, 'pk', user)
+        return self.filter(user_id=user_id).values_list('version', flat=True).first() or 0
+
+    def bump(self, user):
+        """Advance the user's data version after any write to their data"""
+        user_id = getattr(user, 'pk', user)
+        if self.filter(user_id=user_id).update(version=F('version') + 1, updated_at=timezone.now()):
+            return
+        try:
+            with db_transaction.atomic():
+                self.create(user_id=user_id, version=1)
+        except IntegrityError:
+            self.filter(user_id=user_id).update(version=F('version') + 1, updated_at=timezone.now())
+
+
+class DataVersion(models.Model):
+    """Per-user counter bumped on every write, used to key caches of derived data"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='data_version')
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = DataVersionManager()
+
+    class Meta:
+        db_table = 'user_data_versions'
+
+    def __str__(self):
+        return f"{self.user_id} v{self.version}"
+
+
+def is_user_deletion(origin):
+    """Whether a delete signal was triggered by deleting the owning user itself"""
+    return isinstance(origin, User) or getattr(origin, 'model', None) is User
+
+
+def is_category_deletion(origin):
+    """Whether a delete signal was triggered by deleting a category, which settles its rows in bulk"""
+    return isinstance(origin, Category) or getattr(origin, 'model', None) is Category
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+@receiver(post_save, sender=Budget)
+@receiver(post_delete, sender=Budget)
+def bump_data_version(sender, instance, origin=None, **kwargs):
+    if not is_user_deletion(origin) and not is_category_deletion(origin):
+        DataVersion.objects.bump(instance.user_id)
+
+
+class CategoryVersionManager(models.Manager):
+    def get_version(self):
+        return self.get_state()[0]
+
+    def get_state(self):
+        """(version, updated_at) of the category table; (0, None) until categories are first written"""
+        return self.filter(pk=1).values_list('version', 'updated_at').first() or (0, None)
+
+    def bump(self):
+        if self.filter(pk=1).update(version=F('version') + 1, updated_at=timezone.now()):
+            return
+        try:
+            with db_transaction.atomic():
+                self.create(pk=1, version=1)
+        except IntegrityError:
+            self.filter(pk=1).update(version=F('version') + 1, updated_at=timezone.now())
+
+
+class CategoryVersion(models.Model):
+    """Single-row counter bumped on every category write, read by each process's category registry"""
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = CategoryVersionManager()
+
+    class Meta:
+        db_table = 'category_versions'
+
+    def __str__(self):
+        return f"categories v{self.version}"
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_registry(sender, **kwargs):
+    from .categories import registry
+    registry.invalidate()
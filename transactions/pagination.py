@@ -0,0 +1,76 @@
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_date, parse_datetime
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(transaction):
+    """Build an opaque cursor pointing just after ``transaction``"""
+    position = [transaction.date.isoformat(), transaction.created_at.isoformat(), transaction.pk]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return the (date, created_at, id) position stored in a cursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        date, created_at, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        position = (parse_date(date), parse_datetime(created_at), int(pk))
+    except (ValueError, TypeError):
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}")
+    if None in position:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}")
+    return position
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Seek pagination over the ('-date', '-created_at', '-id') transaction order.
+
+    Each page continues strictly after the last row of the previous one, so
+    page N costs the same as page 1 and rows inserted meanwhile never shift
+    or duplicate results.
+    """
+    ordering = ('-date', '-created_at', '-id')
+
+    def __init__(self, queryset, per_page=50):
+        self.queryset = queryset.order_by(*self.ordering)
+        self.per_page = per_page
+
+    def get_page(self, cursor=None):
+        queryset = self.queryset
+        if cursor:
+            date, created_at, pk = decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(date__lt=date) |
+                Q(date=date, created_at__lt=created_at) |
+                Q(date=date, created_at=created_at, pk__lt=pk)
+            )
+
+        rows = list(queryset[:self.per_page + 1])
+        next_cursor = None
+        if len(rows) > self.per_page:
+            rows = rows[:self.per_page]
+            next_cursor = encode_cursor(rows[-1])
+        return KeysetPage(rows, next_cursor)
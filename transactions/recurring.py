@@ -0,0 +1,110 @@
+import calendar
+from datetime import date, timedelta
+
+from django.db import transaction as db_transaction
+from django.utils import timezone
+
+from .models import Transaction, RecurringTransaction, DailyTotal, DataVersion
+
+
+MONTH_STEPS = {
+    'monthly': 1,
+    'quarterly': 3,
+    'yearly': 12,
+}
+
+
+def add_months(day, months, anchor_day):
+    """Move ``day`` by whole months, keeping the schedule's day of month where it exists"""
+    index = day.year * 12 + day.month - 1 + months
+    year, month = index // 12, index % 12 + 1
+    return date(year, month, min(anchor_day, calendar.monthrange(year, month)[1]))
+
+
+def following_occurrence(recurring, current):
+    """Return the occurrence after ``current`` for a schedule"""
+    if recurring.frequency == 'daily':
+        return current + timedelta(days=1)
+    if recurring.frequency == 'weekly':
+        return current + timedelta(weeks=1)
+    # Anchor on start_date so Jan 31 -> Feb 29 -> Mar 31 instead of drifting to the 29th
+    return add_months(current, MONTH_STEPS[recurring.frequency], recurring.start_date.day)
+
+
+def due_occurrences(recurring, today):
+    """
+    Return (dates, next_occurrence) for every occurrence up to ``today``,
+    stopping at end_date. next_occurrence is None once the schedule is over.
+    """
+    dates = []
+    current = recurring.next_occurrence
+    while current <= today:
+        if recurring.end_date and current > recurring.end_date:
+            return dates, None
+        dates.append(current)
+        current = following_occurrence(recurring, current)
+
+    if recurring.end_date and current > recurring.end_date:
+        return dates, None
+    return dates, current
+
+
+def materialize_batch(today, batch_size=100):
+    """
+    Post the due occurrences of up to ``batch_size`` schedules in one
+    transaction. Rows locked by another worker are skipped, so several
+    workers can split the backlog without posting an occurrence twice.
+    Returns (schedules processed, transactions created).
+    """
+    now = timezone.now()
+    with db_transaction.atomic():
+        schedules = list(
+            RecurringTransaction.objects.select_for_update(skip_locked=True).filter(
+                is_active=True,
+                next_occurrence__lte=today
+            ).order_by('next_occurrence')[:batch_size]
+        )
+        if not schedules:
+            return 0, 0
+
+        transactions = []
+        for recurring in schedules:
+            dates, next_occurrence = due_occurrences(recurring, today)
+            transactions.extend(
+                Transaction(
+                    user_id=recurring.user_id,
+                    transaction_type=recurring.transaction_type,
+                    category_id=recurring.category_id,
+                    amount=recurring.amount,
+                    description=recurring.description,
+                    date=day
+                )
+                for day in dates
+            )
+            if next_occurrence is None:
+                # Past end_date: drop out of the active schedule index
+                recurring.is_active = False
+            else:
+                recurring.next_occurrence = next_occurrence
+            recurring.updated_at = now
+
+        Transaction.objects.bulk_create(transactions, batch_size=1000)
+        DailyTotal.objects.record(transactions)
+        RecurringTransaction.objects.bulk_update(schedules, ['next_occurrence', 'is_active', 'updated_at'])
+        for user_id in {transaction.user_id for transaction in transactions}:
+            DataVersion.objects.bump(user_id)
+
+    return len(schedules), len(transactions)
+
+
+def materialize_due(today=None, batch_size=100):
+    """Post every due occurrence up to ``today``; returns (schedules, transactions)"""
+    today = today or timezone.now().date()
+    schedules = created = 0
+    while True:
+        batch_schedules, batch_created = materialize_batch(today, batch_size)
+        if not batch_schedules:
+            break
+        schedules += batch_schedules
+        created += batch_created
+    return schedules, created
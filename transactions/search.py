@@ -0,0 +1,93 @@
+"""
+Full-text search over transaction descriptions and category names, backed by
+the transaction_search table from migration 0004 (FTS5 on SQLite, tsvector +
+GIN on PostgreSQL) and kept in sync by database triggers.
+"""
+import re
+
+from django.db import connections
+from django.db.models import Q, FloatField
+from django.db.models.expressions import RawSQL
+
+
+SEARCH_TABLE = 'transaction_search'
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+_available = {}
+
+
+def search_index_available(using='default'):
+    """Whether the full-text index table exists on this database"""
+    if using not in _available:
+        connection = connections[using]
+        _available[using] = (
+            connection.vendor in ('sqlite', 'postgresql')
+            and SEARCH_TABLE in connection.introspection.table_names()
+        )
+    return _available[using]
+
+
+def get_terms(query):
+    return TOKEN_RE.findall((query or '').lower())
+
+
+def build_match(terms, vendor):
+    """Build a prefix-matching query in the backend's syntax; every term must match"""
+    if vendor == 'sqlite':
+        return '{description category}: (' + ' '.join(f'"{term}"*' for term in terms) + ')'
+    return ' & '.join(f'{term}:*' for term in terms)
+
+
+def _match_sql(vendor, user_id):
+    if vendor == 'sqlite':
+        if user_id is not None:
+            return f"{SEARCH_TABLE} MATCH %s", lambda match: [f'owner:u{user_id} AND {match}']
+        return f"{SEARCH_TABLE} MATCH %s", lambda match: [match]
+
+    condition = "document @@ to_tsquery('simple', %s)"
+    if user_id is not None:
+        return condition + " AND user_id = %s", lambda match: [match, user_id]
+    return condition, lambda match: [match]
+
+
+def search_transactions(queryset, query, user=None, rank=False):
+    """
+    Restrict a Transaction queryset to rows matching ``query``.
+
+    Every word in the query is matched as a prefix against the description and
+    category name. Passing ``user`` scopes the index lookup itself to that
+    user's rows. With ``rank=True`` the results carry a ``search_rank``
+    annotation (higher is better) and are ordered by it.
+    """
+    terms = get_terms(query)
+    if not terms:
+        return queryset
+
+    if not search_index_available(queryset.db):
+        condition = Q()
+        for term in terms:
+            condition &= Q(description__icontains=term) | Q(category__name__icontains=term)
+        return queryset.filter(condition)
+
+    vendor = connections[queryset.db].vendor
+    match = build_match(terms, vendor)
+    where, params = _match_sql(vendor, getattr(user, 'pk', user))
+    table = queryset.model._meta.db_table
+
+    if vendor == 'sqlite':
+        ids = f"SELECT rowid FROM {SEARCH_TABLE} WHERE {where}"
+        score = f"SELECT -bm25({SEARCH_TABLE}) FROM {SEARCH_TABLE} WHERE {where} AND rowid = {table}.id"
+    else:
+        ids = f"SELECT transaction_id FROM {SEARCH_TABLE} WHERE {where}"
+        score = (
+            f"SELECT ts_rank(document, to_tsquery('simple', %s)) FROM {SEARCH_TABLE} "
+            f"WHERE transaction_id = {table}.id"
+        )
+
+    queryset = queryset.filter(pk__in=RawSQL(ids, params(match)))
+    if rank:
+        score_params = params(match) if vendor == 'sqlite' else [match]
+        queryset = queryset.annotate(
+            search_rank=RawSQL(score, score_params, output_field=FloatField())
+        ).order_by('-search_rank', '-date', '-created_at')
+    return queryset
@@ -1,3 +1,1113 @@
-from django.test import TestCase
+import base64
+import csv
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction as db_transaction
+from django.db.models import F
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .categories import CategoryRegistry, registry as categories
+from .concurrency import gather_queries
+from .forms import TransactionForm
+from .importers import ImportValidationError, TransactionImporter, parse_csv, parse_ofx
+from .ledger import balance_at, position, running_balances
+from .pagination import InvalidCursor, KeysetPaginator, decode_cursor, encode_cursor
+from .recurring import materialize_batch, materialize_due
+from .search import SEARCH_TABLE, search_index_available, search_transactions
+from .models import (
+    Category, CategoryVersion, DataVersion, Transaction, Budget, RecurringTransaction, DailyTotal, MonthlyBalance
+)
+
+
+class ConstantQueryCountMixin:
+    """
+    Checks that a code path runs the same number of queries however many rows
+    it renders, i.e. that nothing is loaded per row.
+    """
+
+    def setUp(self):
+        super().setUp()
+        # The version row rolls back with each test, so an earlier test's snapshot can match it
+        categories.clear()
+
+    def assertConstantQueries(self, func, add_rows, sizes=(1, 12)):
+        counts = {}
+        created = 0
+        for size in sizes:
+            add_rows(created, size - created)
+            created = size
+            # Warm up first so one-off loads (sessions, the category registry) are not counted
+            func()
+            with CaptureQueriesContext(connection) as queries:
+                func()
+            counts[size] = len(queries)
+        self.assertEqual(
+            len(set(counts.values())), 1,
+            f'Query count grows with the number of rows: {counts}'
+        )
+
+
+class DailyTotalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', 'owner@example.com', 'secret123')
+        cls.salary = Category.objects.create(name='Salary', category_type='income')
+        cls.food = Category.objects.create(name='Food', category_type='expense')
+        cls.rent = Category.objects.create(name='Rent', category_type='expense')
+
+    def add(self, day, amount, category=None):
+        category = category or self.food
+        return Transaction.objects.create(
+            user=self.user,
+            transaction_type=category.category_type,
+            category=category,
+            amount=Decimal(amount),
+            date=day
+        )
+
+    def totals(self):
+        return list(DailyTotal.objects.filter(user=self.user).order_by(
+            'date', 'category_id', 'transaction_type'
+        ).values_list('date', 'category_id', 'transaction_type', 'total', 'count'))
+
+    def balances(self):
+        return list(MonthlyBalance.objects.filter(user=self.user).order_by('month').values_list(
+            'month', 'income', 'expense'
+        ))
+
+    def assertMatchesRebuild(self):
+        incremental = self.totals(), self.balances()
+        DailyTotal.objects.rebuild(user=self.user)
+        self.assertEqual(incremental, (self.totals(), self.balances()))
+
+    def test_instance_writes(self):
+        first = self.add(date(2024, 3, 1), '10.00')
+        self.add(date(2024, 3, 1), '5.50')
+        self.add(date(2024, 3, 2), '1200.00', self.salary)
+        self.assertMatchesRebuild()
+        self.assertIn((date(2024, 3, 1), self.food.pk, 'expense', Decimal('15.50'), 2), self.totals())
+
+        first.amount = Decimal('12.00')
+        first.save()
+        self.assertMatchesRebuild()
+
+        first.date = date(2024, 3, 5)
+        first.save()
+        self.assertMatchesRebuild()
+
+        # Instances loaded without the rollup fields fall back to reading the stored row
+        moved = Transaction.objects.only('pk').get(pk=first.pk)
+        moved.category = self.rent
+        moved.save()
+        self.assertMatchesRebuild()
+
+        first.delete()
+        self.assertMatchesRebuild()
+        self.assertNotIn(date(2024, 3, 5), [row[0] for row in self.totals()])
+
+    def test_queryset_update(self):
+        for day in range(1, 6):
+            self.add(date(2024, 4, day), '20.00')
+        self.add(date(2024, 4, 1), '900.00', self.salary)
+
+        Transaction.objects.filter(category=self.food, date__lte=date(2024, 4, 2)).update(category=self.rent)
+        self.assertMatchesRebuild()
+        Transaction.objects.filter(category=self.food).update(date=date(2024, 5, 1))
+        self.assertMatchesRebuild()
+        Transaction.objects.filter(user=self.user).update(amount=Decimal('3.00'))
+        self.assertMatchesRebuild()
+        # Fields outside the rollup leave the totals alone
+        Transaction.objects.filter(user=self.user).update(description='Edited')
+        self.assertMatchesRebuild()
+
+        Transaction.objects.filter(date=date(2024, 5, 1)).delete()
+        self.assertMatchesRebuild()
+
+    def test_queryset_update_with_expressions(self):
+        for day in range(1, 4):
+            self.add(date(2024, 4, day), '20.00')
+        self.add(date(2024, 4, 1), '900.00', self.salary)
+
+        # The filter no longer matches the rows once they are updated
+        Transaction.objects.filter(amount=Decimal('20.00')).update(amount=F('amount') * 2, category=self.rent.pk)
+        self.assertMatchesRebuild()
+        self.assertEqual(Transaction.objects.filter(category=self.rent, amount=Decimal('40.00')).count(), 3)
+        Transaction.objects.filter(user=self.user).update(category_id=F('category_id'))
+        self.assertMatchesRebuild()
+
+    def test_category_delete(self):
+        other = User.objects.create_user('other', 'other@example.com', 'secret123')
+        for day in range(1, 4):
+            self.add(date(2024, 4, day), '20.00')
+            self.add(date(2024, 5, day), '15.00', self.rent)
+        self.add(date(2024, 4, 1), '900.00', self.salary)
+        Transaction.objects.create(user=other, transaction_type='expense', category=self.food,
+                                   amount=Decimal('7.00'), date=date(2024, 4, 1))
+        versions = DataVersion.objects.get_version(self.user), DataVersion.objects.get_version(other)
+
+        self.food.delete()
+        self.assertMatchesRebuild()
+        self.assertEqual(MonthlyBalance.objects.filter(user=other).count(), 0)
+        # One bump per affected user, not one per deleted row
+        self.assertEqual(
+            (DataVersion.objects.get_version(self.user), DataVersion.objects.get_version(other)),
+            (versions[0] + 1, versions[1] + 1)
+        )
+
+    def test_user_delete_skips_rollups(self):
+        def delete_user(transactions):
+            user = User.objects.create_user(f'gone{transactions}', password='secret123')
+            for number in range(transactions):
+                Transaction.objects.create(user=user, transaction_type='expense', category=self.food,
+                                           amount=Decimal('1.00'), date=date(2024, 1, 1) + timedelta(days=number))
+            with CaptureQueriesContext(connection) as queries:
+                user.delete()
+            self.assertFalse(DailyTotal.objects.filter(user_id=user.pk).exists())
+            return len(queries)
+
+        self.assertEqual(delete_user(3), delete_user(30))
+
+
+OFX_STATEMENT = """OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20240305120000[-5:EST]
+<TRNAMT>-42.10
+<NAME>GROCERY MART
+</STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20240306<TRNAMT>1500.00<NAME>ACME PAYROLL<MEMO>March salary</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+
+class ImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', 'owner@example.com', 'secret123')
+        cls.groceries = Category.objects.create(name='Groceries', category_type='expense')
+        cls.other_expenses = Category.objects.create(name='Other Expenses', category_type='expense')
+        cls.salary = Category.objects.create(name='Salary', category_type='income')
+        Category.objects.create(name='Archived', category_type='expense', is_active=False)
+
+    def setUp(self):
+        # The version row rolls back with each test, so an earlier test's snapshot can match it
+        categories.clear()
+
+    def import_csv(self, text, **kwargs):
+        return TransactionImporter(self.user, **kwargs).run(parse_csv(io.StringIO(text)))
+
+    def assertMatchesRebuild(self):
+        def snapshot():
+            return (
+                list(DailyTotal.objects.order_by('date', 'category_id', 'transaction_type').values_list(
+                    'date', 'category_id', 'transaction_type', 'total', 'count'
+                )),
+                list(MonthlyBalance.objects.values_list('month', 'income', 'expense')),
+            )
+        incremental = snapshot()
+        DailyTotal.objects.rebuild(user=self.user)
+        self.assertEqual(incremental, snapshot())
+
+    def test_malformed_rows_are_reported(self):
+        importer = self.import_csv(
+            'date,amount,description,category,type\n'
+            '2024-03-01,12.50,Bread,groceries,expense\n'
+            '2024-03-02,twelve,Milk,Groceries,expense\n'
+            '03/02/2024,4.00,Eggs,Groceries,expense\n'
+            '2024-03-03,0.001,Rounding,Groceries,expense\n'
+            '2024-03-04,"-1,250.00",Rent,,\n'
+        )
+        self.assertEqual((importer.created, importer.skipped), (2, 3))
+        self.assertEqual([line for line, _ in importer.errors], [3, 4, 5])
+        self.assertIn("invalid amount 'twelve'", importer.errors[0][1])
+
+        rent = Transaction.objects.get(description='Rent')
+        self.assertEqual((rent.transaction_type, rent.amount), ('expense', Decimal('1250.00')))
+        self.assertEqual(rent.category, self.other_expenses)
+
+        with self.assertRaises(ImportValidationError):
+            list(parse_csv(io.StringIO('when,value\n2024-03-01,1\n')))
+        rows = list(parse_csv(io.StringIO('when,value\n2024-03-01,1\n'), columns={'date': 'when', 'amount': 'value'}))
+        self.assertEqual((rows[0][1]['date'], rows[0][1]['amount']), ('2024-03-01', '1'))
+
+    def test_out_of_range_amounts_are_reported(self):
+        importer = self.import_csv(
+            'date,amount,type\n'
+            '2024-03-01,9999999999.99,income\n'
+            '2024-03-02,10000000000.00,income\n'
+            '2024-03-03,-9999999999.999,expense\n'
+            '2024-03-04,1e40,income\n'
+        )
+        self.assertEqual((importer.created, importer.skipped), (1, 3))
+        self.assertEqual([line for line, _ in importer.errors], [3, 4, 5])
+        self.assertIn('too large', importer.errors[0][1])
+        self.assertEqual(Transaction.objects.get().amount, Decimal('9999999999.99'))
+
+    def test_malformed_csv_is_a_file_error(self):
+        text = 'date,amount,description\n2024-03-01,1.00,' + 'x' * (csv.field_size_limit() + 1) + '\n'
+        with self.assertRaisesMessage(ImportValidationError, 'Malformed CSV after line 1'):
+            self.import_csv(text)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_category_matching(self):
+        importer = TransactionImporter(self.user)
+        self.assertEqual(importer.categories.resolve('expense', ' GROCERIES '), self.groceries.pk)
+        # Unknown, inactive or wrong-type names fall back to the type's default category
+        self.assertEqual(importer.categories.resolve('expense', 'Archived'), self.other_expenses.pk)
+        self.assertEqual(importer.categories.resolve('expense', 'Salary'), self.other_expenses.pk)
+        self.assertEqual(importer.categories.resolve('income', None), self.salary.pk)
+
+    def test_ofx(self):
+        rows = list(parse_ofx(io.StringIO(OFX_STATEMENT)))
+        self.assertEqual([row['date'] for _, row in rows], ['20240305', '20240306'])
+        self.assertEqual([row['description'] for _, row in rows], ['GROCERY MART', 'March salary'])
+
+        importer = TransactionImporter(self.user).run(rows)
+        self.assertEqual((importer.created, importer.skipped), (2, 0))
+        self.assertEqual(
+            list(Transaction.objects.order_by('date').values_list('date', 'transaction_type', 'amount')),
+            [(date(2024, 3, 5), 'expense', Decimal('42.10')), (date(2024, 3, 6), 'income', Decimal('1500.00'))]
+        )
+
+    def test_batches_keep_rollups_in_sync(self):
+        Transaction.objects.create(user=self.user, transaction_type='expense', category=self.groceries,
+                                   amount=Decimal('5.00'), date=date(2024, 1, 10))
+        lines = ['date,amount,category,type']
+        for number in range(120):
+            day = date(2024, 1, 1) + timedelta(days=number % 70)
+            category, transaction_type = ('Salary', 'income') if number % 5 == 0 else ('Groceries', 'expense')
+            lines.append(f'{day},{number + 1}.25,{category},{transaction_type}')
+        # Batches of 50 cover enough buckets to take the bulk update/create path
+        importer = self.import_csv('\n'.join(lines), batch_size=50)
+        self.assertEqual(importer.created, 120)
+        self.assertMatchesRebuild()
+
+        # A bulk update moves every bucket out and back in, emptying some of them
+        Transaction.objects.filter(user=self.user, date__lt=date(2024, 2, 1)).update(date=date(2024, 3, 15))
+        self.assertMatchesRebuild()
+
+
+class RecurringTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', 'owner@example.com', 'secret123')
+        cls.rent = Category.objects.create(name='Rent', category_type='expense')
+
+    def schedule(self, frequency, start_date, **kwargs):
+        return RecurringTransaction.objects.create(
+            user=self.user, transaction_type='expense', category=self.rent, amount=Decimal('800.00'),
+            frequency=frequency, start_date=start_date, **kwargs
+        )
+
+    def posted(self, recurring):
+        return list(Transaction.objects.filter(user=self.user, amount=recurring.amount).order_by(
+            'date'
+        ).values_list('date', flat=True))
+
+    def test_month_end_schedule_keeps_its_day(self):
+        recurring = self.schedule('monthly', date(2024, 1, 31))
+        self.assertEqual(materialize_due(date(2024, 5, 1)), (1, 4))
+        self.assertEqual(self.posted(recurring), [
+            date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30)
+        ])
+        recurring.refresh_from_db()
+        self.assertEqual(recurring.next_occurrence, date(2024, 5, 31))
+
+        # Nothing is posted twice
+        self.assertEqual(materialize_due(date(2024, 5, 1)), (0, 0))
+        self.assertEqual(DailyTotal.objects.get(date=date(2024, 2, 29)).total, Decimal('800.00'))
+
+    def test_schedule_ends(self):
+        recurring = self.schedule('quarterly', date(2023, 11, 30), end_date=date(2024, 6, 1))
+        materialize_due(date(2024, 12, 31))
+        self.assertEqual(self.posted(recurring), [date(2023, 11, 30), date(2024, 2, 29), date(2024, 5, 30)])
+        recurring.refresh_from_db()
+        self.assertFalse(recurring.is_active)
+
+    def test_batches(self):
+        for day in range(1, 6):
+            self.schedule('weekly', date(2024, 3, day))
+        self.assertEqual(materialize_batch(date(2024, 3, 14), batch_size=2), (2, 4))
+        self.assertEqual(materialize_due(date(2024, 3, 14), batch_size=2), (3, 6))
+        self.assertEqual(Transaction.objects.count(), 10)
+
+
+@skipUnlessDBFeature('has_select_for_update_skip_locked')
+class RecurringLockingTests(TransactionTestCase):
+    def test_locked_schedules_are_skipped(self):
+        user = User.objects.create_user('owner', 'owner@example.com', 'secret123')
+        rent = Category.objects.create(name='Rent', category_type='expense')
+        schedules = [
+            RecurringTransaction.objects.create(
+                user=user, transaction_type='expense', category=rent, amount=Decimal('800.00'),
+                frequency='monthly', start_date=date(2024, 1, day)
+            )
+            for day in (1, 2)
+        ]
+        locked, release = threading.Event(), threading.Event()
+
+        def other_worker():
+            with db_transaction.atomic():
+                RecurringTransaction.objects.select_for_update().get(pk=schedules[0].pk)
+                locked.set()
+                release.wait(10)
+            connection.close()
+
+        thread = threading.Thread(target=other_worker)
+        thread.start()
+        try:
+            locked.wait(10)
+            self.assertEqual(materialize_batch(date(2024, 1, 15)), (1, 1))
+            self.assertEqual(list(Transaction.objects.values_list('date', flat=True)), [date(2024, 1, 2)])
+        finally:
+            release.set()
+            thread.join()
+        self.assertEqual(materialize_batch(date(2024, 1, 15)), (1, 1))
+
+
+# A TransactionTestCase, as the async views query on pool threads with their own connections
+class AsyncViewTests(TransactionTestCase):
+
+    ENDPOINTS = [
+        ('transactions:api_stats', 'transactions:api_async_stats', {}),
+        ('transactions:api_monthly_trend', 'transactions:api_async_monthly_trend', {'months': 3}),
+        ('transactions:api_category_breakdown', 'transactions:api_async_category_breakdown', {}),
+        ('reports:income_expense_chart', 'reports:async_income_expense_chart', {'months': 3}),
+        ('reports:category_analysis', 'reports:async_category_analysis', {'period': 'last_3_months'}),
+        ('reports:trends_analysis', 'reports:async_trends_analysis', {'period': '3months'}),
+    ]
+
+    def setUp(self):
+        user = User.objects.create_user('owner', 'owner@example.com', 'secret123')
+        salary = Category.objects.create(name='Salary', category_type='income')
+        food = Category.objects.create(name='Food', category_type='expense')
+        today = date.today()
+        for days_ago, category, amount in [(0, salary, '900.00'), (0, food, '12.50'), (35, food, '40.00')]:
+            Transaction.objects.create(user=user, transaction_type=category.category_type, category=category,
+                                       amount=Decimal(amount), date=today - timedelta(days=days_ago))
+        self.client.force_login(user)
+        self.async_client.force_login(user)
+        self.expected = {}
+        for sync_name, async_name, params in self.ENDPOINTS:
+            self.expected[async_name] = self.client.get(reverse(sync_name), params).json()
+        cache.clear()
+
+    async def test_same_payloads(self):
+        for _, async_name, params in self.ENDPOINTS:
+            response = await self.async_client.get(reverse(async_name), params)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json(), self.expected[async_name], async_name)
+        self.assertEqual(self.expected['transactions:api_async_stats']['income'], 900.0)
+
+    async def test_not_modified(self):
+        url = reverse('transactions:api_async_stats')
+        etag = (await self.async_client.get(url))['ETag']
+        response = await self.async_client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    async def test_login_required(self):
+        anonymous = AsyncClient()
+        for _, async_name, params in self.ENDPOINTS:
+            response = await anonymous.get(reverse(async_name), params)
+            self.assertEqual(response.status_code, 302)
+            self.assertIn('?next=', response['Location'])
+
+    async def test_gather_queries_keeps_order(self):
+        results = await gather_queries(
+            (Transaction.objects.filter(transaction_type='income').count,),
+            (Transaction.objects.filter(transaction_type='expense').count,),
+        )
+        self.assertEqual(results, [1, 2])
+
+
+class BudgetUsageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', 'owner@example.com', 'secret123')
+        food = Category.objects.create(name='Food', category_type='expense')
+        rent = Category.objects.create(name='Rent', category_type='expense')
+        for day, category, amount in [
+            (date(2024, 1, 31), food, '99.00'),
+            (date(2024, 2, 1), food, '100.00'),
+            (date(2024, 2, 29), food, '50.00'),
+            (date(2024, 3, 1), food, '70.00'),
+            (date(2024, 4, 1), rent, '1.00'),
+            (date(2024, 6, 30), rent, '2.00'),
+            (date(2024, 7, 1), rent, '400.00'),
+        ]:
+            Transaction.objects.create(user=cls.user, transaction_type='expense', category=category,
+                                       amount=Decimal(amount), date=day)
+        cls.budgets = {
+            'monthly': Budget.objects.create(user=cls.user, category=food, amount=Decimal('200.00'),
+                                             period='monthly', start_date=date(2024, 2, 15)),
+            'quarterly': Budget.objects.create(user=cls.user, category=rent, amount=Decimal('9.00'),
+                                               period='quarterly', start_date=date(2024, 5, 20)),
+            'yearly': Budget.objects.create(user=cls.user, category=food, amount=Decimal('1000.00'),
+                                            period='yearly', start_date=date(2024, 8, 1)),
+        }
+
+    def test_with_usage_matches_per_budget_methods(self):
+        annotated = {budget.period: budget for budget in Budget.objects.with_usage()}
+        expected = {
+            'monthly': (Decimal('150.00'), 75.0),
+            'quarterly': (Decimal('3.00'), 100 / 3),
+            'yearly': (Decimal('319.00'), 31.9),
+        }
+        for period, (spent, percentage) in expected.items():
+            budget = Budget.objects.get(pk=self.budgets[period].pk)
+            self.assertEqual(budget.get_spent_amount(), spent)
+            self.assertAlmostEqual(budget.get_usage_percentage(), percentage)
+
+            self.assertEqual(annotated[period].period_start, budget.get_period_window()[0])
+            self.assertEqual(annotated[period].spent_amount, spent)
+            self.assertEqual(annotated[period].remaining_amount, budget.amount - spent)
+            self.assertIsInstance(annotated[period].usage_percentage, float)
+            self.assertAlmostEqual(annotated[period].usage_percentage, percentage)
+
+
+class ListingQueryCountTests(ConstantQueryCountMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('owner', 'owner@example.com', 'secret123')
+        cls.categories = [
+            Category.objects.create(name=f'Category {number}', category_type='expense')
+            for number in range(12)
+        ]
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def add_transactions(self, offset, count):
+        for number in range(offset, offset + count):
+            Transaction.objects.create(
+                user=self.user,
+                transaction_type='expense',
+                category=self.categories[number % len(self.categories)],
+                amount=Decimal('12.50'),
+                description=f'Coffee {number}',
+                date=date.today() - timedelta(days=number)
+            )
+
+    def add_budgets(self, offset, count):
+        for number in range(offset, offset + count):
+            Budget.objects.create(
+                user=self.user,
+                category=self.categories[number],
+                amount=Decimal('100'),
+                start_date=date.today().replace(day=1)
+            )
+
+    def add_recurring(self, offset, count):
+        for number in range(offset, offset + count):
+            RecurringTransaction.objects.create(
+                user=self.user,
+                transaction_type='expense',
+                category=self.categories[number],
+                amount=Decimal('9.99'),
+                frequency='monthly',
+                start_date=date.today(),
+                next_occurrence=date.today()
+            )
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_listing_rows(self):
+        def render():
+            return [
+                (str(transaction), transaction.category.color)
+                for transaction in Transaction.objects.filter(user=self.user).for_listing()
+            ]
+        self.assertConstantQueries(render, self.add_transactions)
+
+    def test_transactions_page_api(self):
+        self.assertConstantQueries(
+            lambda: self.get(reverse('transactions:api_transactions'), per_page=50),
+            self.add_transactions
+        )
+        self.assertConstantQueries(
+            lambda: self.get(reverse('transactions:api_transactions'), per_page=50, view='ledger'),
+            self.add_transactions
+        )
+
+    def test_search_api(self):
+        self.assertConstantQueries(
+            lambda: self.get(reverse('transactions:api_search'), q='coffee', per_page=50),
+            self.add_transactions
+        )
+
+    def test_dashboard_api(self):
+        self.assertConstantQueries(
+            lambda: self.get(reverse('transactions:api_dashboard')),
+            self.add_transactions
+        )
+        self.assertConstantQueries(
+            lambda: self.get(reverse('transactions:api_dashboard')),
+            self.add_budgets
+        )
+
+    def test_admin_changelists(self):
+        self.assertConstantQueries(
+            lambda: self.get(reverse('admin:transactions_transaction_changelist')),
+            self.add_transactions
+        )
+        self.assertConstantQueries(
+            lambda: self.get(reverse('admin:transactions_budget_changelist')),
+            self.add_budgets
+        )
+        self.assertConstantQueries(
+            lambda: self.get(reverse('admin:transactions_recurringtransaction_changelist')),
+            self.add_recurring
+        )
+
+
+@override_settings(CATEGORY_REGISTRY_CHECK_INTERVAL=3600)
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', 'owner@example.com', 'secret123')
+        cls.other = User.objects.create_user('other', 'other@example.com', 'secret123')
+        cls.food = Category.objects.create(name='Groceries', category_type='expense')
+        cls.cafe = Category.objects.create(name='Coffee Shops', category_type='expense')
+        cls.beans = cls.add(cls.user, cls.food, 'Coffee beans')
+        cls.latte = cls.add(cls.user, cls.cafe, 'Latte')
+        cls.bread = cls.add(cls.user, cls.food, 'Bread and milk')
+        cls.foreign = cls.add(cls.other, cls.food, 'Coffee beans')
+
+    @classmethod
+    def add(cls, user, category, description):
+        return Transaction.objects.create(user=user, transaction_type='expense', category=category,
+                                          amount=Decimal('5.00'), date=date(2024, 3, 1),
+                                          description=description)
+
+    def setUp(self):
+        if not search_index_available():
+            self.skipTest('No full-text index on this database')
+
+    def search(self, query, user=None, **kwargs):
+        return list(search_transactions(Transaction.objects.order_by('pk'), query,
+                                        user=self.user if user is None else user, **kwargs))
+
+    def indexed_ids(self):
+        key = 'rowid' if connection.vendor == 'sqlite' else 'transaction_id'
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT {key} FROM {SEARCH_TABLE}')
+            return {row[0] for row in cursor.fetchall()}
+
+    def test_matches_description_and_category(self):
+        self.assertEqual(self.search('bread'), [self.bread])
+        self.assertEqual(self.search('groceries'), [self.beans, self.bread])
+        # Every term has to match, in either column
+        self.assertEqual(self.search('coffee groceries'), [self.beans])
+        self.assertEqual(self.search('!!'), list(Transaction.objects.order_by('pk')))
+
+    def test_prefix_terms(self):
+        self.assertEqual(self.search('cof'), [self.beans, self.latte])
+        self.assertEqual(self.search('gro mil'), [self.bread])
+        self.assertEqual(self.search('coffees'), [])
+
+    def test_ranking(self):
+        best = self.add(self.user, self.food, 'Coffee coffee coffee')
+        results = self.search('coffee', rank=True)
+        self.assertEqual(results[0], best)
+        self.assertEqual(set(results), {best, self.beans, self.latte})
+        ranks = [result.search_rank for result in results]
+        self.assertEqual(ranks, sorted(ranks, reverse=True))
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('transactions:api_search'), {'q': 'coffee'})
+        self.assertEqual([row['id'] for row in response.json()['data']], [result.pk for result in results])
+
+    def test_owner_isolation(self):
+        self.assertEqual(self.search('beans'), [self.beans])
+        self.assertEqual(self.search('beans', user=self.other), [self.foreign])
+
+        self.client.force_login(self.other)
+        response = self.client.get(reverse('transactions:api_search'), {'q': 'latte'})
+        self.assertEqual(response.json()['data'], [])
+
+    def test_triggers_follow_writes(self):
+        self.bread.description = 'Sourdough'
+        self.bread.save()
+        self.assertEqual(self.search('bread'), [])
+        self.assertEqual(self.search('sourdough'), [self.bread])
+
+        self.cafe.name = 'Cafes'
+        self.cafe.save()
+        self.assertEqual(self.search('shops'), [])
+        self.assertEqual(self.search('cafes'), [self.latte])
+
+        self.latte.user = self.other
+        self.latte.save()
+        self.assertEqual(self.search('latte'), [])
+        self.assertEqual(self.search('latte', user=self.other), [self.latte])
+
+        pk = self.beans.pk
+        self.beans.delete()
+        self.assertNotIn(pk, self.indexed_ids())
+        self.assertEqual(self.indexed_ids(), set(Transaction.objects.values_list('pk', flat=True)))
+
+
+class CategoryRegistryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.groceries = Category.objects.create(name='Groceries', category_type='expense')
+        cls.salary = Category.objects.create(name='Salary', category_type='income')
+
+    def setUp(self):
+        categories.clear()
+
+    def test_lookups(self):
+        archived = Category.objects.create(name='Archived', category_type='expense', is_active=False)
+
+        self.assertEqual(categories.get(self.groceries.pk).name, 'Groceries')
+        self.assertEqual(categories.get(archived.pk).name, 'Archived')
+        self.assertEqual(categories.active(), [self.groceries, self.salary])
+        self.assertEqual(categories.active('expense'), [self.groceries])
+        self.assertEqual(categories.active('income'), [self.salary])
+        self.assertIsNone(categories.get(0))
+
+        with self.assertNumQueries(0):
+            categories.get(self.groceries.pk)
+            categories.active('expense')
+
+    def test_save_and_delete_invalidate(self):
+        version = categories.version
+        rent = Category.objects.create(name='Rent', category_type='expense')
+        self.assertGreater(categories.version, version)
+        self.assertEqual(categories.active('expense'), [self.groceries, rent])
+
+        rent.name = 'Housing'
+        rent.save()
+        self.assertEqual(categories.get(rent.pk).name, 'Housing')
+
+        version = categories.version
+        rent.delete()
+        self.assertGreater(categories.version, version)
+        self.assertEqual(categories.active('expense'), [self.groceries])
+
+    def test_version_shared_between_processes(self):
+        # A second registry stands in for another worker process
+        other = CategoryRegistry()
+        self.assertEqual(other.version, categories.version)
+        self.assertEqual(categories.version, CategoryVersion.objects.get_version())
+
+        Category.objects.create(name='Rent', category_type='expense')
+        self.assertEqual(CategoryRegistry().version, categories.version)
+        self.assertEqual(other.snapshot(check=True).version, categories.version)
+
+    def test_unknown_id_reloads(self):
+        self.assertEqual(len(categories.active()), 2)
+        # Written by another process: bypasses this registry and its check interval
+        rent = Category.objects.bulk_create([Category(name='Rent', category_type='expense')])[0]
+        CategoryVersion.objects.bump()
+
+        self.assertEqual(len(categories.active()), 2)
+        self.assertEqual(categories.get(rent.pk).name, 'Rent')
+        self.assertEqual(len(categories.active()), 3)
+
+    def test_dashboard_with_unknown_category(self):
+        user = User.objects.create_user('owner', 'owner@example.com', 'secret123')
+        Transaction.objects.create(
+            user=user, transaction_type='expense', category=self.groceries,
+            amount=Decimal('12.50'), date=date.today()
+        )
+        self.client.force_login(user)
+        with mock.patch.object(categories, 'get', return_value=None):
+            response = self.client.get(reverse('transactions:api_dashboard'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_form_choices_are_lazy(self):
+        form = TransactionForm()
+        self.assertEqual([label for _, label in form.fields['category'].choices][1:], ['Groceries (Expense)'])
+
+        rent = Category.objects.create(name='Rent', category_type='expense')
+        self.assertIn((rent.pk, 'Rent (Expense)'), list(form.fields['category'].choices))
+        self.assertIn(f'value="{rent.pk}"', str(form['category']))
+
+    def test_forms_import_without_tables(self):
+        # Runs checks (which import every form and view) against a database that has not been migrated
+        with tempfile.TemporaryDirectory() as directory:
+            env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(directory, 'empty.sqlite3')}")
+            result = subprocess.run(
+                [sys.executable, '-c', 'import django; django.setup(); import transactions.forms, transactions.views'],
+                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+            )
+            self.assertEqual(result.returncode, 0, result.stderr)
+            result = subprocess.run(
+                [sys.executable, 'manage.py', 'check'],
+                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+            )
+            self.assertEqual(result.returncode, 0, result.stderr)
+
+
+class ConditionalResponseTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', 'owner@example.com', 'secret123')
+        cls.food = Category.objects.create(name='Food', category_type='expense')
+        Transaction.objects.create(user=cls.user, transaction_type='expense', category=cls.food,
+                                   amount=Decimal('12.50'), date=date.today())
+
+    def setUp(self):
+        categories.clear()
+        # Writes in the past, so a later write moves Last-Modified by whole seconds
+        DataVersion.objects.filter(user=self.user).update(updated_at=timezone.now() - timedelta(hours=1))
+        CategoryVersion.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        self.client.force_login(self.user)
+
+    def test_not_modified_carries_validators(self):
+        for name in ('transactions:api_dashboard', 'transactions:api_stats', 'reports:category_stats'):
+            url = reverse(name)
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            etag = response['ETag']
+
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304, name)
+            self.assertEqual(response['ETag'], etag)
+            self.assertIn('private', response['Cache-Control'])
+
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+            self.assertEqual(response.status_code, 304, name)
+
+    def test_category_change_invalidates(self):
+        url = reverse('transactions:api_dashboard')
+        response = self.client.get(url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        self.food.name = 'Groceries'
+        self.food.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('Groceries', response.content.decode())
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+
+        # Writes to the user's data invalidate too
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        Transaction.objects.create(user=self.user, transaction_type='expense', category=self.food,
+                                   amount=Decimal('1.00'), date=date.today())
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+
+class DashboardCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.food = Category.objects.create(name='Food', category_type='expense')
+        cls.owner = User.objects.create_user('owner', 'owner@example.com', 'secret123')
+        cls.other = User.objects.create_user('other', 'other@example.com', 'secret123')
+        for user, amount in ((cls.owner, '10.00'), (cls.other, '99.00')):
+            cls.add(user, amount)
+
+    @classmethod
+    def add(cls, user, amount):
+        Transaction.objects.create(user=user, transaction_type='expense', category=cls.food,
+                                   amount=Decimal(amount), date=date.today())
+
+    def setUp(self):
+        categories.clear()
+        cache.clear()
+
+    def get(self, user, name='transactions:api_stats', **params):
+        self.client.force_login(user)
+        return self.client.get(reverse(name), params)
+
+    def test_write_invalidates(self):
+        first = self.get(self.owner)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(first.json()['expenses'], 10.0)
+        cached = self.get(self.owner)
+        self.assertEqual(cached['X-Cache'], 'HIT')
+        self.assertEqual(cached.content, first.content)
+
+        self.add(self.owner, '5.00')
+        response = self.get(self.owner)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['expenses'], 15.0)
+
+        Transaction.objects.filter(user=self.owner).update(amount=Decimal('1.00'))
+        self.assertEqual(self.get(self.owner).json()['expenses'], 2.0)
+
+    def test_entries_are_per_user(self):
+        # Same data version, same query string: only the user tells the entries apart
+        self.assertEqual(DataVersion.objects.get(user=self.owner).version,
+                         DataVersion.objects.get(user=self.other).version)
+        for name in ('transactions:api_stats', 'transactions:api_category_breakdown',
+                     'transactions:api_monthly_trend'):
+            owner = self.get(self.owner, name, months=3)
+            self.assertEqual(owner['X-Cache'], 'MISS')
+            other = self.get(self.other, name, months=3)
+            self.assertEqual(other['X-Cache'], 'MISS', name)
+            self.assertNotEqual(other.content, owner.content, name)
+            self.assertEqual(self.get(self.owner, name, months=3).content, owner.content)
+            self.assertEqual(self.get(self.other, name, months=3).content, other.content)
+        self.assertEqual(self.get(self.other).json()['expenses'], 99.0)
+
+
+class DashboardPageTests(TestCase):
+    def test_login_required(self):
+        response = self.client.get(reverse('dashboard'))
+        self.assertRedirects(response, f"{reverse('accounts:login')}?next=/", fetch_redirect_response=False)
+
+        self.client.force_login(User.objects.create_user('owner', 'owner@example.com', 'secret123'))
+        self.assertEqual(self.client.get(reverse('dashboard')).status_code, 200)
+
+    def test_months_parameter(self):
+        self.client.force_login(User.objects.create_user('owner', 'owner@example.com', 'secret123'))
+        for name, trend in (('transactions:api_monthly_trend', lambda payload: payload['data']),
+                            ('transactions:api_dashboard', lambda payload: payload['monthly_trend'])):
+            url = reverse(name)
+            for months, expected in (('abc', 6), ('3', 3), ('0', 1), ('100000', 24)):
+                response = self.client.get(url, {'months': months})
+                self.assertEqual(response.status_code, 200, (name, months))
+                self.assertEqual(len(trend(response.json())), expected, (name, months))
+
+
+class PaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', 'owner@example.com', 'secret123')
+        cls.food = Category.objects.create(name='Food', category_type='expense')
+        for number in range(10):
+            Transaction.objects.create(user=cls.user, transaction_type='expense', category=cls.food,
+                                       amount=Decimal('1.00'), date=date(2024, 1, 1 + number // 4))
+        # Rows on one date, half of them also sharing created_at: ties fall through to id
+        cls.moment = timezone.now()
+        Transaction.objects.filter(pk__in=Transaction.objects.order_by('pk').values('pk')[:6]).update(
+            created_at=cls.moment
+        )
+
+    def encode(self, value):
+        return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+    def pages(self, per_page):
+        paginator = KeysetPaginator(Transaction.objects.all(), per_page=per_page)
+        pages, cursor = [], None
+        while True:
+            page = paginator.get_page(cursor)
+            pages.append([transaction.pk for transaction in page])
+            if not page.has_next:
+                return pages
+            cursor = page.next_cursor
+
+    def test_cursor_round_trip(self):
+        transaction = Transaction.objects.order_by('pk').first()
+        cursor = encode_cursor(transaction)
+        self.assertNotIn('=', cursor)
+        self.assertEqual(decode_cursor(cursor), (transaction.date, transaction.created_at, transaction.pk))
+
+    def test_invalid_cursors(self):
+        valid = encode_cursor(Transaction.objects.first())
+        for cursor in [
+            'not a cursor', valid[:-4], valid[1:], 'A' * len(valid),
+            base64.urlsafe_b64encode(b'\xff\xfe\xfd').decode(),
+            self.encode(None), self.encode({'date': '2024-01-01'}), self.encode([1, 2, 3]),
+            self.encode(['2024-01-01', self.moment.isoformat()]),
+            self.encode(['2024-02-30', self.moment.isoformat(), 1]),
+            self.encode(['2024-01-01', 'yesterday', 1]),
+            self.encode(['2024-01-01', self.moment.isoformat(), 'x']),
+            self.encode(['2024-01-01', self.moment.isoformat(), [1]]),
+        ]:
+            with self.assertRaises(InvalidCursor, msg=cursor):
+                decode_cursor(cursor)
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('transactions:api_transactions'), {'cursor': valid[:-4]})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Invalid cursor', response.json()['error'])
+
+    def test_stable_order_on_ties(self):
+        expected = list(Transaction.objects.order_by('-date', '-created_at', '-id').values_list('pk', flat=True))
+        for per_page in (1, 3, 4, 10):
+            pages = self.pages(per_page)
+            self.assertEqual([pk for page in pages for pk in page], expected, per_page)
+            self.assertTrue(all(len(page) == per_page for page in pages[:-1]))
+
+    def test_inserts_do_not_shift_pages(self):
+        paginator = KeysetPaginator(Transaction.objects.all(), per_page=3)
+        first = paginator.get_page()
+        Transaction.objects.create(user=self.user, transaction_type='expense', category=self.food,
+                                   amount=Decimal('1.00'), date=date(2024, 2, 1))
+        second = paginator.get_page(first.next_cursor)
+        expected = list(Transaction.objects.filter(date__lt=date(2024, 2, 1)).order_by(
+            '-date', '-created_at', '-id'
+        ).values_list('pk', flat=True))
+        self.assertEqual([transaction.pk for transaction in second], expected[3:6])
+
+
+class LedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', 'owner@example.com', 'secret123')
+        salary = Category.objects.create(name='Salary', category_type='income')
+        food = Category.objects.create(name='Food', category_type='expense')
+        cls.balances = {}
+        balance = Decimal('0')
+        for number in range(30):
+            # Several transactions per day so pages split days
+            income = number % 4 == 0
+            transaction = Transaction.objects.create(
+                user=cls.user,
+                transaction_type='income' if income else 'expense',
+                category=salary if income else food,
+                amount=Decimal('100.00') if income else Decimal('7.35'),
+                date=date(2024, 1, 1) + timedelta(days=number // 3)
+            )
+            balance += transaction.amount if income else -transaction.amount
+            cls.balances[transaction.pk] = float(balance)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def fetch_all(self, **params):
+        url = reverse('transactions:api_transactions')
+        rows, cursor = [], None
+        while True:
+            query = {'view': 'ledger', 'per_page': 4, **params}
+            if cursor:
+                query['cursor'] = cursor
+            response = self.client.get(url, query).json()
+            rows.extend(response['data'])
+            cursor = response['next_cursor']
+            if not cursor:
+                return rows
+
+    def test_balances_across_pages(self):
+        rows = self.fetch_all()
+        self.assertEqual(len(rows), 30)
+        for row in rows:
+            self.assertAlmostEqual(row['balance'], self.balances[row['id']], places=2)
+
+    def test_balances_ignore_filters(self):
+        rows = self.fetch_all(type='income')
+        self.assertEqual(len(rows), Transaction.objects.filter(transaction_type='income').count())
+        for row in rows:
+            self.assertAlmostEqual(row['balance'], self.balances[row['id']], places=2)
+
+    def test_sparse_filtered_page(self):
+        # Two income rows a month apart with a run of expenses between them
+        rows = self.fetch_all(type='income', per_page=2)
+        page = list(Transaction.objects.filter(pk__in=[row['id'] for row in rows[:2]]))
+        first, last = min(page, key=position), max(page, key=position)
+        self.assertGreater(
+            Transaction.objects.filter(user=self.user, date__gte=first.date, date__lte=last.date).count(), 2
+        )
+
+        balances = running_balances(self.user, first, last, [transaction.pk for transaction in page])
+        self.assertEqual(set(balances), {transaction.pk for transaction in page})
+        for pk, balance in balances.items():
+            self.assertAlmostEqual(float(balance), self.balances[pk], places=2)
+        for row in rows:
+            self.assertAlmostEqual(row['balance'], self.balances[row['id']], places=2)
+
+    def test_plain_pages_have_no_balance(self):
+        response = self.client.get(reverse('transactions:api_transactions'))
+        self.assertNotIn('balance', response.json()['data'][0])
+
+
+class MonthlyBalanceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', 'owner@example.com', 'secret123')
+        cls.salary = Category.objects.create(name='Salary', category_type='income')
+        cls.food = Category.objects.create(name='Food', category_type='expense')
+
+    def add(self, day, amount, category=None):
+        category = category or self.food
+        return Transaction.objects.create(
+            user=self.user,
+            transaction_type=category.category_type,
+            category=category,
+            amount=Decimal(amount),
+            date=day
+        )
+
+    def snapshots(self):
+        return list(MonthlyBalance.objects.filter(user=self.user).values_list(
+            'month', 'income', 'expense'
+        ))
+
+    def assertMatchesRebuild(self):
+        incremental = self.snapshots()
+        MonthlyBalance.objects.rebuild(user=self.user)
+        self.assertEqual(incremental, self.snapshots())
+
+    def test_backdated_writes(self):
+        self.add(date(2024, 1, 5), '1000.00', self.salary)
+        self.add(date(2024, 3, 9), '40.00')
+        self.add(date(2024, 5, 2), '15.50')
+
+        # A write to an earlier month only touches that month's row
+        with CaptureQueriesContext(connection) as queries:
+            transaction = self.add(date(2024, 2, 20), '100.00')
+        self.assertFalse([query for query in queries if 'FOR UPDATE' in query['sql'] or '"auth_user"' in query['sql']])
+        self.assertMatchesRebuild()
+        self.assertEqual(balance_at(self.user, date(2024, 5, 31)), Decimal('844.50'))
+
+        transaction.date = date(2023, 12, 31)
+        transaction.transaction_type = 'income'
+        transaction.category = self.salary
+        transaction.save()
+        self.assertMatchesRebuild()
+
+        transaction.delete()
+        self.assertMatchesRebuild()
+        self.assertEqual(balance_at(self.user, date(2024, 5, 31)), Decimal('944.50'))
+        self.assertNotIn(date(2023, 12, 1), [row[0] for row in self.snapshots()])
+
+    def test_backdated_write_cost_is_flat(self):
+        def backdated_write():
+            with CaptureQueriesContext(connection) as queries:
+                self.add(date(2020, 1, 15), '5.00')
+            return len(queries)
+
+        self.add(date(2024, 1, 5), '1000.00', self.salary)
+        self.add(date(2020, 1, 15), '5.00')
+        few = backdated_write()
+        for month in range(1, 13):
+            self.add(date(2023, month, 1), '1.00')
+        self.assertEqual(backdated_write(), few)
+        self.assertMatchesRebuild()
+
+    def test_balance_at(self):
+        self.add(date(2024, 1, 5), '1000.00', self.salary)
+        self.add(date(2024, 3, 9), '40.00')
+        self.add(date(2024, 3, 20), '60.00')
+
+        self.assertEqual(balance_at(self.user, date(2023, 12, 31)), Decimal('0.00'))
+        self.assertEqual(balance_at(self.user, date(2024, 2, 29)), Decimal('1000.00'))
+        self.assertEqual(balance_at(self.user, date(2024, 3, 10)), Decimal('960.00'))
+        self.assertEqual(balance_at(self.user, date(2024, 7, 1)), Decimal('900.00'))
+
+    def test_balance_api(self):
+        self.add(date.today(), '250.00', self.salary)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('transactions:api_balance'), {'months': 3})
+        data = response.json()
+        self.assertEqual(data['balance'], 250.0)
+        self.assertEqual([item['balance'] for item in data['history']], [0.0, 0.0, 250.0])
+
+        response = self.client.get(reverse('transactions:api_balance'), {'date': '2024-02-30'})
+        self.assertEqual(response.status_code, 400)
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import views, async_views
 
 app_name = 'transactions'
 
@@ -7,6 +7,7 @@ urlpatterns = [
     # Transaction CRUD
     path('', views.transaction_list, name='list'),
     path('add/', views.add_transaction, name='add'),
+    path('import/', views.import_transactions, name='import'),
     path('edit/<int:pk>/', views.edit_transaction, name='edit'),
     path('delete/<int:pk>/', views.delete_transaction, name='delete'),
     
@@ -23,7 +24,16 @@ urlpatterns = [
     path('recurring/delete/<int:pk>/', views.delete_recurring, name='delete_recurring'),
     
     # API endpoints
+    path('api/dashboard/', views.get_dashboard_data, name='api_dashboard'),
+    path('api/balance/', views.get_balance, name='api_balance'),
     path('api/stats/', views.get_transaction_stats, name='api_stats'),
     path('api/monthly-trend/', views.get_monthly_trend, name='api_monthly_trend'),
     path('api/category-breakdown/', views.get_category_breakdown, name='api_category_breakdown'),
+    path('api/transactions/', views.get_transactions_page, name='api_transactions'),
+    path('api/search/', views.search_transactions_api, name='api_search'),
+    
+    # Async variants of the dashboard API for ASGI deployments
+    path('api/async/stats/', async_views.transaction_stats, name='api_async_stats'),
+    path('api/async/monthly-trend/', async_views.monthly_trend, name='api_async_monthly_trend'),
+    path('api/async/category-breakdown/', async_views.category_breakdown, name='api_async_category_breakdown'),
 ]
\ No newline at end of file
@@ -3,17 +3,31 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
 from django.db.models import Sum, Q
+from django.db.models.functions import TruncMonth
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from datetime import timedelta
+import io
 import json
 
-from .models import Transaction, Category, Budget, RecurringTransaction
-from .forms import TransactionForm, BudgetForm, RecurringTransactionForm
+from .categories import registry as categories
+from .models import Transaction, Budget, RecurringTransaction, DailyTotal
+from .forms import TransactionForm, BudgetForm, RecurringTransactionForm, ImportTransactionsForm
+from .importers import TransactionImporter, ImportValidationError, parse_csv, parse_ofx
+from .ledger import attach_balances, balance_at, balance_history
+from .pagination import KeysetPaginator, InvalidCursor
+from .search import search_transactions
+from .caching import cache_per_user_version, conditional_per_user
+from reports.services import income_expense_series, shift_period, period_label
 
 
-@login_required
-def transaction_list(request):
-    transactions = Transaction.objects.filter(user=request.user).order_by('-date', '-created_at')
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def filter_transactions(request):
+    """Apply the list filters from the query string to the user's transactions"""
+    transactions = Transaction.objects.filter(user=request.user)
     
     # Filter by type
     transaction_type = request.GET.get('type')
@@ -36,16 +50,53 @@ def transaction_list(request):
     # Search
     search = request.GET.get('search')
     if search:
-        transactions = transactions.filter(
-            Q(description__icontains=search) |
-            Q(category__name__icontains=search)
-        )
+        transactions = search_transactions(transactions, search, user=request.user)
+    
+    return transactions
+
+
+def get_page_size(request):
+    try:
+        per_page = int(request.GET.get('per_page', PAGE_SIZE))
+    except ValueError:
+        per_page = PAGE_SIZE
+    return max(1, min(per_page, MAX_PAGE_SIZE))
+
+
+def get_months(request, default=6, maximum=24):
+    """The requested number of months, clamped to 1..maximum"""
+    try:
+        months = int(request.GET.get('months', default))
+    except ValueError:
+        months = default
+    return max(1, min(months, maximum))
+
+
+def is_ledger(request):
+    """Whether the list should show the running balance after each transaction"""
+    return request.GET.get('view') == 'ledger'
+
+
+@login_required
+def transaction_list(request):
+    transactions = filter_transactions(request).for_listing()
+    paginator = KeysetPaginator(transactions, per_page=get_page_size(request))
     
-    categories = Category.objects.filter(is_active=True)
+    try:
+        page = paginator.get_page(request.GET.get('cursor'))
+    except InvalidCursor:
+        page = paginator.get_page()
+    
+    ledger = is_ledger(request)
+    if ledger:
+        attach_balances(request.user, page.object_list)
     
     return render(request, 'transactions/list.html', {
-        'transactions': transactions,
-        'categories': categories,
+        'transactions': page.object_list,
+        'page': page,
+        'next_cursor': page.next_cursor,
+        'ledger': ledger,
+        'categories': categories.active(),
         'transaction_types': Transaction.TRANSACTION_TYPES
     })
 
@@ -67,7 +118,40 @@ def add_transaction(request):
     
     return render(request, 'transactions/add.html', {
         'form': form,
-        'categories': Category.objects.filter(is_active=True)
+        'categories': categories.active()
+    })
+
+
+@login_required
+def import_transactions(request):
+    if request.method == 'POST':
+        form = ImportTransactionsForm(request.POST, request.FILES)
+        if form.is_valid():
+            # Stream the upload line by line instead of reading it into memory
+            lines = io.TextIOWrapper(form.cleaned_data['file'], encoding='utf-8-sig', newline='')
+            if form.cleaned_data['format'] == 'csv':
+                rows = parse_csv(lines, form.get_columns(), form.cleaned_data['date_format'] or '%Y-%m-%d')
+            else:
+                rows = parse_ofx(lines)
+            
+            importer = TransactionImporter(request.user)
+            try:
+                importer.run(rows)
+            except (ImportValidationError, UnicodeDecodeError) as e:
+                messages.error(request, f'Import failed: {e}')
+            else:
+                for line_num, message in importer.errors[:10]:
+                    messages.warning(request, f'Line {line_num}: {message}')
+                messages.success(
+                    request,
+                    f'Imported {importer.created} transactions ({importer.skipped} skipped).'
+                )
+                return redirect('transactions:list')
+    else:
+        form = ImportTransactionsForm()
+    
+    return render(request, 'transactions/import.html', {
+        'form': form
     })
 
 
@@ -87,7 +171,7 @@ def edit_transaction(request, pk):
     return render(request, 'transactions/edit.html', {
         'form': form,
         'transaction': transaction,
-        'categories': Category.objects.filter(is_active=True)
+        'categories': categories.active()
     })
 
 
@@ -107,13 +191,8 @@ def delete_transaction(request, pk):
 
 @login_required
 def budget_list(request):
-    budgets = Budget.objects.filter(user=request.user, is_active=True)
-    
-    # Calculate budget usage for each budget
-    for budget in budgets:
-        budget.spent_amount = budget.get_spent_amount()
-        budget.remaining_amount = budget.get_remaining_amount()
-        budget.usage_percentage = budget.get_usage_percentage()
+    # Spent, remaining and usage are annotated for all budgets in one query
+    budgets = Budget.objects.filter(user=request.user, is_active=True).with_usage().select_related('category')
     
     return render(request, 'transactions/budgets.html', {
         'budgets': budgets
@@ -135,7 +214,7 @@ def add_budget(request):
     
     return render(request, 'transactions/add_budget.html', {
         'form': form,
-        'expense_categories': Category.objects.filter(category_type='expense', is_active=True)
+        'expense_categories': categories.active('expense')
     })
 
 
@@ -155,7 +234,7 @@ def edit_budget(request, pk):
     return render(request, 'transactions/edit_budget.html', {
         'form': form,
         'budget': budget,
-        'expense_categories': Category.objects.filter(category_type='expense', is_active=True)
+        'expense_categories': categories.active('expense')
     })
 
 
@@ -175,7 +254,9 @@ def delete_budget(request, pk):
 
 @login_required
 def recurring_list(request):
-    recurring_transactions = RecurringTransaction.objects.filter(user=request.user, is_active=True)
+    recurring_transactions = RecurringTransaction.objects.filter(
+        user=request.user, is_active=True
+    ).select_related('category')
     
     return render(request, 'transactions/recurring.html', {
         'recurring_transactions': recurring_transactions
@@ -197,7 +278,7 @@ def add_recurring(request):
     
     return render(request, 'transactions/add_recurring.html', {
         'form': form,
-        'categories': Category.objects.filter(is_active=True)
+        'categories': categories.active()
     })
 
 
@@ -217,7 +298,7 @@ def edit_recurring(request, pk):
     return render(request, 'transactions/edit_recurring.html', {
         'form': form,
         'recurring': recurring,
-        'categories': Category.objects.filter(is_active=True)
+        'categories': categories.active()
     })
 
 
@@ -236,104 +317,61 @@ def delete_recurring(request, pk):
 
 
 # API Views
-@login_required
-def get_transaction_stats(request):
-    """Get transaction statistics for dashboard"""
-    user = request.user
-    
-    # Current month stats
-    current_month = timezone.now().replace(day=1)
-    
-    income = Transaction.objects.filter(
-        user=user,
-        transaction_type='income',
-        date__gte=current_month
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    
-    expenses = Transaction.objects.filter(
-        user=user,
-        transaction_type='expense',
-        date__gte=current_month
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    
-    # Previous month for comparison
-    prev_month = current_month - timedelta(days=1)
-    prev_month = prev_month.replace(day=1)
-    
-    prev_income = Transaction.objects.filter(
-        user=user,
-        transaction_type='income',
-        date__gte=prev_month,
-        date__lt=current_month
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    
-    prev_expenses = Transaction.objects.filter(
+def get_month_starts():
+    """First day of the current and the previous month"""
+    current_month = timezone.now().date().replace(day=1)
+    prev_month = (current_month - timedelta(days=1)).replace(day=1)
+    return current_month, prev_month
+
+
+def sum_daily_totals(user, transaction_type, date_from, date_to=None):
+    totals = DailyTotal.objects.filter(
         user=user,
-        transaction_type='expense',
-        date__gte=prev_month,
-        date__lt=current_month
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    
+        transaction_type=transaction_type,
+        date__gte=date_from
+    )
+    if date_to:
+        totals = totals.filter(date__lt=date_to)
+    return totals.aggregate(total=Sum('total'))['total'] or 0
+
+
+def stats_data(income, expenses, prev_income, prev_expenses):
     # Calculate changes
     income_change = ((income - prev_income) / prev_income * 100) if prev_income > 0 else 0
     expense_change = ((expenses - prev_expenses) / prev_expenses * 100) if prev_expenses > 0 else 0
     
-    return JsonResponse({
+    return {
         'income': float(income),
         'expenses': float(expenses),
         'net_balance': float(income - expenses),
-        'income_change': income_change,
-        'expense_change': expense_change
-    })
+        'income_change': float(income_change),
+        'expense_change': float(expense_change)
+    }
 
 
-@login_required
-def get_monthly_trend(request):
-    """Get monthly trend data for charts"""
-    months = int(request.GET.get('months', 6))
+def monthly_trend_data(user, months=6):
+    series = income_expense_series(user, 'monthly', periods=months)
     
-    # Generate monthly data
     data = []
-    for i in range(months):
-        date = timezone.now() - timedelta(days=30 * i)
-        month_start = date.replace(day=1)
-        
-        income = Transaction.objects.filter(
-            user=request.user,
-            transaction_type='income',
-            date__year=month_start.year,
-            date__month=month_start.month
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        expenses = Transaction.objects.filter(
-            user=request.user,
-            transaction_type='expense',
-            date__year=month_start.year,
-            date__month=month_start.month
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
+    for item in series:
         data.append({
-            'month': month_start.strftime('%b %Y'),
-            'income': float(income),
-            'expenses': float(expenses)
+            'month': item['label'],
+            'income': float(item['income']),
+            'expenses': float(item['expenses'])
         })
-    
-    data.reverse()
-    return JsonResponse({'data': data})
+    return {'data': data}
 
 
-@login_required
-def get_category_breakdown(request):
-    """Get category breakdown data for charts"""
+def category_breakdown_data(user):
     # Get current month expenses by category
-    current_month = timezone.now().replace(day=1)
+    current_month, _ = get_month_starts()
     
-    category_data = Transaction.objects.filter(
-        user=request.user,
+    category_data = DailyTotal.objects.filter(
+        user=user,
         transaction_type='expense',
         date__gte=current_month
     ).values('category__name').annotate(
-        total=Sum('amount')
+        total=Sum('total')
     ).order_by('-total')
     
     data = []
@@ -342,5 +380,227 @@ def get_category_breakdown(request):
             'category': item['category__name'],
             'amount': float(item['total'])
         })
+    return {'data': data}
+
+
+@login_required
+@conditional_per_user
+@cache_per_user_version('stats')
+def get_transaction_stats(request):
+    """Get transaction statistics for dashboard"""
+    user = request.user
+    current_month, prev_month = get_month_starts()
+    
+    return JsonResponse(stats_data(
+        sum_daily_totals(user, 'income', current_month),
+        sum_daily_totals(user, 'expense', current_month),
+        sum_daily_totals(user, 'income', prev_month, current_month),
+        sum_daily_totals(user, 'expense', prev_month, current_month)
+    ))
+
+
+@login_required
+@conditional_per_user
+@cache_per_user_version('monthly_trend')
+def get_monthly_trend(request):
+    """Get monthly trend data for charts"""
+    return JsonResponse(monthly_trend_data(request.user, get_months(request)))
+
+
+@login_required
+@conditional_per_user
+@cache_per_user_version('category_breakdown')
+def get_category_breakdown(request):
+    """Get category breakdown data for charts"""
+    return JsonResponse(category_breakdown_data(request.user))
+
+
+def dashboard_data(user, months=6):
+    """
+    Stats, monthly trend, category breakdowns, budget status and recent
+    transactions for the dashboard from three queries.
+    """
+    current_month, prev_month = get_month_starts()
+    first_month = min(shift_period(current_month, 'monthly', -(months - 1)), prev_month)
+    
+    # One pass over the daily rollups feeds the stats, the trend and both breakdowns
+    rows = DailyTotal.objects.filter(
+        user=user,
+        date__gte=first_month
+    ).annotate(
+        month=TruncMonth('date')
+    ).values('month', 'category_id', 'transaction_type').annotate(
+        total=Sum('total')
+    )
+    
+    monthly = {}
+    expenses_by_category = {current_month: {}, prev_month: {}}
+    for row in rows:
+        totals = monthly.setdefault(row['month'], {'income': 0, 'expense': 0})
+        totals[row['transaction_type']] += row['total']
+        if row['transaction_type'] == 'expense' and row['month'] in expenses_by_category:
+            # Names come from the category registry instead of a join
+            category = categories.get(row['category_id'])
+            name = category.name if category else 'Unknown'
+            by_name = expenses_by_category[row['month']]
+            by_name[name] = by_name.get(name, 0) + row['total']
+    
+    empty = {'income': 0, 'expense': 0}
+    current = monthly.get(current_month, empty)
+    previous = monthly.get(prev_month, empty)
+    
+    trend = []
+    month = shift_period(current_month, 'monthly', -(months - 1))
+    while month <= current_month:
+        totals = monthly.get(month, empty)
+        trend.append({
+            'month': period_label(month),
+            'income': float(totals['income']),
+            'expenses': float(totals['expense'])
+        })
+        month = shift_period(month, 'monthly')
+    
+    def breakdown(month):
+        return [
+            {'category': name, 'amount': float(total)}
+            for name, total in sorted(expenses_by_category[month].items(), key=lambda item: item[1], reverse=True)
+        ]
+    
+    budgets = Budget.objects.filter(user=user, is_active=True).with_usage().select_related('category')
+    budget_data = []
+    budgeted = spent = 0
+    for budget in budgets:
+        budgeted += budget.amount
+        spent += budget.spent_amount
+        budget_data.append({
+            'category': budget.category.name,
+            'period': budget.period,
+            'amount': float(budget.amount),
+            'spent': float(budget.spent_amount),
+            'remaining': float(budget.remaining_amount),
+            'usage_percentage': round(float(budget.usage_percentage), 1)
+        })
+    
+    recent = Transaction.objects.filter(user=user).for_listing().order_by(
+        '-date', '-created_at', '-id'
+    )[:5]
+    
+    return {
+        'stats': stats_data(current['income'], current['expense'], previous['income'], previous['expense']),
+        'monthly_trend': trend,
+        'category_breakdown': {
+            'current': breakdown(current_month),
+            'last': breakdown(prev_month)
+        },
+        'budgets': {
+            'items': budget_data,
+            'usage_percentage': round(float(spent / budgeted * 100), 1) if budgeted else 0
+        },
+        'recent_transactions': [{
+            'id': transaction.pk,
+            'date': transaction.date.isoformat(),
+            'description': transaction.description or '',
+            'category': transaction.category.name,
+            'amount': float(transaction.amount),
+            'type': transaction.transaction_type
+        } for transaction in recent]
+    }
+
+
+@login_required
+@conditional_per_user
+def get_dashboard_data(request):
+    """Get everything the dashboard shows in one response"""
+    return JsonResponse(dashboard_data(request.user, get_months(request)))
+
+
+@login_required
+@conditional_per_user
+def get_balance(request):
+    """Get the balance at a date and the month-end balance history"""
+    months = get_months(request, default=12, maximum=120)
+    day = timezone.now().date()
+    if request.GET.get('date'):
+        try:
+            day = parse_date(request.GET['date'])
+        except ValueError:
+            day = None
+        if day is None:
+            return JsonResponse({'error': 'Invalid date, expected YYYY-MM-DD'}, status=400)
+    
+    return JsonResponse({
+        'date': day.isoformat(),
+        'balance': float(balance_at(request.user, day)),
+        'history': [
+            {'month': period_label(month), 'balance': float(closing)}
+            for month, closing in balance_history(request.user, months)
+        ]
+    })
+
+
+@login_required
+@conditional_per_user
+def get_transactions_page(request):
+    """Get one page of transactions for infinite scroll"""
+    transactions = filter_transactions(request).for_listing()
+    paginator = KeysetPaginator(transactions, per_page=get_page_size(request))
+    
+    try:
+        page = paginator.get_page(request.GET.get('cursor'))
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    ledger = is_ledger(request)
+    if ledger:
+        attach_balances(request.user, page.object_list)
+    
+    data = []
+    for transaction in page:
+        item = {
+            'id': transaction.pk,
+            'date': transaction.date.isoformat(),
+            'transaction_type': transaction.transaction_type,
+            'category': transaction.category.name,
+            'amount': float(transaction.amount),
+            'description': transaction.description or ''
+        }
+        if ledger:
+            item['balance'] = float(transaction.balance)
+        data.append(item)
+    
+    return JsonResponse({
+        'data': data,
+        'next_cursor': page.next_cursor,
+        'has_next': page.has_next
+    })
+
+
+@login_required
+@conditional_per_user
+def search_transactions_api(request):
+    """Get the best matching transactions for a search query"""
+    query = request.GET.get('q', '')
+    limit = get_page_size(request)
+    
+    transactions = []
+    if query.strip():
+        transactions = search_transactions(
+            Transaction.objects.filter(user=request.user).for_listing(),
+            query,
+            user=request.user,
+            rank=True
+        )[:limit]
+    
+    data = []
+    for transaction in transactions:
+        data.append({
+            'id': transaction.pk,
+            'date': transaction.date.isoformat(),
+            'transaction_type': transaction.transaction_type,
+            'category': transaction.category.name,
+            'amount': float(transaction.amount),
+            'description': transaction.description or '',
+            'rank': getattr(transaction, 'search_rank', None)
+        })
     
-    return JsonResponse({'data': data})
\ No newline at end of file
+    return JsonResponse({'data': data, 'query': query})